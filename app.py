@@ -3,11 +3,20 @@
 日本のジオイド ジオイドモデルをWeb UIで可視化するモジュール。
 
 python app.py を実行し http://127.0.0.1/5000 をブラウザで開く。
+--metrics を指定した場合は、/metrics で処理時間・件数を Prometheus のテキスト形式で返却する。
 """
+import gzip
+import json
+import math
+import time
+import hashlib
 import argparse
-from flask import Flask, jsonify, render_template, request
+import functools
+import numpy as np
+from flask import Flask, Response, g, jsonify, render_template, request
 
-from geoid import HeightManager
+import metrics
+from geoid import HeightCache, HeightManager
 
 # 引数の定義及び読み込み
 parser = argparse.ArgumentParser(description='Japan geoid height manager with web server')
@@ -15,29 +24,191 @@ parser.add_argument('--path', type=str, default='gsigeo2011_ver2_1.asc', help='J
 parser.add_argument('--port', type=int, default=5000, help='listen port')
 parser.add_argument('--host', type=str, default='127.0.0.1', help='web server host address')
 parser.add_argument('--debug', type=bool, default=False, help='print debug lines')
+parser.add_argument('--tile_size', type=int, default=256, help='max points per tile side')
+parser.add_argument('--tile_cache_size', type=int, default=512, help='number of tiles kept in LRU cache')
+parser.add_argument('--methods', type=str, nargs='*', default=[], choices=HeightManager.INTERPOLATION_METHODS,
+    help='interpolation methods accepted besides bilinear (coefficient tables are prepared at startup)')
+parser.add_argument('--height_cache_size', type=int, default=4096, help='number of /height results kept in LRU cache (0: disabled)')
+parser.add_argument('--height_cache_ttl', type=float, default=0.0, help='seconds /height results are kept in cache (0: no expiry)')
+parser.add_argument('--height_cache_precision', type=int, default=6, help='decimal places of latitude/longitude used as /height cache key')
+parser.add_argument('--cell_cache_size', type=int, default=1024, help='number of grid cells kept for /height bilinear interpolation')
+parser.add_argument('--metrics', action='store_true', help='enable instrumentation and /metrics endpoint')
 args = parser.parse_args()
 
+# 計測を有効にする(ジオイドモデルの読み込みから計測する)
+if args.metrics:
+    metrics.enable()
+
 # ジオイドモデル管理クラスのインスタンス化
-mgr = HeightManager(path=args.path, debug=args.debug)
+mgr = HeightManager(path=args.path, debug=args.debug, methods=args.methods)
+# /height、/heights で指定できる内挿方法(双1次内挿と --methods で指定した内挿方法)
+interpolation_methods = tuple(method for method in HeightManager.INTERPOLATION_METHODS
+    if method == 'bilinear' or method in args.methods)
+# /height の結果キャッシュ(緯度・経度を丸めた値をキーとする LRU/TTL キャッシュ)
+height_cache = HeightCache(mgr, maxsize=args.height_cache_size, ttl=args.height_cache_ttl,
+    precision=args.height_cache_precision, cell_cache_size=args.cell_cache_size)
+
+def build_payload(msg:dict) -> dict:
+    """
+    レスポンスデータをJSONにシリアライズし、gzip圧縮版・ETagとともに返却する。
+
+    Parameters
+    ----
+    msg:dict
+        レスポンスデータ
+
+    Returns
+    ----
+    dict
+        'raw': JSON(bytes)、'gzip': gzip圧縮したJSON(bytes)、'etag': ETag文字列
+    """
+    with metrics.timer('http_serialize_seconds', endpoint='payload'):
+        raw = json.dumps(msg, separators=(',', ':')).encode('utf-8')
+    return {
+        'raw': raw,
+        'gzip': gzip.compress(raw, compresslevel=9),
+        'etag': hashlib.sha1(raw).hexdigest(),
+    }
+
+def build_scatter2d_payload(manager:HeightManager) -> dict:
+    """
+    平面散布図データ(JSON)を生成し、gzip圧縮版・ETagとともに返却する。
+    起動時に1回だけ実行し、リクエストごとのシリアライズを行わない。
+
+    Parameters
+    ----
+    manager:HeightManager
+        ジオイドモデル管理クラスのインスタンス
+
+    Returns
+    ----
+    dict
+        build_payload の戻り値
+    """
+    # x:経度、y:緯度(ブラウザでの描画に十分な小数点以下6桁に丸める)
+    (x, y, _) = manager.convert_xyz()
+    return build_payload({'data': [np.round(x, 6).tolist(), np.round(y, 6).tolist()]})
+
+@functools.lru_cache(maxsize=args.tile_cache_size)
+def build_tile_payload(z:int, x:int, y:int) -> dict:
+    """
+    タイルデータ(JSON)を生成し、gzip圧縮版・ETagとともに返却する。
+    生成結果は (z, x, y) をキーに LRU キャッシュする。
+
+    Parameters
+    ----
+    z:int
+        ズームレベル
+    x:int
+        経度方向のタイル番号(西から東)
+    y:int
+        緯度方向のタイル番号(北から南)
+
+    Returns
+    ----
+    dict
+        build_payload の戻り値
+
+    Raises
+    ----
+    ValueError
+        ズームレベル・タイル番号が範囲外の場合
+    """
+    bounds = mgr.get_tile_bounds(z, x, y)
+    (lons, lats, heights) = mgr.get_tile(z, x, y, size=args.tile_size)
+    return build_payload({
+        'z': z, 'x': x, 'y': y,
+        'max_z': int(np.log2(mgr.get_tile_extent() // args.tile_size)),
+        'bounds': [round(v, 6) for v in bounds],
+        'data': [np.round(lons, 6).tolist(), np.round(lats, 6).tolist(), np.round(heights, 4).tolist()],
+    })
+
+def make_payload_response(payload:dict) -> Response:
+    """
+    build_payload で生成したデータのレスポンスを生成する。
+    クライアントが対応していればgzip圧縮版を返却し、
+    ETag/Cache-Control によりブラウザ・プロキシでのキャッシュを可能にする。
+
+    Parameters
+    ----
+    payload:dict
+        build_payload の戻り値
+
+    Returns
+    ----
+    Response
+        レスポンス
+    """
+    etag = payload['etag']
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(payload['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload['raw'], mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    response.vary.add('Accept-Encoding')
+    return response
 
 # 2次元散布図データを取得
-(x, y, z) = mgr.convert_xyz()
-lats = list(x)
-lots = list(y)
-hgts = list(z)
-scatter2d_data = []
-total = len(lats)
-for i in range(total):
-    scatter2d_data.append({'x':float(lats[i]), 'y':float(lots[i])})
-print(scatter2d_data)
-#msg = {'data': [list(lats), list(lots)]}
-msg = {'data': [lats, lots]}
+scatter2d_payload = build_scatter2d_payload(mgr)
+
+def get_tile_cache_hit_ratio() -> float:
+    """
+    タイルの LRU キャッシュのヒット率を返却する(metrics のゲージ)。
+    """
+    info = build_tile_payload.cache_info()
+    total = info.hits + info.misses
+    return info.hits / total if total > 0 else 0.0
+
+# タイルの LRU キャッシュの状態を /metrics で出力する
+metrics.REGISTRY.gauge('tile_cache_hits', lambda: build_tile_payload.cache_info().hits, 'Tile LRU cache hits')
+metrics.REGISTRY.gauge('tile_cache_misses', lambda: build_tile_payload.cache_info().misses, 'Tile LRU cache misses')
+metrics.REGISTRY.gauge('tile_cache_size', lambda: build_tile_payload.cache_info().currsize, 'Tiles in LRU cache')
+metrics.REGISTRY.gauge('tile_cache_hit_ratio', get_tile_cache_hit_ratio, 'Tile LRU cache hit ratio')
+
+# /height の結果キャッシュの状態を /metrics で出力する
+metrics.REGISTRY.gauge('height_cache_hits', lambda: height_cache.cache_info().hits, '/height result cache hits')
+metrics.REGISTRY.gauge('height_cache_misses', lambda: height_cache.cache_info().misses, '/height result cache misses')
+metrics.REGISTRY.gauge('height_cache_expired', lambda: height_cache.cache_info().expired,
+    '/height result cache entries dropped by TTL')
+metrics.REGISTRY.gauge('height_cache_size', lambda: height_cache.cache_info().currsize, '/height results in LRU cache')
+metrics.REGISTRY.gauge('height_cache_hit_ratio', height_cache.get_hit_ratio, '/height result cache hit ratio')
+metrics.REGISTRY.gauge('height_cell_cache_hits', lambda: height_cache.cache_info().cell_hits,
+    '/height grid cell cache hits')
+metrics.REGISTRY.gauge('height_cell_cache_misses', lambda: height_cache.cache_info().cell_misses,
+    '/height grid cell cache misses')
 
 # アプリケーションオブジェクト生成
 app = Flask(__name__)
 # session 用シークレットキー
 app.secret_key='japan_geoid_model_web_ui'
 
+@app.before_request
+def start_timer():
+    """
+    リクエストの処理時間の計測を開始する。
+    """
+    if metrics.REGISTRY.enabled:
+        g.start = time.perf_counter()
+
+@app.after_request
+def record_request(response:Response) -> Response:
+    """
+    リクエストの件数・処理時間を記録する。
+    """
+    if metrics.REGISTRY.enabled and 'start' in g:
+        labels = {
+            'endpoint': request.url_rule.rule if request.url_rule is not None else 'unknown',
+            'method': request.method,
+            'status': str(response.status_code),
+        }
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - g.start, **labels)
+        metrics.increment('http_requests_total', **labels)
+    return response
+
 
 
 @app.route('/', methods=['GET'])
@@ -48,24 +219,131 @@ def show_index():
     # templates/index.html を表示する
     return render_template('index.html')
 
-@app.route('/scatter2d_data', methods=['POST'])
+@app.route('/scatter2d_data', methods=['GET', 'POST'])
 def get_scatter2d_data():
-    return jsonify(msg)
+    """
+    平面散布図データを返却する。
+    起動時に生成したJSONをそのまま返却する。
+    """
+    return make_payload_response(scatter2d_payload)
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_tile(z:int, x:int, y:int):
+    """
+    タイル単位のジオイド高を返却する。
+    ズームレベル z では全域を 2**z x 2**z 枚に分割し(x:西から東、y:北から南)、
+    低ズームではブロック平均で間引いた点を返却する。
+    レスポンス(JSON):
+        {"z", "x", "y", "max_z": 間引きなしとなるズームレベル,
+         "bounds": [西端経度, 南端緯度, 東端経度, 北端緯度],
+         "data": [[経度, ...], [緯度, ...], [ジオイド高, ...]]}
+    """
+    try:
+        payload = build_tile_payload(z, x, y)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    return make_payload_response(payload)
 
 @app.route('/height', methods=['POST'])
 def get_height():
     """
     ジオイド高を返却する。
+    リクエストボディ(JSON): {"latitude": 緯度, "longitude": 経度, "method": 内挿方法(省略時は "bilinear"、--methods で指定したもの)}
+    レスポンス(JSON): {"latitude": 緯度, "longitude": 経度, "height": ジオイド高}
+    範囲外の場合はステータス400とエラーメッセージを返却する。
+    ジオイド高は緯度・経度を --height_cache_precision 桁に丸めて算出し、LRU キャッシュする
+    (レスポンスの緯度・経度は算出に使用した丸めた値)。
     """
     # パラメータの取得
-    req = request.json
-    latitude = float(req.get('latitude'))
-    longitude = float(req.get('longitude'))
+    req = request.get_json(silent=True) or {}
+    try:
+        latitude = float(req.get('latitude'))
+        longitude = float(req.get('longitude'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'latitude and longitude are required'}), 400
+    # nan・inf は JSON で返却できないため内挿前に拒否する
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return jsonify({'error': 'latitude and longitude must be finite numbers'}), 400
+    method = req.get('method', 'bilinear')
+    if method not in interpolation_methods:
+        return jsonify({'error': f'method must be one of {interpolation_methods}'}), 400
+    (latitude, longitude) = height_cache.quantize(latitude, longitude)
     try:
-        height = mgr.interpolate(latitude, longitude)
-        return height
+        height = height_cache.interpolate(latitude, longitude, method=method)
     except ValueError as e:
-        print(f'target out of range:({latitude},{longitude})')
+        if args.debug:
+            print(f'target out of range:({latitude},{longitude})')
+        return jsonify({'latitude': latitude, 'longitude': longitude, 'error': str(e)}), 400
+    return jsonify({'latitude': latitude, 'longitude': longitude, 'height': height})
+
+@app.route('/heights', methods=['POST'])
+def get_heights():
+    """
+    複数地点のジオイド高を一括で返却する。
+
+    リクエストボディ(JSON):
+        {"latitudes": [緯度, ...], "longitudes": [経度, ...]} または
+        {"points": [[緯度, 経度], ...]}
+        ("method" で --methods で指定した内挿方法を指定できる。省略時は "bilinear")
+    レスポンス(JSON):
+        {"count": 件数, "heights": [ジオイド高またはnull, ...], "errors": [エラー有無, ...]}
+
+    リクエストボディ(Content-Type: application/octet-stream):
+        緯度、経度の順に並べた little-endian float64 の組の並び(内挿方法はクエリ文字列 method で指定)
+    レスポンス(application/octet-stream):
+        ジオイド高の little-endian float64 の並び（範囲外・データなしは NaN）
+    """
+    if request.mimetype == 'application/octet-stream':
+        # バイナリ形式: (緯度, 経度) float64 の組
+        body = request.get_data()
+        if len(body) % 16 != 0:
+            return jsonify({'error': 'body must be pairs of little-endian float64'}), 400
+        method = request.args.get('method', 'bilinear')
+        if method not in interpolation_methods:
+            return jsonify({'error': f'method must be one of {interpolation_methods}'}), 400
+        points = np.frombuffer(body, dtype='<f8').reshape(-1, 2)
+        heights = mgr.interpolate_many(points[:, 0], points[:, 1], method=method)
+        return Response(heights.astype('<f8').tobytes(), mimetype='application/octet-stream')
+
+    # JSON形式
+    req = request.get_json(silent=True)
+    try:
+        if isinstance(req, dict) and 'points' in req:
+            points = np.asarray(req['points'], dtype=np.float64)
+            if points.ndim != 2 or points.shape[1] != 2:
+                raise ValueError('points must be a list of [latitude, longitude] pairs')
+            (latitudes, longitudes) = (points[:, 0], points[:, 1])
+        else:
+            latitudes = np.asarray(req['latitudes'], dtype=np.float64)
+            longitudes = np.asarray(req['longitudes'], dtype=np.float64)
+            if latitudes.ndim != 1 or latitudes.shape != longitudes.shape:
+                raise ValueError('latitudes and longitudes must have the same length')
+        method = req.get('method', 'bilinear')
+        if method not in interpolation_methods:
+            raise ValueError(f'method must be one of {interpolation_methods}')
+    except (TypeError, KeyError, ValueError) as e:
+        return jsonify({'error': f'invalid request: {e}'}), 400
+
+    heights = mgr.interpolate_many(latitudes, longitudes, method=method)
+    with metrics.timer('http_serialize_seconds', endpoint='/heights'):
+        errors = np.isnan(heights)
+        body = {
+            'count': int(heights.size),
+            'heights': [None if error else height for (height, error) in zip(heights.tolist(), errors.tolist())],
+            'errors': errors.tolist(),
+        }
+        text = json.dumps(body, separators=(',', ':'))
+    return Response(text, mimetype='application/json')
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    処理時間・件数を Prometheus のテキスト形式で返却する。
+    計測が無効(--metrics なし)の場合はステータス404を返却する。
+    """
+    if not metrics.REGISTRY.enabled:
+        return jsonify({'error': 'metrics are disabled'}), 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == '__main__':
     """
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+geoid.py (Height Manager)・dem/mesh.py (Mesh)ベンチマークスイート
+
+synthetic.py で生成した合成データ(日本のジオイド2011と同じレイアウトの .asc、
+基盤地図情報数値標高モデルと同じレイアウトの GML)を使い、
+読み込み時間、ピークメモリ(RSS)、1点内挿のレイテンシ(パーセンタイル)、
+一括内挿の処理性能(点/秒)、保存の処理性能(MB/秒)を計測する。
+改修前の方式(1要素・1点・1行づつのループ)との比較、interpolate_parallel のワーカプロセス数ごとの
+処理性能も計測する(--path で実データのジオイドデータファイルを指定できる)。
+ピークメモリを分けて計測するため、各ベンチマークは個別のプロセスで実行する。
+
+python benchmark.py                  # 実行して結果を表示
+python benchmark.py --save main      # 結果を .benchmarks/main.json に保存
+python benchmark.py --compare main   # 保存した結果と比較し、低下した項目があれば終了コード1
+python benchmark.py --compare        # リポジトリの参照ベースライン(benchmark_baseline.json)と比較
+"""
+import os
+import sys
+import json
+import time
+import platform
+import numpy as np
+
+"""
+合成データ・ベースラインの保存先ディレクトリ
+"""
+BENCH_DIR = '.benchmarks'
+
+"""
+リポジトリに含める参照ベースライン(--scale 1.0、既定の --repeat/--count で計測)
+"""
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+def prepare_fixtures(scale:float=1.0, directory:str=BENCH_DIR) -> dict:
+    """
+    合成データファイルを作成する(作成済みの場合は再利用する)。
+    scale=1.0 で実データと同じ大きさ(ジオイド 1801×1201、DEM 1125×750)となる。
+
+    Parameters
+    ----
+    scale:float
+        実データに対する縦横の大きさの比率
+    directory:str
+        保存先ディレクトリ
+
+    Returns
+    ----
+    dict
+        'asc': ジオイドデータファイルパス、'gml': DEMファイルパス
+    """
+    # ワーカプロセスのメモリ使用量に影響しないよう、ここで import する
+    from synthetic import write_geoid_asc, write_dem_gml
+    os.makedirs(directory, exist_ok=True)
+    nla = max(int(1801 * scale), 31)
+    nlo = max(int(1201 * scale), 21)
+    (nx, ny) = (max(int(1125 * scale), 5), max(int(750 * scale), 4))
+    paths = {'asc': os.path.join(directory, f'synthetic_{nla}x{nlo}.asc'),
+        'gml': os.path.join(directory, f'synthetic_dem_{nx}x{ny}.xml')}
+    if not os.path.exists(paths['asc']):
+        write_geoid_asc(paths['asc'] + '.tmp', nla, nlo)
+        os.replace(paths['asc'] + '.tmp', paths['asc'])
+    if not os.path.exists(paths['gml']):
+        write_dem_gml(paths['gml'] + '.tmp', shape=(nx, ny))
+        os.replace(paths['gml'] + '.tmp', paths['gml'])
+    return paths
+
+def _best_of(func, repeat:int) -> float:
+    """
+    関数を repeat 回実行し、最短の実行時間(秒)を返却する。
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+def _latency(func, latitudes:np.ndarray, longitudes:np.ndarray) -> dict:
+    """
+    1点づつ関数を呼び出し、レイテンシのパーセンタイル(マイクロ秒)を返却する。
+    """
+    elapsed = np.empty(len(latitudes))
+    clock = time.perf_counter_ns
+    for i in range(len(latitudes)):
+        (lat, lon) = (float(latitudes[i]), float(longitudes[i]))
+        start = clock()
+        try:
+            func(lat, lon)
+        except ValueError:
+            pass
+        elapsed[i] = clock() - start
+    (p50, p90, p99) = np.percentile(elapsed, [50, 90, 99]) / 1000.0
+    return {'latency_p50_us': p50, 'latency_p90_us': p90, 'latency_p99_us': p99}
+
+def _peak_rss_mb() -> float:
+    """
+    自プロセスのピークメモリ(RSS、MB)を返却する。取得できない環境では None。
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト、Linux はキロバイト
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+def _export_rate(func, path:str, repeat:int, sidecars:tuple=()) -> float:
+    """
+    保存処理の性能(MB/秒)を返却し、保存したファイル(メタ情報などの付随ファイルを含む)を削除する。
+    """
+    elapsed = _best_of(func, repeat)
+    size = os.path.getsize(path) / 1024 / 1024
+    for name in (path, *sidecars):
+        os.remove(name)
+    return size / elapsed
+
+def bench_geoid_load(paths:dict, repeat:int, count:int) -> dict:
+    """
+    ジオイドデータファイル読み込み(ASCII形式・バイナリキャッシュ)。
+    """
+    from geoid import HeightManager
+    parse = _best_of(lambda: HeightManager(paths['asc'], cache=False), repeat)
+    peak = _peak_rss_mb()
+    HeightManager(paths['asc']) # キャッシュ作成
+    cached = _best_of(lambda: HeightManager(paths['asc']), repeat)
+    return {'load_sec': parse, 'load_cached_sec': cached, 'peak_rss_mb': peak}
+
+def bench_geoid_interpolate(paths:dict, repeat:int, count:int) -> dict:
+    """
+    ジオイド高内挿(1点づつのレイテンシ、一括内挿・格子内挿の処理性能)。
+    """
+    from geoid import HeightManager
+    mgr = HeightManager(paths['asc'])
+    rng = np.random.default_rng(0)
+    (lats, lons) = (rng.uniform(24.0, 46.0, count), rng.uniform(123.0, 146.0, count))
+    result = _latency(mgr.interpolate, lats[:10000], lons[:10000])
+    many = _best_of(lambda: mgr.interpolate_many(lats, lons), repeat)
+    (grid_lats, grid_lons) = (np.linspace(35.0, 36.0, 1000), np.linspace(139.0, 140.0, max(count // 1000, 1)))
+    grid = _best_of(lambda: mgr.interpolate_grid(grid_lats, grid_lons), repeat)
+    result['interpolate_many_points_per_sec'] = count / many
+    result['interpolate_grid_points_per_sec'] = grid_lats.size * grid_lons.size / grid
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+def bench_geoid_export(paths:dict, repeat:int, count:int) -> dict:
+    """
+    ジオイドモデルの変換・保存(CSV、GeoJSON、バイナリグリッド)。
+    """
+    from geoid import HeightManager
+    mgr = HeightManager(paths['asc'])
+    convert = _best_of(lambda: (setattr(mgr, '_xyz', None), mgr.convert_xyz()), repeat)
+    output = os.path.join(BENCH_DIR, 'output')
+    return {
+        'convert_xyz_sec': convert,
+        'save_csv_mb_per_sec': _export_rate(lambda: mgr.save(output + '.csv'), output + '.csv', repeat),
+        'save_geojson_mb_per_sec': _export_rate(lambda: mgr.save_geojson(output + '.json'), output + '.json', repeat),
+        'save_grid_mb_per_sec': _export_rate(lambda: mgr.save_grid(output + '.npy'), output + '.npy', repeat,
+            sidecars=(output + '.json',)),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+def _legacy_load(path:str) -> list:
+    """
+    改修前の HeightManager.__init__ と同じ方式(1要素づつ re.split/float)で
+    ジオイドデータファイルを読み込む。比較用。
+    """
+    import re
+    with open(path, 'r', encoding='utf-8') as f:
+        tokens = re.split(' +', f.readline().strip())
+        nlo = int(float(tokens[5]))
+        idx = 0
+        row = []
+        rows = []
+        for line in f.readlines():
+            for token in re.split(' +', line.strip()):
+                row.append(float(token))
+                idx = idx + 1
+                if idx < nlo:
+                    continue
+                idx = 0
+                rows.append(row)
+                row = []
+    return rows
+
+def _legacy_gpd(mgr, crs:str='EPSG:4326'):
+    """
+    改修前の HeightManager.get_gpd と同じ方式(1点づつ Point 生成)で
+    GeoDataFrame を生成する。比較用。
+    """
+    import geopandas as gpd
+    from shapely.geometry import Point
+    (x, y, z) = mgr.convert_xyz()
+    geometry = []
+    for i in range(len(x)):
+        geometry.append(Point(x[i], y[i]))
+    return gpd.GeoDataFrame({'height':z, 'geometry':geometry}, crs=crs)
+
+def _legacy_save(mgr, path:str) -> None:
+    """
+    改修前の HeightManager.save と同じ方式(1行づつ csv.writer)で
+    CSVファイルを保存する。比較用。
+    """
+    import csv
+    (x, y, z) = mgr.convert_xyz()
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=',')
+        for i in range(len(x)):
+            writer.writerow([x[i], y[i], z[i]])
+
+def bench_geoid_legacy(paths:dict, repeat:int, count:int) -> dict:
+    """
+    改修前の方式(読み込み、GeoDataFrame 生成、CSV・GeoJSON保存)。geoid_load・geoid_export と比較する。
+    改修前の方式は時間がかかるため1回だけ実行する。
+    """
+    from geoid import HeightManager
+    load = _best_of(lambda: _legacy_load(paths['asc']), 1)
+    mgr = HeightManager(paths['asc'])
+    mgr.convert_xyz() # 変換結果を保持させ、GeoDataFrame生成のみを計測する
+    output = os.path.join(BENCH_DIR, 'output')
+    return {
+        'load_legacy_sec': load,
+        'get_gpd_legacy_sec': _best_of(lambda: _legacy_gpd(mgr), 1),
+        'get_gpd_sec': _best_of(lambda: mgr.get_gpd(), repeat),
+        'save_csv_legacy_mb_per_sec': _export_rate(lambda: _legacy_save(mgr, output + '.csv'), output + '.csv', 1),
+        'save_geojson_gpd_mb_per_sec': _export_rate(
+            lambda: mgr.get_gpd().to_file(driver='GeoJSON', filename=output + '.json'), output + '.json', 1),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+def bench_geoid_parallel(paths:dict, repeat:int, count:int) -> dict:
+    """
+    ワーカプロセス数(1, 2, 4, .. CPU数)ごとの interpolate_parallel の処理性能。
+    """
+    from geoid import HeightManager
+    mgr = HeightManager(paths['asc'])
+    rng = np.random.default_rng(0)
+    (lats, lons) = (rng.uniform(24.0, 46.0, count), rng.uniform(123.0, 146.0, count))
+    max_workers = os.cpu_count() or 1
+    chunk_size = max(count // (max_workers * 4), 1)
+    result = {}
+    workers = 1
+    while workers <= max_workers:
+        elapsed = _best_of(lambda: mgr.interpolate_parallel(lats, lons, workers=workers, chunk_size=chunk_size),
+            repeat)
+        result[f'parallel_w{workers}_points_per_sec'] = count / elapsed
+        workers = workers * 2
+    return result
+
+def bench_mesh_load(paths:dict, repeat:int, count:int) -> dict:
+    """
+    DEMファイル(GML形式)読み込み。
+    """
+    from dem.mesh import Mesh
+    elapsed = _best_of(lambda: Mesh(paths['gml']), repeat)
+    size = Mesh(paths['gml']).z.size
+    return {'load_sec': elapsed, 'load_points_per_sec': size / elapsed,
+        'load_mb_per_sec': os.path.getsize(paths['gml']) / 1024 / 1024 / elapsed, 'peak_rss_mb': _peak_rss_mb()}
+
+def bench_mesh_interpolate(paths:dict, repeat:int, count:int) -> dict:
+    """
+    DEM標高内挿(1点づつのレイテンシ、一括内挿の処理性能)。
+    """
+    from dem.mesh import Mesh
+    mesh = Mesh(paths['gml'])
+    rng = np.random.default_rng(0)
+    (lats, lons) = (rng.uniform(35.666666667, 35.75, count), rng.uniform(139.625, 139.75, count))
+    result = _latency(mesh.interpolate, lats[:10000], lons[:10000])
+    many = _best_of(lambda: mesh.interpolate_many(lats, lons), repeat)
+    result['interpolate_many_points_per_sec'] = count / many
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+def bench_mesh_export(paths:dict, repeat:int, count:int) -> dict:
+    """
+    DEMの保存(CSV、GeoJSON)。
+    """
+    from dem.mesh import Mesh
+    mesh = Mesh(paths['gml'])
+    output = os.path.join(BENCH_DIR, 'output')
+    return {
+        'save_csv_mb_per_sec': _export_rate(lambda: mesh.save_csv(output + '.csv'), output + '.csv', repeat),
+        'save_geojson_mb_per_sec': _export_rate(lambda: mesh.save_geojson(output + '.json'), output + '.json', repeat),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+"""
+ベンチマーク名 -> 関数
+"""
+BENCHMARKS = {
+    'geoid_load': bench_geoid_load,
+    'geoid_interpolate': bench_geoid_interpolate,
+    'geoid_export': bench_geoid_export,
+    'geoid_legacy': bench_geoid_legacy,
+    'geoid_parallel': bench_geoid_parallel,
+    'mesh_load': bench_mesh_load,
+    'mesh_interpolate': bench_mesh_interpolate,
+    'mesh_export': bench_mesh_export,
+}
+
+def _run_one(name:str, paths:dict, repeat:int, count:int) -> dict:
+    """
+    ベンチマークを1つ実行する(ワーカプロセスで実行される)。
+    """
+    return BENCHMARKS[name](paths, repeat, count)
+
+def run(names:list=None, scale:float=1.0, repeat:int=3, count:int=1000000, path:str=None) -> dict:
+    """
+    ベンチマークを個別のプロセスで順に実行する。
+
+    Parameters
+    ----
+    names:list
+        実行するベンチマーク名のリスト（デフォルト: None、すべて）
+    scale:float
+        合成データの実データに対する縦横の大きさの比率
+    repeat:int
+        繰り返し回数（最短時間を採用する）
+    count:int
+        一括内挿の点数
+    path:str
+        ジオイドのベンチマークに使用するジオイドデータファイルパス（デフォルト: None、合成データ）
+
+    Returns
+    ----
+    dict
+        'environment': 実行環境、'results': ベンチマーク名 -> {計測項目 -> 値}
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    paths = prepare_fixtures(scale)
+    if path is not None:
+        paths['asc'] = path
+    results = {}
+    for name in (names or list(BENCHMARKS)):
+        # 前のベンチマークのメモリ使用量の影響を受けないよう、新しいプロセスで実行する
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[name] = executor.submit(_run_one, name, paths, repeat, count).result()
+        _print_results({name: results[name]})
+    environment = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scale': scale,
+        'repeat': repeat,
+        'count': count,
+        'path': path,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'environment': environment, 'results': results}
+
+def _print_results(results:dict) -> None:
+    """
+    計測結果を表示する。
+    """
+    for (name, metrics) in results.items():
+        for (metric, value) in metrics.items():
+            print(f'{name:20s} {metric:34s} {"-" if value is None else f"{value:16,.3f}"}')
+
+def _get_baseline_path(name:str) -> str:
+    """
+    --save/--compare で指定されたベースライン名のファイルパスを返却する。
+    None の場合は参照ベースライン、.json で終わる場合はファイルパスとみなす。
+    """
+    if name is None:
+        return BASELINE_PATH
+    if name.endswith('.json'):
+        return name
+    return os.path.join(BENCH_DIR, name + '.json')
+
+def _higher_is_better(metric:str) -> bool:
+    """
+    計測項目が大きいほど良い(処理性能)か判定する。
+    """
+    return metric.endswith('_per_sec')
+
+def compare(baseline:dict, current:dict, threshold:float=0.1) -> list:
+    """
+    ベースラインと比較した結果を表示し、threshold(比率)を超えて低下した項目を返却する。
+
+    Parameters
+    ----
+    baseline:dict
+        ベースライン(run の返却値)
+    current:dict
+        今回の結果(run の返却値)
+    threshold:float
+        低下とみなす比率
+
+    Returns
+    ----
+    list
+        低下した (ベンチマーク名, 計測項目) のリスト
+    """
+    regressions = []
+    for (name, metrics) in current['results'].items():
+        for (metric, value) in metrics.items():
+            base = baseline['results'].get(name, {}).get(metric)
+            if value is None or base is None or base == 0:
+                continue
+            # 1.0 より大きいほど改善
+            ratio = value / base if _higher_is_better(metric) else base / value
+            flag = ''
+            if ratio < 1.0 - threshold:
+                flag = 'REGRESSION'
+                regressions.append((name, metric))
+            elif ratio > 1.0 + threshold:
+                flag = 'improved'
+            print(f'{name:20s} {metric:34s} {base:16,.3f} -> {value:16,.3f} ({ratio:5.2f}x) {flag}')
+    return regressions
+
+if __name__ == '__main__':
+    """
+    ベンチマークを実行する。
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='geoid.py / dem/mesh.py benchmark suite with synthetic data')
+    parser.add_argument('--bench', type=str, nargs='*', default=None, choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic data size ratio to the real data')
+    parser.add_argument('--repeat', type=int, default=3, help='repeat count (best time is reported)')
+    parser.add_argument('--count', type=int, default=1000000, help='number of points for batch benchmarks')
+    parser.add_argument('--path', type=str, default=None, help='Japan Geoid Height data file(asc) path for geoid benchmarks (default: synthetic)')
+    parser.add_argument('--save', type=str, default=None, help=f'save results as baseline {BENCH_DIR}/<name>.json (or <path>.json)')
+    parser.add_argument('--compare', type=str, nargs='?', default=False, const=None,
+        help=f'compare results with baseline {BENCH_DIR}/<name>.json (or <path>.json, default: {os.path.basename(BASELINE_PATH)})')
+    parser.add_argument('--threshold', type=float, default=0.1, help='ratio regarded as a regression')
+    args = parser.parse_args()
+
+    current = run(args.bench, scale=args.scale, repeat=args.repeat, count=args.count, path=args.path)
+    if args.save is not None:
+        with open(_get_baseline_path(args.save), 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    if args.compare is not False:
+        path = _get_baseline_path(args.compare)
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f'compare with {path} ({baseline["environment"]["time"]})')
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
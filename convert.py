@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+基盤地図情報数値標高モデル(標高、正標高)と日本のジオイド2011から
+楕円体高を算出する、またはその逆を行うための変換モジュール。
+
+楕円体高 = 標高(正標高) + ジオイド高
+"""
+import json
+import os
+import numpy as np
+
+from geoid import HeightManager
+from dem.mesh import Mesh, Mosaic, atomic_open
+
+
+def convert_raster(manager:HeightManager, raster, ellipsoidal:bool=True,
+    path:str=None, chunk_rows:int=1024, debug:bool=False) -> np.ndarray:
+    """
+    タイル(Mesh)またはモザイク(Mosaic)の標高ラスタ全体を、ジオイド高を加算して楕円体高へ、
+    または減算して正標高へ変換する。
+    ジオイド高は点ごとではなく、ラスタの緯度・経度の座標軸から HeightManager.interpolate_grid で
+    chunk_rows 行づつ算出するため、ジオイドの格子より細かい DEM でも計算量が少ない。
+    ラスタがデータなし、またはジオイド高が算出できないメッシュはデータなし(-9999.0)とする。
+
+    Parameters
+    ----
+    manager:HeightManager
+        ジオイドモデル
+    raster
+        タイル(Mesh)またはモザイク(Mosaic)
+    ellipsoidal:bool
+        True の場合は楕円体高へ、False の場合は(楕円体高のラスタを)正標高へ変換する
+    path:str
+        保存先ファイルパス(.npy)。指定した場合はディスク上のラスタ(メモリマップ)へ書き込み、
+        メタ情報を Mosaic.open で開ける形式で拡張子を .json に置き換えたファイルに(一時ファイルから置き換えて)保存する
+    chunk_rows:int
+        一度に変換する行数
+    debug:bool
+        デバッグオプション
+
+    Returns
+    ----
+    np.ndarray
+        変換後のラスタ（float32、形状はラスタと同じ）
+    """
+    z = raster.z
+    if path is None:
+        heights = np.empty(z.shape, dtype=np.float32)
+    else:
+        heights = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=z.shape)
+    sign = 1.0 if ellipsoidal else -1.0
+
+    for start in range(0, z.shape[0], chunk_rows):
+        stop = min(start + chunk_rows, z.shape[0])
+        geoid = manager.interpolate_grid(raster.latitudes[start:stop], raster.longitudes)
+        block = np.asarray(z[start:stop], dtype=np.float64)
+        ok = (block > Mesh.NO_DATA) & ~np.isnan(geoid)
+        heights[start:stop] = np.where(ok, block + sign * geoid, Mesh.NO_DATA)
+        if path is not None:
+            heights.flush()
+
+    if path is not None:
+        delta = raster.get_delta() if isinstance(raster, Mesh) else raster.delta
+        meta = {
+            'lower': [min(raster.lower[0], raster.upper[0]), min(raster.lower[1], raster.upper[1])],
+            'upper': [max(raster.lower[0], raster.upper[0]), max(raster.lower[1], raster.upper[1])],
+            'delta': list(delta),
+            'shape': list(z.shape),
+            'dtype': heights.dtype.str,
+            'no_data': Mesh.NO_DATA,
+            'tiles': [raster.mesh_no] if isinstance(raster, Mesh) else raster.tiles,
+            'height': 'ellipsoidal' if ellipsoidal else 'orthometric',
+        }
+        with atomic_open(os.path.splitext(path)[0] + '.json') as f:
+            json.dump(meta, f)
+    if debug:
+        print(f'converted {z.shape} raster to {"ellipsoidal" if ellipsoidal else "orthometric"} height')
+    return heights
+
+def to_ellipsoidal(manager:HeightManager, raster, path:str=None, chunk_rows:int=1024,
+    debug:bool=False) -> np.ndarray:
+    """
+    標高(正標高)のラスタを楕円体高へ変換する(convert_raster 参照)。
+    """
+    return convert_raster(manager, raster, ellipsoidal=True, path=path, chunk_rows=chunk_rows, debug=debug)
+
+def to_orthometric(manager:HeightManager, raster, path:str=None, chunk_rows:int=1024,
+    debug:bool=False) -> np.ndarray:
+    """
+    楕円体高のラスタを標高(正標高)へ変換する(convert_raster 参照)。
+    """
+    return convert_raster(manager, raster, ellipsoidal=False, path=path, chunk_rows=chunk_rows, debug=debug)
+
+if __name__ == '__main__':
+    """
+    DEMファイル(.xml)またはモザイク(.npy)の標高を楕円体高へ変換し、.npy 形式で保存する。
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='convert DEM orthometric heights to ellipsoidal heights with Japan geoid')
+    parser.add_argument('input', type=str, help='DEM file(xml) or mosaic raster file(npy) path')
+    parser.add_argument('output', type=str, help='output raster file(npy) path')
+    parser.add_argument('--path', type=str, default='gsigeo2011_ver2_1.asc', help='Japan Geoid Height data file(asc) path')
+    parser.add_argument('--orthometric', action='store_true', help='convert ellipsoidal heights to orthometric heights')
+    parser.add_argument('--chunk_rows', type=int, default=1024, help='rows per chunk')
+    parser.add_argument('--debug', type=bool, default=False, help='print debug lines')
+    args = parser.parse_args()
+
+    manager = HeightManager(path=args.path, debug=args.debug)
+    if args.input.endswith('.npy'):
+        raster = Mosaic.open(args.input, debug=args.debug)
+    else:
+        raster = Mesh(args.input, debug=args.debug)
+    convert_raster(manager, raster, ellipsoidal=not args.orthometric, path=args.output,
+        chunk_rows=args.chunk_rows, debug=args.debug)
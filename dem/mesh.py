@@ -3,16 +3,27 @@
 国土交通省国土地理院基盤地図情報数値標高モデルを
 扱うためのユーティリティモジュール。
 """
-import gc
+import io
 import os
-import csv
+import sys
+import gzip
+import json
+import math
+import time
+import zipfile
+import contextlib
 import numpy as np
-import xml.etree.ElementTree as ET
+from xml.parsers import expat
 import matplotlib.pyplot as plt
 
 import geopandas as gpd
-from shapely.geometry import Point
 
+try:
+    import metrics
+except ImportError:
+    # dem/mesh.py を直接実行した場合は、リポジトリ直下の metrics.py を参照する
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import metrics
 
 class Mesh:
     """
@@ -26,7 +37,12 @@ class Mesh:
     """
     NO_DATA = -9999.0
 
-    def __init__(self, path:str=None, debug:bool=False) -> None:
+    """
+    データなし時の種類
+    """
+    NO_DATA_TYPE = 'データなし'
+
+    def __init__(self, path:str=None, debug:bool=False, fileobj=None) -> None:
         """
         
         """
@@ -35,75 +51,73 @@ class Mesh:
 
         # GMLファイルを読み込みメタ情報及びデータを
         # インスタンス変数へ格納
-        self.load(path)
+        self.load(path, fileobj=fileobj)
 
-        # メタ情報から緯度経度リストを生成し
+        # メタ情報から緯度・経度の座標軸を生成し
         # インスタンス変数へ格納
-        (self.x, self.y) = self.create_xy(self.lower, self.upper, 
-            self.low, self.high, self.order)
+        with metrics.timer('mesh_load_seconds', phase='axes'):
+            (self.latitudes, self.longitudes) = self.create_xy(self.lower, self.upper,
+                self.low, self.high)
 
         # メタ情報表示
         if self.debug:
             self.show_meta()
     
-    def load(self, path:str) -> None:
+    def load(self, path:str, block_size:int=1 << 20, fileobj=None) -> None:
         """
         国土交通省国土地理院基盤地図情報数値標高モデルダウンロードファイル(GML形式)
         を読み込み、インスタンス変数へ格納する。
-        全件データ要素をインスタンス変数へ格納するため、メモリ不足に注意。
+        ファイルは block_size バイトづつパーサへ渡し、データ全要素(tupleList)は
+        DOMを構築せずに一定量づつ解析して事前確保した配列へ格納するため、
+        ピークメモリ使用量はほぼ最終的な配列のサイズとなる。
 
         Parameters
         ----
         path:str        読み込み対象ファイルパス
+        block_size:int  一度にパーサへ渡すバイト数
+        fileobj         読み込み対象のバイナリファイルオブジェクト(zipファイル内のファイル等)、
+                        指定した場合 path は名称としてのみ使用する
         """
         # XMLファイルパス
         self.path = path
 
-        # XMLスキーママッピング
-        prefix_map = {
-           'gml': 'http://www.opengis.net/gml/3.2',
-            '': 'http://fgd.gsi.go.jp/spec/2008/FGD_GMLSchema',
-            'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
-        }
-
         # XMLファイルのパース
-        root_element = ET.parse(path).getroot()
+        reader = _GmlReader()
+        with metrics.timer('mesh_load_seconds', phase='parse'):
+            if fileobj is not None:
+                reader.parse(fileobj, block_size)
+            else:
+                with open(path, 'rb') as f:
+                    reader.parse(f, block_size)
+        texts = reader.texts
 
         # データ名称
-        self.name = root_element.find('.//gml:name', prefix_map).text
+        self.name = texts['name']
         # データの説明
-        self.description = root_element.find('.//gml:description', prefix_map).text
+        self.description = texts['description']
         # メッシュ番号
-        self.mesh_no = root_element.find('.//mesh', prefix_map).text
+        self.mesh_no = texts['mesh']
         # データ種類
-        self.mesh_type = root_element.find('.//type', prefix_map).text
+        self.mesh_type = texts['type']
 
         # メッシュ矩形左下頂点位置
-        lower_element = root_element.find('.//gml:lowerCorner', prefix_map).text.split()
+        lower_element = texts['lowerCorner'].split()
         self.lower = [float(lower_element[0]), float(lower_element[1])]
         # メッシュ矩形右上頂点位置
-        upper_element = root_element.find('.//gml:upperCorner', prefix_map).text.split()
+        upper_element = texts['upperCorner'].split()
         self.upper = [float(upper_element[0]), float(upper_element[1])]
 
-        grid_element = root_element.find('.//gml:Grid', prefix_map)
-        low_coord = grid_element.find('.//gml:low', prefix_map).text.split()
-        high_coord = grid_element.find('.//gml:high', prefix_map).text.split()
-        axislavels_element = grid_element.find('.//gml:axisLabels', prefix_map).text.split()
-
         # データ始点位置、データ終点位置
-        if axislavels_element[0] == 'y':
+        self.low = [int(v) for v in texts['low'].split()]
+        self.high = [int(v) for v in texts['high'].split()]
+        if texts['axisLabels'].split()[0] == 'y':
             # 先頭ラベルが 'y' なら座標位置を置換
             self.low =  [self.low[1],  self.low[0]]
             self.high = [self.high[1], self.high[0]]
-        else:
-            self.low =  [int(low_coord[0]),  int(low_coord[1])]
-            self.high = [int(high_coord[0]), int(high_coord[1])]
-
-        seq_rule_element = root_element.find('.//gml:sequenceRule', prefix_map)
-        order_element = seq_rule_element.get('order')
 
         # メッシュデータの並び方
-        self.seq_rule = seq_rule_element.text
+        self.seq_rule = texts['sequenceRule']
+        order_element = reader.attrs['sequenceRule'].get('order', '')
 
         # メッシュデータの方向
         if '-x' in order_element and '-y' in order_element:
@@ -119,122 +133,171 @@ class Mesh:
             # X(緯度、横軸)方向正、Y(経度、縦軸)方向正
             self.order = [1, 1]
 
-        data_block_element = root_element.find('.//gml:DataBlock', prefix_map)
-
         # データ要素の種類
-        self.uom = data_block_element.find('.//gml:QuantityList', prefix_map).get('uom')
+        self.uom = reader.attrs['QuantityList'].get('uom')
+
+        # 種類コード表(type_codes の値 -> 種類名)
+        self.type_names = list(reader.type_names)
+        with metrics.timer('mesh_load_seconds', phase='arrange'):
+            (z, codes) = self._arrange(reader.z, reader.codes, reader.count, texts.get('startPoint', '0 0'))
+        metrics.increment('mesh_points_loaded_total', z.size)
+        # 各メッシュ点の標高(float32、行:北から南、列:西から東)
+        self.z = z
+        # 各メッシュ点の種別(uint8、種類コード表 type_names の添字)
+        self.type_codes = codes
+
+    def _arrange(self, z:np.ndarray, codes:np.ndarray, count:int,
+        start_point:str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        データ順に格納された標高・種類コードを開始位置(startPoint)分ずらし、
+        並び方(order)によらず北から南・西から東の順の2次元配列に並べ替える。
+        データが格納されていないメッシュ点は標高をデータなし(-9999.0)、
+        種類をデータなしとする。
+
+        Parameters
+        ----
+        z:np.ndarray
+            データ順の標高(グリッドの大きさ分確保済み)
+        codes:np.ndarray
+            データ順の種類コード(グリッドの大きさ分確保済み)
+        count:int
+            格納済み要素数
+        start_point:str
+            データ開始位置(X方向インデックス、Y方向インデックス)
+
+        Returns
+        ----
+        tuple[np.ndarray, np.ndarray]
+            標高、種類コードの2次元配列
+
+        Raises
+        ----
+        ValueError
+            データ要素が開始位置からグリッドに収まらない場合
+        """
+        shape = self.get_shape()
+        start = [int(v) for v in start_point.split()]
+        offset = (start[1] - self.low[1]) * shape[1] + (start[0] - self.low[0])
+        if offset < 0 or offset + count > z.size:
+            raise ValueError(f'{count} elements from startPoint {start_point} exceed grid {shape}')
+        if offset > 0:
+            z[offset:offset + count] = z[:count]
+            codes[offset:offset + count] = codes[:count]
+            z[:offset] = self.NO_DATA
+        if offset + count < z.size or offset > 0:
+            # 種類コード表にデータなしを加えて未格納のメッシュ点に割り当てる
+            if self.NO_DATA_TYPE not in self.type_names:
+                self.type_names.append(self.NO_DATA_TYPE)
+            no_data = self.type_names.index(self.NO_DATA_TYPE)
+            codes[:offset] = no_data
+            codes[offset + count:] = no_data
+
+        z = z.reshape(shape)
+        codes = codes.reshape(shape)
+        if self.order[0] < 0:
+            # 東から西の並びを反転
+            (z, codes) = (z[:, ::-1], codes[:, ::-1])
+        if self.order[1] > 0:
+            # 南から北の並びを反転
+            (z, codes) = (z[::-1, :], codes[::-1, :])
+        return (np.ascontiguousarray(z), np.ascontiguousarray(codes))
+
+    def get_shape(self) -> tuple[int, int]:
+        """
+        メッシュの大きさを返却する。
+
+        Returns
+        ----
+        tuple[int, int]
+            緯度方向(行)のメッシュ点の数、経度方向(列)のメッシュ点の数
+        """
+        return (self.high[1] - self.low[1] + 1, self.high[0] - self.low[0] + 1)
+
+    def get_delta(self) -> tuple[float, float]:
+        """
+        メッシュ間の距離を返却する。
+
+        Returns
+        ----
+        tuple[float, float]
+            緯度方向のメッシュ間の距離（単位：度）、経度方向のメッシュ間の距離（単位：度）
+        """
+        (rows, columns) = self.get_shape()
+        return (abs(self.upper[0] - self.lower[0]) / rows, abs(self.upper[1] - self.lower[1]) / columns)
 
-        # データ全要素
-        tupples = data_block_element.find('.//gml:tupleList', prefix_map).text.split()
+    @property
+    def types(self) -> np.ndarray:
+        """
+        各メッシュ点の種別（種類コードを種類名に変換した配列）。
+        """
+        return np.asarray(self.type_names, dtype=object)[self.type_codes]
 
-        # 各要素の種別
-        self.types = []
-        # 各要素の標高
-        self.z = []
-        for tupple in tupples:
-            point = tupple.strip().split(',')
-            self.types.append(point[0])
-            self.z.append(float(point[1]))
+    @property
+    def x(self) -> np.ndarray:
+        """
+        各メッシュ点の緯度（self.z と同じ形状）。
+        座標軸から生成する読み取り専用のビューで、メモリを消費しない。
+        """
+        return np.broadcast_to(self.latitudes[:, None], self.z.shape)
 
-        # ガーベージコレクション
-        del root_element, lower_element, upper_element, \
-            grid_element, axislavels_element, seq_rule_element, order_element, \
-            data_block_element, tupples
-        gc.collect()
+    @property
+    def y(self) -> np.ndarray:
+        """
+        各メッシュ点の経度（self.z と同じ形状）。
+        座標軸から生成する読み取り専用のビューで、メモリを消費しない。
+        """
+        return np.broadcast_to(self.longitudes[None, :], self.z.shape)
 
-    def create_xy(self, lower:list, upper:list, 
-    low:list, high:list, order:list, debug:bool=False) -> tuple[list, list]:
+    def create_xy(self, lower:list, upper:list,
+    low:list, high:list, debug:bool=False) -> tuple[np.ndarray, np.ndarray]:
         """
-        メタ情報をもとに緯度(X)経度(Y)リストを生成する。
+        メタ情報をもとに緯度(X)経度(Y)の座標軸を生成する。
+        座標はメッシュ(セル)の中心とする。
 
         Parameters
         ----
         lower:list
             矩形左下頂点座標（緯度経度）
         upper:list
-            矩形左下頂点座標（緯度経度）
+            矩形右上頂点座標（緯度経度）
         low:list
-            メッシュデータ開始位置（緯度方向インデックス、経度方向インデックス）
+            メッシュデータ開始位置（経度方向インデックス、緯度方向インデックス）
         high:list
-            メッシュデータ終了位置（緯度方向インデックス、経度方向インデックス）
-        order:list
-            緯度方向正（南から北）負（北から南）、経度方向正（東から西）負（西から東）
+            メッシュデータ終了位置（経度方向インデックス、緯度方向インデックス）
         debug:bool
             デバッグオプション
 
         Returns
         ----
-        tuple(list, list)
-            緯度リスト（単位：度）
-            経度リスト（単位：度）
+        tuple(np.ndarray, np.ndarray)
+            緯度（単位：度、北から南）
+            経度（単位：度、西から東）
         """
         # x 緯度
         # 最大値、最小値
         x_max = max(lower[0], upper[0])
         x_min = min(lower[0], upper[0])
-
-        if debug:
-            print(f'min:{x_min}, max:{x_max}')
-        # 緯度方向メッシュ点の数 -1
-        points_x = abs(high[0] - low[0])
-        if debug:
-            print(f'points_x = {points_x}')
-        # 緯度方向範囲
-        edge_x = x_max - x_min
-        if debug:
-            print(f'({upper[0]},{lower[0]}) edge_x = {edge_x}')
+        # 緯度方向メッシュ点の数
+        points_x = high[1] - low[1] + 1
         # 緯度方向メッシュ間の距離
-        delta_x = edge_x / points_x
-        if debug:
-            print(f'delta_x = {delta_x}')
-
-        mesh_x = []
-        for i in range(points_x):
-            mesh_x.append(x_min + i * delta_x)
-        mesh_x.append(x_max)
-
-        if order[0] < 0:
-            mesh_x = mesh_x.reverse()
+        delta_x = (x_max - x_min) / points_x
 
         # y 経度
         # 最大値、最小値
         y_max = max(lower[1], upper[1])
         y_min = min(lower[1], upper[1])
-        if debug:
-            print(f'min:{y_min}, max:{y_max}')
-        # 経度方向メッシュ点の数 -1
-        points_y = abs(high[1] - low[1])
-        if debug:
-            print(f'points_y = {points_y}')
-        # 経度方向範囲
-        edge_y = y_max - y_min
-        if debug:
-            print(f'({upper[1]},{lower[1]}) edge_y = {edge_y}')
-        # 緯度方向メッシュ間の距離
-        delta_y = edge_y / points_y
-        if debug:
-            print(f'delta_y = {delta_y}')
-
-        mesh_y = []
-        for i in range(points_y):
-            mesh_y.append(y_min + i * delta_y)
-        mesh_y.append(y_max)
+        # 経度方向メッシュ点の数
+        points_y = high[0] - low[0] + 1
+        # 経度方向メッシュ間の距離
+        delta_y = (y_max - y_min) / points_y
 
-        if order[1] < 0:
-            mesh_y.reverse()
-
-        x, y = [], []
-        for y_i in range(len(mesh_y)):
-            for x_i in range(len(mesh_x)):
-                x.append(mesh_x[x_i])
-                y.append(mesh_y[y_i])
-
-        # 中間データのガーベージコレクト
-        del mesh_x, mesh_y
-        gc.collect()
+        if debug:
+            print(f'latitude  min:{x_min}, max:{x_max}, points:{points_x}, delta:{delta_x}')
+            print(f'longitude min:{y_min}, max:{y_max}, points:{points_y}, delta:{delta_y}')
 
-        # 緯度リスト、経度リストの返却
-        return (x, y)
+        # 緯度、経度の座標軸の返却
+        return (x_max - (np.arange(points_x) + 0.5) * delta_x,
+            y_min + (np.arange(points_y) + 0.5) * delta_y)
 
     def show_meta(self):
         """
@@ -248,7 +311,7 @@ class Mesh:
         print(f'mesh range:  [{self.lower[0]}, {self.lower[1]}] - [{self.upper[0]}, {self.upper[1]}]')
         print(f'mesh position range: [{self.low[0]}, {self.low[1]}] - [{self.high[0]}, {self.high[1]}] sequence: {self.seq_rule}')
         print(f'mesh order:          [{self.order[0]}, {self.order[1]}]')
-        print(f'mesh length: x:{len(self.x)}, y:{len(self.y)}, z:{len(self.z)} type:{len(self.types)} uom:{self.uom}')
+        print(f'mesh shape:  {self.z.shape} types:{self.type_names} uom:{self.uom}')
 
     def get_histgram(self, path:str=None):
         """
@@ -272,7 +335,7 @@ class Mesh:
 
         # タイトルの作成
         ax.set_title(self.path, size=10)
-        ax.hist(self.z, range(0, int(np.max(np.array(self.z)))+1))
+        ax.hist(self.z.ravel(), range(0, int(np.max(self.z))+1))
         
         # 保存先パスが定義されていない場合
         if path is None:
@@ -325,6 +388,90 @@ class Mesh:
             if self.debug:
                 print(f'saved 3d scatter to {path}')
 
+    def interpolate(self, latitude:float, longitude:float) -> float:
+        """
+        指定された緯度・経度（単位：度）の標高を、メッシュの中心の標高から双1次内挿で算出する。
+        タイル端の半メッシュ分は端のメッシュの標高を使用する。
+
+        Parameters
+        ----
+        latitude:float
+            計算対象の緯度（北緯、単位：度）
+        longitude:float
+            計算対象の経度（東経、単位：度）
+
+        Returns
+        ----
+        float
+            標高（単位：メートル）、内挿に使用するメッシュがデータなしの場合は nan
+
+        Raises
+        ----
+        ValueError
+            タイルの範囲外を指定された場合
+        """
+        if not self.contains(latitude, longitude):
+            raise ValueError(f'({latitude}, {longitude}) is out of mesh {self.mesh_no} range')
+        # 1点の場合は配列演算の準備の方が重いため、interpolate_many と同じ計算を Python の数値で行う
+        (rows, columns) = self.z.shape
+        (delta_lat, delta_lon) = self.get_delta()
+        row = min(max((max(self.lower[0], self.upper[0]) - latitude) / delta_lat - 0.5, 0.0), rows - 1)
+        column = min(max((longitude - min(self.lower[1], self.upper[1])) / delta_lon - 0.5, 0.0), columns - 1)
+        (r0, c0) = (min(int(row), max(rows - 2, 0)), min(int(column), max(columns - 2, 0)))
+        (r1, c1) = (min(r0 + 1, rows - 1), min(c0 + 1, columns - 1))
+        (t, u) = (row - r0, column - c0)
+        height = 0.0
+        for (r, c, weight) in ((r0, c0, (1 - t) * (1 - u)), (r0, c1, (1 - t) * u),
+            (r1, c0, t * (1 - u)), (r1, c1, t * u)):
+            value = float(self.z[r, c])
+            if value <= self.NO_DATA:
+                if weight > 0.0:
+                    return float('nan')
+                continue
+            height += value * weight
+        return height
+
+    def interpolate_many(self, latitudes, longitudes) -> np.ndarray:
+        """
+        指定された複数の緯度・経度（単位：度）の標高を interpolate と同じ方法で一括で算出する。
+        タイルの範囲外、または内挿に使用するメッシュがデータなしの場合は np.nan を返却する。
+
+        Parameters
+        ----
+        latitudes
+            計算対象の緯度（北緯、単位：度）の配列（np.ndarray、リスト等）
+        longitudes
+            計算対象の経度（東経、単位：度）の配列（np.ndarray、リスト等）
+
+        Returns
+        ----
+        np.ndarray
+            標高（単位：メートル）
+        """
+        heights = _interpolate_grid(self.z, max(self.lower[0], self.upper[0]),
+            min(self.lower[1], self.upper[1]), self.get_delta(), latitudes, longitudes)
+        metrics.increment('mesh_points_interpolated_total', heights.size, method='mesh')
+        return heights
+
+    def contains(self, latitude:float, longitude:float) -> bool:
+        """
+        指定された緯度・経度がタイルの範囲内か判定する。
+
+        Parameters
+        ----
+        latitude:float
+            緯度（北緯、単位：度）
+        longitude:float
+            経度（東経、単位：度）
+
+        Returns
+        ----
+        bool
+            範囲内の場合 True
+        """
+        return min(self.lower[0], self.upper[0]) <= latitude <= max(self.lower[0], self.upper[0]) and \
+            min(self.lower[1], self.upper[1]) <= longitude <= max(self.lower[1], self.upper[1])
+
     def convert_xyz(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         標高データをnp.ndarray形式のリストX(緯度、単位：度)、
@@ -338,52 +485,158 @@ class Mesh:
             y: 経度、単位：度
             z: ジオイド高、単位：メートル
         """
-        # NO_DATA除外されたリスト作成
-        _x = [] # 経度(東経)
-        _y = [] # 緯度(北緯)
-        _z = [] # 標高(m)
-        for i in range(len(self.z)):
-            if self.z[i] > self.NO_DATA:
-                _x.append(self.x[i])
-                _y.append(self.y[i])
-                _z.append(self.z[i])
-
+        # NO_DATA 除外
+        mask = self.z > self.NO_DATA
         if self.debug:
-            print(f'omitted no data -> x:{len(_x)}, y:{len(_y)}, z:{len(_z)}')
+            print(f'omitted no data -> {np.count_nonzero(mask)} / {self.z.size}')
 
-        # ndarray化して返却
-        return(np.array(_x, dtype=float), np.array(_y, dtype=float), np.array(_z, dtype=float))
+        # 座標軸から生成して返却
+        return (self.x[mask], self.y[mask], self.z[mask])
 
-    def save_csv(self, path:str) -> None:
+    @metrics.timed('mesh_export_seconds', format='csv')
+    def save_csv(self, path:str, precision:int=None, header:bool=False,
+        compress:bool=None, chunk_size:int=100000) -> None:
         """
         CSV形式ファイルとして保存する。
-        緯度、経度、標高、種類の順に保存される。
+        緯度、経度、標高、種類の順に、北から南・西から東の順で保存される。
+        chunk_size 行づつまとめて文字列化して書き込む。
 
         Parameters
         ----
         path:str
             保存先ファイルパス。
+        precision:int
+            小数点以下桁数（デフォルト: None、丸めない）
+        header:bool
+            True の場合、先頭行に列名(latitude,longitude,height,type)を出力する
+        compress:bool
+            True の場合、gzip圧縮して保存する（デフォルト: None、path が .gz で終わる場合に圧縮）
+        chunk_size:int
+            一度に文字列化する行数
         """
-        with open(path, 'w', newline='') as f:
-            writer = csv.writer(f, delimiter=',')
-            for i in range(len(self.z)):
-                writer.writerow([self.x[i], self.y[i], self.z[i], self.types[i]])
+        # 行のテンプレート(csv.writer と同じく改行は CRLF)
+        # 標高(float32)は丸めない場合 float32 の最短表記の文字列を埋め込む
+        num = '%r' if precision is None else f'%.{precision}f'
+        row = '%s,%s,' + ('%s' if precision is None else num) + ',%s\r\n'
+        types = np.asarray(self.type_names, dtype=object)
+        # 座標軸は一度だけ文字列化して使い回す
+        (lat_text, lon_text) = self._format_axes(num)
+
+        z = self.z.ravel()
+        codes = self.type_codes.ravel()
+        columns = self.z.shape[1]
+        total = len(z)
+        if compress is None:
+            compress = path.endswith('.gz')
+        with (gzip.open(path, 'wt', newline='', compresslevel=6) if compress else open(path, 'w', newline='')) as f:
+            if header:
+                f.write('latitude,longitude,height,type\r\n')
+            for start in range(0, total, chunk_size):
+                stop = min(start + chunk_size, total)
+                index = np.arange(start, stop)
+                heights = z[start:stop].astype(str).tolist() if precision is None else z[start:stop].tolist()
+                values = [value for cells in zip(lat_text[index // columns].tolist(), lon_text[index % columns].tolist(),
+                    heights, types[codes[start:stop]].tolist()) for value in cells]
+                f.write((row * (stop - start)) % tuple(values))
         if self.debug:
             print(f'saved csv to {path}')
 
-    def save_geojson(self, path:str, crs:str='EPSG:4326') -> None:
+    @metrics.timed('mesh_export_seconds', format='geojson')
+    def save_geojson(self, path:str, crs:str='EPSG:4326', precision:int=None,
+        seq:bool=False, chunk_size:int=100000) -> None:
         """
         指定された測地系でGeoJSON形式として保存する。
+        データなし(-9999.0)である座標は出力しない。
+        GeoDataFrame を経由せず、chunk_size 点づつ文字列化して書き込むため、
+        メモリ使用量は点数によらずほぼ一定となる。
 
         Parameters
         ----
+        path:str
+            保存先ファイルパス
         crs:str
             測地系。デフォルトは世界測地系(EPSG:4326)
+        precision:int
+            座標・標高の小数点以下桁数（デフォルト: None、丸めない）
+        seq:bool
+            True の場合、1行1フィーチャの GeoJSONSeq 形式で保存する
+        chunk_size:int
+            一度に文字列化する点の数
         """
-        self.get_gpd(crs=crs).to_file(driver='GeoJSON', filename=path)
+        z = self.z.ravel()
+        codes = self.type_codes.ravel()
+        columns = self.z.shape[1]
+        index = np.flatnonzero(z > self.NO_DATA)
+        # 種類はJSON文字列としてエスケープしたものを使い回す
+        escaped = [json.dumps(t, ensure_ascii=False) for t in self.type_names]
+
+        # フィーチャのテンプレート(標高、種類、経度、緯度の順に埋め込む)
+        # 標高(float32)は丸めない場合 float32 の最短表記の文字列を埋め込む
+        num = '%r' if precision is None else f'%.{precision}f'
+        feature = '{"type":"Feature","properties":{"height":' + ('%s' if precision is None else num) + ',"type":%s},' + \
+            '"geometry":{"type":"Point","coordinates":[%s,%s]}}'
+        separator = '\n' if seq else ',\n'
+        # 座標軸は一度だけ文字列化して使い回す
+        (lat_text, lon_text) = self._format_axes(num)
+
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            if not seq:
+                f.write('{"type":"FeatureCollection"' + self._get_geojson_crs(crs) + ',"features":[\n')
+            for start in range(0, len(index), chunk_size):
+                chunk = index[start:start + chunk_size]
+                heights = z[chunk].astype(str).tolist() if precision is None else z[chunk].tolist()
+                values = [value for (height, code, lon, lat) in zip(heights, codes[chunk].tolist(),
+                    lon_text[chunk % columns].tolist(), lat_text[chunk // columns].tolist())
+                    for value in (height, escaped[code], lon, lat)]
+                if start > 0:
+                    f.write(separator)
+                f.write(separator.join([feature] * len(chunk)) % tuple(values))
+            f.write('\n' if seq else '\n]}\n')
+
         if self.debug:
             print(f'saved geojson to {path}')
 
+    def _format_axes(self, num:str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        緯度・経度の座標軸を書式 num で文字列化する。
+
+        Parameters
+        ----
+        num:str
+            書式（例: '%r'、'%.4f'）
+
+        Returns
+        ----
+        tuple[np.ndarray, np.ndarray]
+            緯度、経度の文字列の配列(object型)
+        """
+        return (np.array([num % v for v in self.latitudes.tolist()], dtype=object),
+            np.array([num % v for v in self.longitudes.tolist()], dtype=object))
+
+    @staticmethod
+    def _get_geojson_crs(crs:str) -> str:
+        """
+        GeoJSON の FeatureCollection に付与する crs メンバーを返却する。
+        EPSG:4326(GeoJSON の既定座標系)の場合は付与しない。
+
+        Parameters
+        ----
+        crs:str
+            座標系（例: 'EPSG:6668'）
+
+        Returns
+        ----
+        str
+            ',"crs":{...}' 形式の文字列、または空文字列
+        """
+        if crs is None or crs.upper() in ('EPSG:4326', 'OGC:CRS84'):
+            return ''
+        name = crs
+        if crs.upper().startswith('EPSG:'):
+            name = 'urn:ogc:def:crs:EPSG::' + crs.split(':', 1)[1]
+        return ',"crs":{"type":"name","properties":{"name":' + json.dumps(name) + '}}'
+
+    @metrics.timed('mesh_export_seconds', format='shp')
     def save_geoshp(self, path:str='geoid.shp', crs:str='EPSG:4326'):
         """
         指定された測地系でShp形式で保存する。
@@ -399,6 +652,158 @@ class Mesh:
         if self.debug:
             print(f'saved shp to {path}')
 
+    @metrics.timed('mesh_export_seconds', format='parquet')
+    def save_parquet(self, path:str, crs:str='EPSG:4326') -> None:
+        """
+        指定された測地系でGeoParquet形式で保存する。
+        pyarrow パッケージが必要。
+
+        Parameters
+        ----
+        path:str
+            GeoParquet形式ファイルパス
+        crs:str
+            座標系（デフォルト: 'EPSG:4326'）
+        """
+        self.get_gpd(crs=crs).to_parquet(path)
+        if self.debug:
+            print(f'saved parquet to {path}')
+
+    @metrics.timed('mesh_export_seconds', format='feather')
+    def save_feather(self, path:str, crs:str='EPSG:4326') -> None:
+        """
+        指定された測地系でFeather(Arrow IPC)形式で保存する。
+        pyarrow パッケージが必要。
+
+        Parameters
+        ----
+        path:str
+            Feather形式ファイルパス
+        crs:str
+            座標系（デフォルト: 'EPSG:4326'）
+        """
+        self.get_gpd(crs=crs).to_feather(path)
+        if self.debug:
+            print(f'saved feather to {path}')
+
+    @staticmethod
+    def load_points(path:str) -> gpd.GeoDataFrame:
+        """
+        save_parquet/save_feather で保存したファイルを GeoDataFrame として読み込む。
+        拡張子 .parquet の場合は GeoParquet、それ以外は Feather 形式として読み込む。
+
+        Parameters
+        ----
+        path:str
+            GeoParquet形式またはFeather形式ファイルパス
+
+        Returns
+        ----
+        gpd.GeoDataFrame
+            DEMデータ(標高:'height'属性、種類：'type'属性)
+        """
+        if path.endswith('.parquet'):
+            return gpd.read_parquet(path)
+        return gpd.read_feather(path)
+
+    @metrics.timed('mesh_export_seconds', format='grid')
+    def save_grid(self, path:str) -> None:
+        """
+        標高をバイナリ形式(.npy、float32、行:北から南、列:西から東)で保存する。
+        種類は種類コード(uint8)のグリッドとして path の拡張子を .types.npy に、
+        メタ情報及び種類コード表はJSON形式で拡張子を .json に置き換えたファイルに保存する。
+        並行して load_grid するプロセスが書きかけのファイルを読まないよう、
+        一時ファイルへ書き込んでから置き換える(メタ情報は最後に置き換え、書き込み完了の印とする)。
+
+        Parameters
+        ----
+        path:str
+            標高グリッドの保存先ファイルパス(.npy)
+        """
+        (npy_path, types_path, json_path) = self._get_grid_paths(path)
+        for (grid_path, values) in ((npy_path, self.z), (types_path, self.type_codes)):
+            with atomic_open(grid_path, 'wb') as f:
+                np.save(f, values)
+        meta = {
+            'name': self.name,
+            'description': self.description,
+            'mesh_no': self.mesh_no,
+            'mesh_type': self.mesh_type,
+            'lower': self.lower,
+            'upper': self.upper,
+            'low': self.low,
+            'high': self.high,
+            'order': self.order,
+            'seq_rule': self.seq_rule,
+            'uom': self.uom,
+            'types': self.type_names,
+        }
+        with atomic_open(json_path) as f:
+            json.dump(meta, f, ensure_ascii=False)
+        if self.debug:
+            print(f'saved grid to {npy_path}')
+
+    @classmethod
+    def load_grid(cls, path:str, debug:bool=False) -> 'Mesh':
+        """
+        save_grid で保存した標高グリッドを読み込み、インスタンスを生成する。
+        標高・種類コードのグリッドはメモリマップとして読み込む。
+
+        Parameters
+        ----
+        path:str
+            標高グリッドのファイルパス(.npy)
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        Mesh
+            インスタンス
+
+        Raises
+        ----
+        ValueError
+            グリッドの形状がメタ情報と一致しない場合
+        """
+        (npy_path, types_path, json_path) = cls._get_grid_paths(path)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        mesh = cls.__new__(cls)
+        mesh.debug = debug
+        mesh.path = path
+        for key in ['name', 'description', 'mesh_no', 'mesh_type', 'lower', 'upper',
+            'low', 'high', 'order', 'seq_rule', 'uom']:
+            setattr(mesh, key, meta[key])
+        mesh.z = np.load(npy_path, mmap_mode='r')
+        mesh.type_codes = np.load(types_path, mmap_mode='r')
+        mesh.type_names = meta['types']
+        if mesh.z.shape != mesh.get_shape() or mesh.type_codes.shape != mesh.get_shape():
+            raise ValueError(f'grid shape:{mesh.z.shape} does not match meta {mesh.get_shape()}')
+        (mesh.latitudes, mesh.longitudes) = mesh.create_xy(mesh.lower, mesh.upper,
+            mesh.low, mesh.high)
+        if mesh.debug:
+            mesh.show_meta()
+        return mesh
+
+    @staticmethod
+    def _get_grid_paths(path:str) -> tuple[str, str, str]:
+        """
+        save_grid/load_grid で使用するファイルパスを返却する。
+
+        Parameters
+        ----
+        path:str
+            標高グリッドのファイルパス(.npy)
+
+        Returns
+        ----
+        tuple[str, str, str]
+            標高グリッド、種類コードグリッド、メタ情報のファイルパス
+        """
+        stem = os.path.splitext(path)[0]
+        return (path, stem + '.types.npy', stem + '.json')
+
     def get_gpd(self, crs:str='EPSG:4326') -> gpd.GeoDataFrame:
         """
         DEMデータをGeoDataFrame オブジェクトとして取得する。
@@ -414,57 +819,942 @@ class Mesh:
         gpd.GeoDataFrame
             ジオイドモデル(標高:'height'属性、種類：'type'属性)
         """
-        _x = [] # 経度(東経)
-        _y = [] # 緯度(北緯)
-        _z = [] # 標高(m)
-        _t = [] # 種類
-        for i in range(len(self.z)):
-            if self.z[i] > self.NO_DATA:
-                _x.append(self.x[i])
-                _y.append(self.y[i])
-                _z.append(self.z[i])
-                _t.append(self.types[i])
-        geometry = []
-        total = len(_x)
-        for i in range(total):
-            # Point(経度, 緯度)
-            geometry.append(Point(_y[i], _x[i]))
-        return gpd.GeoDataFrame({'height':_z, 'type':_t, 'geometry':geometry}, crs=crs)
+        # NO_DATA を除外
+        (x, y, z) = self.convert_xyz()  # 緯度(北緯)、経度(東経)、標高
+        t = np.asarray(self.type_names, dtype=object)[self.type_codes[self.z > self.NO_DATA]] # 種類
+        # Point(経度, 緯度) を配列から一括生成
+        geometry = gpd.points_from_xy(y, x, crs=crs)
+        return gpd.GeoDataFrame({'height':z, 'type':t}, geometry=geometry, crs=crs)
+
+class _GmlReader:
+    """
+    基盤地図情報数値標高モデル(GML形式)を expat で逐次解析するリーダ。
+    メタ情報要素はテキストとして保持し、データ全要素(tupleList)は chunk_size 文字
+    づつ解析して、グリッドの大きさ(low/high)で事前確保した配列へ格納する。
+    """
+
+    """
+    テキストを保持するメタ情報要素(名前空間を除いた要素名、最初の要素のみ保持)
+    """
+    META_TAGS = {'name', 'description', 'mesh', 'type', 'lowerCorner', 'upperCorner',
+        'low', 'high', 'axisLabels', 'sequenceRule', 'startPoint'}
+
+    """
+    属性を保持する要素
+    """
+    ATTR_TAGS = {'sequenceRule', 'QuantityList'}
+
+    def __init__(self, chunk_size:int=1 << 16) -> None:
+        """
+        Parameters
+        ----
+        chunk_size:int
+            tupleList を一度に解析する文字数
+        """
+        self.chunk_size = chunk_size
+        self.texts = {}
+        self.attrs = {}
+        self.tag = None
+        self.buffer = []
+        self.size = 0
+        # 標高、種類コード、格納済み要素数
+        self.z = np.empty(0, dtype=np.float32)
+        self.codes = np.empty(0, dtype=np.uint8)
+        self.count = 0
+        # 種類コード表(種類名 -> 種類コード)
+        self.type_names = {}
+
+    def parse(self, f, block_size:int=1 << 20) -> '_GmlReader':
+        """
+        バイナリファイルオブジェクトを block_size バイトづつ読み込んで解析する。
+
+        Parameters
+        ----
+        f
+            読み込み対象のバイナリファイルオブジェクト
+        block_size:int
+            一度にパーサへ渡すバイト数
+
+        Returns
+        ----
+        _GmlReader
+            自インスタンス
+        """
+        parser = expat.ParserCreate(namespace_separator='}')
+        # 文字データを chunk_size 文字まとめて受け取る
+        parser.buffer_text = True
+        parser.buffer_size = self.chunk_size
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.data
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            parser.Parse(block, False)
+        parser.Parse(b'', True)
+        return self
+
+    def start(self, tag:str, attrib:dict) -> None:
+        tag = tag.rsplit('}', 1)[-1]
+        if tag in self.ATTR_TAGS:
+            self.attrs.setdefault(tag, dict(attrib))
+        if tag == 'tupleList':
+            self._allocate()
+        elif tag not in self.META_TAGS or tag in self.texts:
+            self.tag = None
+            return
+        self.tag = tag
+        self.buffer = []
+        self.size = 0
+
+    def data(self, text:str) -> None:
+        if self.tag is None:
+            return
+        self.buffer.append(text)
+        if self.tag == 'tupleList':
+            self.size += len(text)
+            if self.size >= self.chunk_size:
+                self._flush(final=False)
+
+    def end(self, tag:str) -> None:
+        if self.tag == 'tupleList':
+            self._flush(final=True)
+        elif self.tag is not None:
+            self.texts[self.tag] = ''.join(self.buffer)
+        self.tag = None
+        self.buffer = []
+
+    def _allocate(self) -> None:
+        """
+        グリッドの大きさ(low/high)分の標高・種類コード配列を確保する。
+        """
+        low = [int(v) for v in self.texts['low'].split()]
+        high = [int(v) for v in self.texts['high'].split()]
+        size = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+        self.z = np.full(size, Mesh.NO_DATA, dtype=np.float32)
+        self.codes = np.full(size, 255, dtype=np.uint8)
+        self.count = 0
+
+    def _flush(self, final:bool) -> None:
+        """
+        バッファの '種類,標高' の並びを解析して配列へ格納する。
+        final でない場合、行の途中で分かれている末尾はバッファに残す。
+        """
+        text = ''.join(self.buffer)
+        self.buffer = []
+        if not final:
+            cut = max(text.rfind('\n'), text.rfind(' '))
+            if cut < 0:
+                self.buffer = [text]
+                return
+            (text, rest) = (text[:cut], text[cut:])
+            self.buffer = [rest]
+        self.size = sum(len(b) for b in self.buffer)
+
+        values = ','.join(text.split()).split(',')
+        if len(values) < 2:
+            return
+        if len(values) % 2 != 0:
+            raise ValueError(f'invalid tuple in tupleList: {values[-1]}')
+        n = len(values) // 2
+        if self.count + n > len(self.z):
+            raise ValueError(f'tupleList has more than {len(self.z)} elements')
+        lookup = self.type_names
+        codes = [lookup.setdefault(t, len(lookup)) for t in values[0::2]]
+        if len(lookup) > 255:
+            raise ValueError(f'too many types in tupleList: {len(lookup)}')
+        self.z[self.count:self.count + n] = np.array(values[1::2], dtype=np.float32)
+        self.codes[self.count:self.count + n] = codes
+        self.count += n
+
+class MeshCollection:
+    """
+    複数の国土交通省国土地理院基盤地図情報数値標高モデルダウンロードファイル(GML形式)
+    をまとめて読み込み、扱うためのクラス。
+    ディレクトリ、zipファイル(zipファイル内のzipファイルを含む)を指定でき、
+    zipファイルは展開せずに直接読み込む。タイルはプロセスプールで並列に読み込む。
+    """
+
+    def __init__(self, meshes:list=None, timings:list=None, debug:bool=False) -> None:
+        """
+        Parameters
+        ----
+        meshes:list
+            Mesh インスタンスのリスト
+        timings:list
+            各タイルの読み込み時間(秒)のリスト
+        debug:bool
+            デバッグオプション
+        """
+        self.debug = debug
+        # タイル(Mesh インスタンス)
+        self.meshes = [] if meshes is None else list(meshes)
+        # 各タイルの読み込み時間(秒)
+        self.timings = [] if timings is None else list(timings)
+        # タイル索引(メッシュ番号の桁数 -> {メッシュ番号 -> タイル})、get_index で生成
+        self.index = None
+
+    def __len__(self) -> int:
+        return len(self.meshes)
+
+    def __iter__(self):
+        return iter(self.meshes)
+
+    def __getitem__(self, index:int) -> Mesh:
+        return self.meshes[index]
+
+    @classmethod
+    @metrics.timed('mesh_collection_load_seconds')
+    def load(cls, paths, workers:int=None, batch_size:int=16, debug:bool=False) -> 'MeshCollection':
+        """
+        DEMファイル(.xml)、ディレクトリ、zipファイルからタイルを読み込む。
+        ディレクトリは配下の .xml/.zip ファイルを、zipファイルは内部の .xml ファイル及び
+        .zip ファイルを対象とする。
+
+        Parameters
+        ----
+        paths
+            ファイル・ディレクトリパス、またはそのリスト
+        workers:int
+            ワーカプロセス数（デフォルト: None、CPU数）、1以下の場合は自プロセスで読み込む
+        batch_size:int
+            1タスクで読み込むzipファイル内の .xml ファイル数
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        MeshCollection
+            インスタンス
+        """
+        start = time.perf_counter()
+        results = list(cls.iter_load(paths, workers=workers, batch_size=batch_size))
+        elapsed = time.perf_counter() - start
+
+        collection = cls([mesh for (mesh, _) in results], [seconds for (_, seconds) in results], debug=debug)
+        if debug:
+            print(f'loaded {len(collection)} tiles in {elapsed:.3f} sec')
+        return collection
+
+    @classmethod
+    def iter_load(cls, paths, workers:int=None, batch_size:int=16):
+        """
+        load と同じ対象のタイルを順に読み込み、(Mesh, 読み込み時間(秒)) を返すイテレータ。
+        並列に読み込み中のタスクは workers の2倍までに制限するため、
+        タイルを保持しない処理(モザイク作成等)ではタイル数によらずメモリ使用量はほぼ一定となる。
+
+        Parameters
+        ----
+        paths
+            ファイル・ディレクトリパス、またはそのリスト
+        workers:int
+            ワーカプロセス数（デフォルト: None、CPU数）、1以下の場合は自プロセスで読み込む
+        batch_size:int
+            1タスクで読み込むzipファイル内の .xml ファイル数
+
+        Returns
+        ----
+        Iterator[tuple[Mesh, float]]
+            タイルと読み込み時間(秒)
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        tasks = cls._get_tasks(paths, batch_size)
+        workers = os.cpu_count() if workers is None else workers
+
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield from _record_tiles(_load_tiles(task))
+            return
+
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(_load_tiles, task))
+                if len(pending) >= workers * 2:
+                    yield from _record_tiles(pending.popleft().result())
+            while pending:
+                yield from _record_tiles(pending.popleft().result())
+
+    @staticmethod
+    def _get_tasks(paths:list, batch_size:int) -> list[tuple[tuple, list]]:
+        """
+        読み込みタスクのリストを生成する。
+        タスクは (コンテナ, メンバー名のリスト) で、コンテナは (ファイルパス, zipファイル内のzipファイル名...)、
+        メンバー名のリストが None の場合はコンテナ内のすべての .xml/.zip ファイルを対象とする。
+
+        Parameters
+        ----
+        paths:list
+            ファイル・ディレクトリパスのリスト
+        batch_size:int
+            1タスクで読み込むzipファイル内の .xml ファイル数
+
+        Returns
+        ----
+        list[tuple[tuple, list]]
+            タスクのリスト
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for (dir_path, dir_names, file_names) in os.walk(path):
+                    dir_names.sort()
+                    files.extend(os.path.join(dir_path, name) for name in sorted(file_names)
+                        if name.lower().endswith(('.xml', '.zip')))
+            else:
+                files.append(path)
+
+        tasks = []
+        for path in files:
+            if not path.lower().endswith('.zip'):
+                tasks.append(((path,), None))
+                continue
+            # zipファイル内のzipファイルはそれぞれ1タスク、.xml ファイルは batch_size づつ1タスク
+            with zipfile.ZipFile(path) as archive:
+                names = sorted(archive.namelist())
+            members = [name for name in names if name.lower().endswith('.xml')]
+            for start in range(0, len(members), batch_size):
+                tasks.append(((path,), members[start:start + batch_size]))
+            tasks.extend(((path, name), None) for name in names if name.lower().endswith('.zip'))
+        return tasks
+
+    def mosaic(self, path:str, debug:bool=False) -> 'Mosaic':
+        """
+        読み込んだタイル全体を覆うモザイク(Mosaic)を作成する。
+        範囲はタイルの範囲の和、メッシュ間の距離は先頭のタイルと同じとする。
+
+        Parameters
+        ----
+        path:str
+            モザイクの保存先ファイルパス(.npy)
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        Mosaic
+            インスタンス
+        """
+        lower = [min(mesh.lower[0] for mesh in self.meshes), min(mesh.lower[1] for mesh in self.meshes)]
+        upper = [max(mesh.upper[0] for mesh in self.meshes), max(mesh.upper[1] for mesh in self.meshes)]
+        mosaic = Mosaic.create(path, lower, upper, self.meshes[0].get_delta(), debug=debug)
+        for mesh in self.meshes:
+            mosaic.add(mesh)
+        mosaic.flush()
+        return mosaic
+
+    def get_index(self) -> dict[int, dict[int, Mesh]]:
+        """
+        メッシュ番号(標準地域メッシュコード)をキーとするタイル索引を返却する。
+        初回呼び出し時に生成する(タイルを追加した場合は self.index = None として再生成する)。
+
+        Returns
+        ----
+        dict[int, dict[int, Mesh]]
+            メッシュ番号の桁数 -> {メッシュ番号 -> タイル}
+        """
+        if self.index is None:
+            self.index = {}
+            for mesh in self.meshes:
+                self.index.setdefault(len(mesh.mesh_no), {})[int(mesh.mesh_no)] = mesh
+        return self.index
+
+    def get_tile(self, latitude:float, longitude:float) -> Mesh:
+        """
+        指定された緯度・経度を含むタイルを、メッシュ番号の索引から取得する。
+        桁数の多い(細かい)メッシュ番号のタイルを優先する。
+
+        Parameters
+        ----
+        latitude:float
+            緯度（北緯、単位：度）
+        longitude:float
+            経度（東経、単位：度）
+
+        Returns
+        ----
+        Mesh
+            タイル、該当するタイルがない場合は None
+        """
+        for (digits, tiles) in sorted(self.get_index().items(), reverse=True):
+            mesh = tiles.get(_get_mesh_code(latitude, longitude, digits))
+            if mesh is not None:
+                return mesh
+        return None
+
+    def interpolate(self, latitude:float, longitude:float) -> float:
+        """
+        指定された緯度・経度（単位：度）の標高を、該当するタイルの Mesh.interpolate で算出する。
+        細かいタイルがデータなしの場合は、桁数の少ない(粗い)タイルで算出する。
+
+        Parameters
+        ----
+        latitude:float
+            計算対象の緯度（北緯、単位：度）
+        longitude:float
+            計算対象の経度（東経、単位：度）
+
+        Returns
+        ----
+        float
+            標高（単位：メートル）、内挿に使用するメッシュがデータなしの場合は nan
+
+        Raises
+        ----
+        ValueError
+            該当するタイルがない場合
+        """
+        # 細かいタイルがデータなしの場合は桁数の少ない(粗い)タイルで算出する(interpolate_many と同じ)
+        height = None
+        for (digits, tiles) in sorted(self.get_index().items(), reverse=True):
+            mesh = tiles.get(_get_mesh_code(latitude, longitude, digits))
+            if mesh is None:
+                continue
+            # メッシュ番号と GML の範囲が端で一致しない点は、interpolate_many と同じくデータなしとする
+            height = mesh.interpolate(latitude, longitude) if mesh.contains(latitude, longitude) else math.nan
+            if height == height:
+                return height
+        if height is None:
+            raise ValueError(f'no tile for ({latitude}, {longitude})')
+        return height
+
+    @metrics.timed('mesh_batch_seconds', method='collection')
+    def interpolate_many(self, latitudes, longitudes) -> np.ndarray:
+        """
+        指定された複数の緯度・経度（単位：度）の標高を一括で算出する。
+        各点のメッシュ番号を一括で算出してタイルごとにまとめ、タイルの Mesh.interpolate_many で算出する。
+        細かいタイルでデータなしとなった点は、桁数の少ない(粗い)タイルで算出する。
+        該当するタイルがない、または内挿に使用するメッシュがデータなしの場合は np.nan を返却する。
+
+        Parameters
+        ----
+        latitudes
+            計算対象の緯度（北緯、単位：度）の配列（np.ndarray、リスト等）
+        longitudes
+            計算対象の経度（東経、単位：度）の配列（np.ndarray、リスト等）
+
+        Returns
+        ----
+        np.ndarray
+            標高（単位：メートル）
+        """
+        (latitudes, longitudes) = np.broadcast_arrays(np.asarray(latitudes, dtype=float),
+            np.asarray(longitudes, dtype=float))
+        shape = latitudes.shape
+        (latitudes, longitudes) = (latitudes.ravel(), longitudes.ravel())
+        heights = np.full(latitudes.size, np.nan)
+        # 未割り当ての点の添字
+        remain = np.arange(latitudes.size)
+        for (digits, tiles) in sorted(self.get_index().items(), reverse=True):
+            if remain.size == 0:
+                break
+            codes = get_mesh_code(latitudes[remain], longitudes[remain], digits)
+            # メッシュ番号ごとに点をまとめる
+            (keys, inverse) = np.unique(codes, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(keys)))))
+            found = np.zeros(remain.size, dtype=bool)
+            for (k, key) in enumerate(keys.tolist()):
+                mesh = tiles.get(key)
+                if mesh is None:
+                    continue
+                index = order[bounds[k]:bounds[k + 1]]
+                result = mesh.interpolate_many(latitudes[remain[index]], longitudes[remain[index]])
+                heights[remain[index]] = result
+                # データなしの点は桁数の少ない(粗い)タイルで算出する
+                found[index] = ~np.isnan(result)
+            remain = remain[~found]
+        return heights.reshape(shape)
+
+    def show_timings(self) -> None:
+        """
+        タイルごとの読み込み時間を表示する。
+        """
+        for (mesh, seconds) in zip(self.meshes, self.timings):
+            print(f'{seconds:8.3f} sec  {mesh.z.size:10d} points  {mesh.mesh_no}  {mesh.path}')
+        print(f'{sum(self.timings):8.3f} sec  {sum(mesh.z.size for mesh in self.meshes):10d} points  total')
+
+class Mosaic:
+    """
+    複数のタイル(Mesh)を、ディスク上の1つの標高ラスタ(.npy のメモリマップ)にまとめるクラス。
+    ラスタはデータなし(-9999.0)で初期化し、タイルを追加するごとに書き込むため、
+    ラスタより少ないメモリで広域のモザイクを作成できる。
+    標高(self.z)は Mesh と同じく北から南・西から東の順の float32 の2次元配列で、
+    メタ情報は path の拡張子を .json に置き換えたファイルに保存する。
+    """
+
+    """
+    データなし時の数値
+    """
+    NO_DATA = Mesh.NO_DATA
+
+    def __init__(self, path:str, z:np.ndarray, meta:dict, debug:bool=False) -> None:
+        """
+        Parameters
+        ----
+        path:str
+            ラスタのファイルパス(.npy)
+        z:np.ndarray
+            ラスタ(メモリマップ)
+        meta:dict
+            メタ情報
+        debug:bool
+            デバッグオプション
+        """
+        self.debug = debug
+        self.path = path
+        # 標高ラスタ
+        self.z = z
+        # 矩形左下頂点座標、右上頂点座標（緯度経度）
+        self.lower = list(meta['lower'])
+        self.upper = list(meta['upper'])
+        # メッシュ間の距離（緯度方向、経度方向）
+        self.delta = tuple(meta['delta'])
+        # 追加したタイルのメッシュ番号
+        self.tiles = list(meta.get('tiles', []))
+        # 緯度(北から南)・経度(西から東)の座標軸(メッシュの中心)
+        self.latitudes = self.upper[0] - (np.arange(z.shape[0]) + 0.5) * self.delta[0]
+        self.longitudes = self.lower[1] + (np.arange(z.shape[1]) + 0.5) * self.delta[1]
+
+    @classmethod
+    def create(cls, path:str, lower:list, upper:list, delta:tuple,
+        chunk_rows:int=1024, debug:bool=False) -> 'Mosaic':
+        """
+        データなしで初期化したラスタをディスク上に作成する。
+        初期化は chunk_rows 行づつ書き込む。
+
+        Parameters
+        ----
+        path:str
+            ラスタの保存先ファイルパス(.npy)
+        lower:list
+            矩形左下頂点座標（緯度経度）
+        upper:list
+            矩形右上頂点座標（緯度経度）
+        delta:tuple
+            メッシュ間の距離（緯度方向、経度方向、単位：度）
+        chunk_rows:int
+            一度に初期化する行数
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        Mosaic
+            インスタンス
+        """
+        shape = (int(round((upper[0] - lower[0]) / delta[0])), int(round((upper[1] - lower[1]) / delta[1])))
+        z = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+        for start in range(0, shape[0], chunk_rows):
+            z[start:start + chunk_rows] = cls.NO_DATA
+            z.flush()
+        mosaic = cls(path, z, {'lower': lower, 'upper': upper, 'delta': delta}, debug=debug)
+        mosaic.flush()
+        if debug:
+            print(f'created mosaic {path} shape:{shape}')
+        return mosaic
+
+    @classmethod
+    def open(cls, path:str, mode:str='r', debug:bool=False) -> 'Mosaic':
+        """
+        作成済みのラスタをメモリマップとして開く。
+
+        Parameters
+        ----
+        path:str
+            ラスタのファイルパス(.npy)
+        mode:str
+            メモリマップのモード（'r': 読み取り専用、'r+': タイルを追加する場合）
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        Mosaic
+            インスタンス
+        """
+        with open(os.path.splitext(path)[0] + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(path, np.load(path, mmap_mode=mode), meta, debug=debug)
+
+    @classmethod
+    def build(cls, path:str, paths, lower:list, upper:list, delta:tuple=None,
+        workers:int=None, batch_size:int=16, flush_interval:int=64, debug:bool=False) -> 'Mosaic':
+        """
+        DEMファイル(.xml)、ディレクトリ、zipファイルのタイルを並列に読み込みながら
+        指定範囲のモザイクを作成する。読み込んだタイルは追加後に破棄するため、
+        タイル全体を保持する MeshCollection.mosaic よりメモリ使用量が少ない。
+
+        Parameters
+        ----
+        path:str
+            ラスタの保存先ファイルパス(.npy)
+        paths
+            ファイル・ディレクトリパス、またはそのリスト
+        lower:list
+            矩形左下頂点座標（緯度経度）
+        upper:list
+            矩形右上頂点座標（緯度経度）
+        delta:tuple
+            メッシュ間の距離（デフォルト: None、先頭のタイルと同じ）
+        workers:int
+            ワーカプロセス数（デフォルト: None、CPU数）
+        batch_size:int
+            1タスクで読み込むzipファイル内の .xml ファイル数
+        flush_interval:int
+            ディスクへ書き出すタイル数の間隔
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        Mosaic
+            インスタンス
+        """
+        mosaic = None if delta is None else cls.create(path, lower, upper, delta, debug=debug)
+        for (count, (mesh, _)) in enumerate(MeshCollection.iter_load(paths, workers=workers, batch_size=batch_size), 1):
+            if mosaic is None:
+                mosaic = cls.create(path, lower, upper, mesh.get_delta(), debug=debug)
+            mosaic.add(mesh)
+            del mesh
+            if count % flush_interval == 0:
+                mosaic.flush()
+        if mosaic is None:
+            raise ValueError(f'no tiles found in {paths}')
+        mosaic.flush()
+        return mosaic
+
+    def add(self, mesh:Mesh) -> bool:
+        """
+        タイルをラスタへ書き込む。範囲外の部分は書き込まず、
+        タイルのデータなしのメッシュ点はラスタの値を上書きしない。
+
+        Parameters
+        ----
+        mesh:Mesh
+            タイル
+
+        Returns
+        ----
+        bool
+            ラスタの範囲に書き込んだ場合 True
+
+        Raises
+        ----
+        ValueError
+            タイルのメッシュ間の距離がラスタと異なる場合
+        """
+        if not np.allclose(mesh.get_delta(), self.delta, rtol=1e-6, atol=0.0):
+            raise ValueError(f'tile {mesh.mesh_no} delta:{mesh.get_delta()} does not match mosaic {self.delta}')
+        # タイル北西端のラスタ上の位置
+        row = int(round((self.upper[0] - max(mesh.lower[0], mesh.upper[0])) / self.delta[0]))
+        column = int(round((min(mesh.lower[1], mesh.upper[1]) - self.lower[1]) / self.delta[1]))
+        (rows, columns) = mesh.z.shape
+        (top, bottom) = (max(row, 0), min(row + rows, self.z.shape[0]))
+        (left, right) = (max(column, 0), min(column + columns, self.z.shape[1]))
+        if top >= bottom or left >= right:
+            return False
+
+        z = mesh.z[top - row:bottom - row, left - column:right - column]
+        np.copyto(self.z[top:bottom, left:right], z, where=z > self.NO_DATA)
+        self.tiles.append(mesh.mesh_no)
+        if self.debug:
+            print(f'added {mesh.mesh_no} at [{top}:{bottom}, {left}:{right}]')
+        return True
+
+    def interpolate_many(self, latitudes, longitudes) -> np.ndarray:
+        """
+        指定された複数の緯度・経度（単位：度）の標高を Mesh.interpolate_many と同じ方法で一括で算出する。
+        ラスタの範囲外、または内挿に使用するメッシュがデータなしの場合は np.nan を返却する。
+
+        Parameters
+        ----
+        latitudes
+            計算対象の緯度（北緯、単位：度）の配列（np.ndarray、リスト等）
+        longitudes
+            計算対象の経度（東経、単位：度）の配列（np.ndarray、リスト等）
+
+        Returns
+        ----
+        np.ndarray
+            標高（単位：メートル）
+        """
+        heights = _interpolate_grid(self.z, self.upper[0], self.lower[1], self.delta, latitudes, longitudes)
+        metrics.increment('mesh_points_interpolated_total', heights.size, method='mosaic')
+        return heights
+
+    def flush(self) -> None:
+        """
+        ラスタをディスクへ書き出し、メタ情報を保存する。
+        メタ情報は一時ファイルへ書き込んでから置き換える(atomic_open 参照)。
+        """
+        self.z.flush()
+        meta = {
+            'lower': self.lower,
+            'upper': self.upper,
+            'delta': list(self.delta),
+            'shape': list(self.z.shape),
+            'dtype': self.z.dtype.str,
+            'no_data': self.NO_DATA,
+            'tiles': self.tiles,
+        }
+        with atomic_open(os.path.splitext(self.path)[0] + '.json') as f:
+            json.dump(meta, f)
+
+@contextlib.contextmanager
+def atomic_open(path:str, mode:str='w'):
+    """
+    一時ファイル(path + '.<プロセスID>.tmp')を開き、with 文のブロックが正常に終了した場合に
+    os.replace で path へ置き換えるコンテキストマネージャ。
+    並行して読み込むプロセスが書きかけのファイルを読まないよう、.npy・.json の保存に使用する。
+    例外が発生した場合は一時ファイルを削除し、path は変更しない。
+
+    Parameters
+    ----
+    path:str
+        保存先ファイルパス
+    mode:str
+        ファイルを開くモード（'w' または 'wb'、テキストは UTF-8）
+    """
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    f = open(temp_path, mode, encoding=None if 'b' in mode else 'utf-8')
+    try:
+        with f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def get_mesh_code(latitudes, longitudes, digits:int=6) -> np.ndarray:
+    """
+    緯度・経度（単位：度）を含む標準地域メッシュのメッシュコードを算出する。
+    桁数は 4(第1次地域区画)、6(第2次地域区画、10mメッシュのタイル)、
+    8(第2次地域区画の10分の1、5mメッシュのタイル)のいずれか。
+
+    Parameters
+    ----
+    latitudes
+        緯度（北緯、単位：度）、またはその配列
+    longitudes
+        経度（東経、単位：度）、またはその配列
+    digits:int
+        メッシュコードの桁数
+
+    Returns
+    ----
+    np.ndarray
+        メッシュコード(int64)
+
+    Raises
+    ----
+    ValueError
+        桁数が 4、6、8 以外の場合
+    """
+    if digits not in (4, 6, 8):
+        raise ValueError(f'unsupported mesh code digits: {digits}')
+    # 第1次地域区画(緯度40分、経度1度)
+    y = np.asarray(latitudes, dtype=float) * 1.5
+    x = np.asarray(longitudes, dtype=float) - 100.0
+    (p, u) = (np.floor(y), np.floor(x))
+    code = p.astype(np.int64) * 100 + u.astype(np.int64)
+    if digits == 4:
+        return code
+    # 第2次地域区画(第1次地域区画の8分の1)
+    (y, x) = ((y - p) * 8.0, (x - u) * 8.0)
+    (q, v) = (np.floor(y), np.floor(x))
+    code = code * 100 + q.astype(np.int64) * 10 + v.astype(np.int64)
+    if digits == 6:
+        return code
+    # 第2次地域区画の10分の1
+    (r, w) = (np.floor((y - q) * 10.0), np.floor((x - v) * 10.0))
+    return code * 100 + r.astype(np.int64) * 10 + w.astype(np.int64)
+
+def _get_mesh_code(latitude:float, longitude:float, digits:int=6) -> int:
+    """
+    get_mesh_code の1点版(Python の数値で計算する)。
+    """
+    (y, x) = (latitude * 1.5, longitude - 100.0)
+    (p, u) = (math.floor(y), math.floor(x))
+    code = p * 100 + u
+    if digits == 4:
+        return code
+    (y, x) = ((y - p) * 8.0, (x - u) * 8.0)
+    (q, v) = (math.floor(y), math.floor(x))
+    code = code * 100 + q * 10 + v
+    if digits == 6:
+        return code
+    return code * 100 + math.floor((y - q) * 10.0) * 10 + math.floor((x - v) * 10.0)
+
+def get_mesh_bounds(mesh_no) -> tuple[tuple[float, float], tuple[float, float]]:
+    """
+    標準地域メッシュのメッシュコード(4、6、8桁)から範囲を算出する(get_mesh_code の逆)。
+
+    Parameters
+    ----
+    mesh_no
+        メッシュコード（文字列または整数）
+
+    Returns
+    ----
+    tuple(tuple(float, float), tuple(float, float))
+        矩形左下頂点座標（緯度経度）、矩形右上頂点座標（緯度経度）
+
+    Raises
+    ----
+    ValueError
+        メッシュコードの桁数が 4、6、8 以外の場合
+    """
+    code = str(mesh_no)
+    if len(code) not in (4, 6, 8) or not code.isdigit():
+        raise ValueError(f'unsupported mesh code: {mesh_no}')
+    (south, west) = (int(code[:2]) / 1.5, int(code[2:4]) + 100.0)
+    (height, width) = (1.0 / 1.5, 1.0)
+    if len(code) >= 6:
+        (height, width) = (height / 8.0, width / 8.0)
+        (south, west) = (south + int(code[4]) * height, west + int(code[5]) * width)
+    if len(code) == 8:
+        (height, width) = (height / 10.0, width / 10.0)
+        (south, west) = (south + int(code[6]) * height, west + int(code[7]) * width)
+    return ((south, west), (south + height, west + width))
+
+def _interpolate_grid(z:np.ndarray, north:float, west:float, delta:tuple,
+    latitudes, longitudes) -> np.ndarray:
+    """
+    北から南・西から東の順の標高ラスタ(メッシュの中心の標高)を双1次内挿する。
+    ラスタ端の半メッシュ分は端のメッシュの標高を使用する。
+    ラスタの範囲外、または重みが0でないメッシュがデータなしの場合は np.nan とする。
+
+    Parameters
+    ----
+    z:np.ndarray
+        標高ラスタ
+    north:float
+        ラスタ北端の緯度
+    west:float
+        ラスタ西端の経度
+    delta:tuple
+        メッシュ間の距離（緯度方向、経度方向、単位：度）
+    latitudes
+        計算対象の緯度の配列
+    longitudes
+        計算対象の経度の配列
+
+    Returns
+    ----
+    np.ndarray
+        標高
+    """
+    (latitudes, longitudes) = np.broadcast_arrays(np.asarray(latitudes, dtype=float),
+        np.asarray(longitudes, dtype=float))
+    (rows, columns) = z.shape
+    # メッシュの中心を整数とする行・列位置
+    row = (north - latitudes) / delta[0] - 0.5
+    column = (longitudes - west) / delta[1] - 0.5
+    ok = (row >= -0.5) & (row <= rows - 0.5) & (column >= -0.5) & (column <= columns - 0.5)
+    row = np.clip(np.where(ok, row, 0.0), 0.0, rows - 1)
+    column = np.clip(np.where(ok, column, 0.0), 0.0, columns - 1)
+    r0 = np.minimum(row.astype(np.intp), max(rows - 2, 0))
+    c0 = np.minimum(column.astype(np.intp), max(columns - 2, 0))
+    (r1, c1) = (np.minimum(r0 + 1, rows - 1), np.minimum(c0 + 1, columns - 1))
+    (t, u) = (row - r0, column - c0)
+
+    heights = np.zeros(latitudes.shape)
+    for (r, c, weight) in [(r0, c0, (1 - t) * (1 - u)), (r0, c1, (1 - t) * u),
+        (r1, c0, t * (1 - u)), (r1, c1, t * u)]:
+        value = z[r, c].astype(float)
+        no_data = value <= Mesh.NO_DATA
+        ok &= ~(no_data & (weight > 0.0))
+        heights += np.where(no_data, 0.0, value) * weight
+    return np.where(ok, heights, np.nan)
+
+def _record_tiles(results:list) -> list[tuple[Mesh, float]]:
+    """
+    読み込んだタイルの件数・読み込み時間を記録する(ワーカプロセスでの計測は集計されないため)。
+    """
+    for (_, seconds) in results:
+        metrics.observe('mesh_tile_load_seconds', seconds)
+    metrics.increment('mesh_tiles_loaded_total', len(results))
+    return results
+
+def _load_tiles(task:tuple) -> list[tuple[Mesh, float]]:
+    """
+    読み込みタスク(MeshCollection._get_tasks 参照)のタイルを読み込む。
+    ワーカプロセスで実行される。
+
+    Parameters
+    ----
+    task:tuple
+        (コンテナ, メンバー名のリスト)
+
+    Returns
+    ----
+    list[tuple[Mesh, float]]
+        タイルと読み込み時間(秒)のリスト
+    """
+    (container, members) = task
+    results = []
+    if not container[0].lower().endswith('.zip'):
+        start = time.perf_counter()
+        mesh = Mesh(container[0])
+        results.append((mesh, time.perf_counter() - start))
+        return results
+    with zipfile.ZipFile(container[0]) as archive:
+        # zipファイル内のzipファイルは展開せずメモリ上で開く
+        for name in container[1:]:
+            archive = zipfile.ZipFile(io.BytesIO(archive.read(name)))
+        _load_members(archive, '/'.join(container), members, results)
+    return results
+
+def _load_members(archive:zipfile.ZipFile, name:str, members:list, results:list) -> None:
+    """
+    zipファイル内の .xml ファイルを読み込み results へ追加する。
+    members が None の場合はすべての .xml ファイル及び .zip ファイル内を対象とする。
+    """
+    for member in (sorted(archive.namelist()) if members is None else members):
+        if member.lower().endswith('.xml'):
+            start = time.perf_counter()
+            with archive.open(member) as f:
+                mesh = Mesh(f'{name}/{member}', fileobj=f)
+            results.append((mesh, time.perf_counter() - start))
+        elif members is None and member.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(archive.read(member))) as inner:
+                _load_members(inner, f'{name}/{member}', None, results)
 
 if __name__ == '__main__':
     """
-    疎通テスト。
-    """
-    # 10mデータサンプル
-    '''
-    dir_path_10m = 'FG-GML-5339-25-DEM10B'
-    dem10b_path = os.path.join(dir_path_10m, 'FG-GML-5339-25-dem10b-20161001.xml')
-    print('****************')
-    dem10b = Mesh(dem10b_path, True)
-    dem10b.get_histgram(dem10b_path + '_hist.png')
-    dem10b.get_scatter3d(dem10b_path + '_3d.png')
-    dem10b.save_csv(dem10b_path + '.csv')
-    dem10b.save_geojson(dem10b_path + '.json')
-    dem10b.save_geoshp(dem10b_path + '.shp')
-
-    # 5mデータサンプル
-    dir_path_5m = 'FG-GML-5339-25-DEM5A'
-    dem5a_path = os.path.join(dir_path_5m, 'FG-GML-5339-25-00-DEM5A-20161001.xml')
-    print('****************')
-    dem5a = Mesh(dem5a_path, True)
-    dem5a.get_histgram(dem5a_path + '_hist.png')
-    dem5a.get_scatter3d(dem5a_path + '_3d.png')
-    dem5a.save_csv(dem5a_path + '.csv')
-    dem5a.save_geojson(dem5a_path + '.json')
-    dem5a.save_geoshp(dem5a_path + '.shp')
-    '''
-
-    dir_path_10m = 'FG-GML-5339-26-DEM10B'
-    dem10b_path = os.path.join(dir_path_10m, 'FG-GML-5339-26-dem10b-20161001.xml')
-    print('****************')
-    dem10b = Mesh(dem10b_path, True)
-    dem10b.get_histgram(dem10b_path + '_hist.png')
-    dem10b.get_scatter3d(dem10b_path + '_3d.png')
-    dem10b.save_csv(dem10b_path + '.csv')
-    dem10b.save_geojson(dem10b_path + '.json')
-    dem10b.save_geoshp(dem10b_path + '.shp')
\ No newline at end of file
+    指定したDEMファイル・ディレクトリ・zipファイルのタイルを並列に読み込み、
+    タイルごとの読み込み時間を表示する。
+    --output を指定した場合は、タイルごとにCSVファイルを保存する。
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='load GSI DEM tiles from xml files, directories or zip archives')
+    parser.add_argument('paths', type=str, nargs='+', help='DEM file(xml), directory or zip archive paths')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: cpu count)')
+    parser.add_argument('--batch_size', type=int, default=16, help='xml files per task in a zip archive')
+    parser.add_argument('--output', type=str, default=None, help='output directory for CSV files')
+    parser.add_argument('--mosaic', type=str, default=None, help='output mosaic raster file path(npy)')
+    parser.add_argument('--bounds', type=float, nargs=4, default=None, metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'),
+        help='mosaic bounds (tiles are not kept in memory)')
+    parser.add_argument('--debug', type=bool, default=False, help='print debug lines')
+    args = parser.parse_args()
+
+    if args.mosaic is not None and args.bounds is not None:
+        # 指定範囲のモザイクをタイルを保持せずに作成
+        Mosaic.build(args.mosaic, args.paths, args.bounds[:2], args.bounds[2:],
+            workers=args.workers, batch_size=args.batch_size, debug=args.debug)
+        raise SystemExit(0)
+
+    collection = MeshCollection.load(args.paths, workers=args.workers, batch_size=args.batch_size, debug=args.debug)
+    collection.show_timings()
+    if args.mosaic is not None:
+        collection.mosaic(args.mosaic, debug=args.debug)
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        for mesh in collection:
+            mesh.save_csv(os.path.join(args.output, os.path.splitext(os.path.basename(mesh.path))[0] + '.csv'))
@@ -9,12 +9,22 @@ ASCII形式のファイルをダウンロード・展開し、
 拡張子.asc で保存されているジオイドモデルのパスをコンストラクタ引数 path に
 指定してください。
 """
+import os
 import re
-import csv
+import sys
+import gzip
+import json
+import math
+import time
+import warnings
+import itertools
+import threading
+import collections
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import Point
-from typing import Tuple
+from typing import Iterable, Iterator, Tuple
+
+import metrics
 
 class HeightManager:
     """
@@ -46,10 +56,36 @@ class HeightManager:
     """
     MAX_LONGITUDE = 150.0
 
-    def __init__(self, path:str='gsigeo2011_ver2_1.asc', debug:bool=False) -> None:
+    """
+    バイナリキャッシュ形式のバージョン
+    """
+    CACHE_VERSION = 1
+
+    """
+    内挿方法(双1次、双2次、双3次)
+    """
+    INTERPOLATION_METHODS = ('bilinear', 'biquadratic', 'bicubic')
+
+    """
+    双3次内挿の係数算出行列(格子点の値・偏微分から多項式の係数を求める)
+    """
+    BICUBIC_MATRIX = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0],
+        [-3.0, 3.0, -2.0, -1.0], [2.0, -2.0, 1.0, 1.0]])
+
+    """
+    双2次内挿の係数算出行列(中心の格子点と前後の格子点の値から多項式の係数を求める)
+    """
+    BIQUADRATIC_MATRIX = np.array([[0.0, 1.0, 0.0], [-0.5, 0.0, 0.5], [0.5, -1.0, 0.5]])
+
+    def __init__(self, path:str='gsigeo2011_ver2_1.asc', debug:bool=False, dtype=np.float64,
+        cache:bool=True, methods:Iterable=()) -> None:
         """
         日本のジオイド データファイルを読み込み、
         ジオイド高計算のために必要なデータをクラス変数に格納する。
+        cache が True の場合、初回読み込み時にバイナリキャッシュ
+        (path + '.npy'、path + '.json')を作成し、
+        以降はキャッシュをメモリマップで読み込む。
+        methods に双2次・双3次内挿を指定した場合は、内挿係数表(get_coefficients)も読み込み時に準備する。
 
         Parameters
         ----
@@ -57,13 +93,80 @@ class HeightManager:
             日本のジオイド データファイルパス
         debug:bool
             デバッグオプション
+        dtype
+            ジオイド高グリッドの型（デフォルト: np.float64、省メモリ時は np.float32）
+        cache:bool
+            バイナリキャッシュを使用する場合 True（デフォルト: True）
+        methods:Iterable
+            内挿係数表を準備する内挿方法（'biquadratic'、'bicubic'、'bilinear' は無視する）
+
+        Raises
+        ----
+        ValueError
+            データ件数がメタ情報(nla * nlo)と一致しない場合、内挿方法が不正な場合
         """
         # ジオイドデータファイルパス
         self.path = path
         # デバッグオプション
         self.debug = debug
+        # バイナリキャッシュ(内挿係数表を含む)を使用するか
+        self.cache = cache
+
+        # キャッシュが有効であればキャッシュから、無効であればASCII形式ファイルから読み込む
+        loaded = False
+        if cache:
+            with metrics.timer('geoid_load_seconds', phase='cache'):
+                loaded = self._load_cache(dtype)
+            metrics.increment('geoid_cache_requests_total', result='hit' if loaded else 'miss')
+        if not loaded:
+            with metrics.timer('geoid_load_seconds', phase='parse'):
+                self._load_asc(dtype)
+            if cache:
+                with metrics.timer('geoid_load_seconds', phase='save_cache'):
+                    self._save_cache()
+        self._revise_delta() # メタ情報だと精度が低いので算出しなおす
+
+        # データありマスク(True:ジオイド高あり、False:NO_DATA)
+        self.valid = self.grid < self.NO_DATA
+        # convert_xyz の変換結果
+        self._xyz = None
+        # 内挿方法 -> 内挿係数表(get_coefficients 参照)
+        self._coefficients = {}
+        # 初回の内挿時に係数表の算出を待たないよう、指定された内挿方法の係数表を準備する
+        for method in methods:
+            if method != 'bilinear':
+                self.get_coefficients(method)
+
+        if self.debug:
+            print(f'path:  {self.path}')
+            print(f'glamn: {self.glamn}')
+            print(f'glomn: {self.glomn}')
+            print(f'dgla:  {self.dgla}')
+            print(f'dglo:  {self.dglo}')
+            print(f'nla:   {self.nla}')
+            print(f'nlo:   {self.nlo}')
+            print(f'ikind: {self.ikind}')
+            print(f'vern:  {self.vern}')
+            print(f'nla:{self.nla}, grid latitude  length:({self.grid.shape[0]})')
+            print(f'nlo:{self.nlo}, grid longitude length:({self.grid.shape[1]})')
+            print(f'grid dtype:{self.grid.dtype}, nbytes:{self.grid.nbytes}, memmap:{isinstance(self.grid, np.memmap)}')
+            print('init done')
+
+    def _load_asc(self, dtype) -> None:
+        """
+        ジオイドデータ(ASCII形式)を読み込み、メタ情報及びジオイド高グリッドを
+        インスタンス変数へ格納する。
 
-        # ジオイドデータ(ASCII形式)の読み込み
+        Parameters
+        ----
+        dtype
+            ジオイド高グリッドの型
+
+        Raises
+        ----
+        ValueError
+            データ件数がメタ情報(nla * nlo)と一致しない場合
+        """
         with open(self.path, 'r', encoding='utf-8') as f:  # ファイルを開く
             # 先頭行データの要素分割
             line = f.readline().strip()
@@ -78,52 +181,189 @@ class HeightManager:
             self.nlo =   int(float(tokens[5])) # 経線の個数/X:1201
             self.ikind = int(float(tokens[6])) # フォーマット識別子
             self.vern =  str(tokens[7]) # データのバージョン
-            self._revise_delta() # メタ情報だと精度が低いので算出しなおす
 
+            # ヘッダ行以降(ジオイド高)を一括で読み込む
+            values = self._parse_values(f.read())
+
+        # データ件数チェック
+        if values.size != self.nla * self.nlo:
+            raise ValueError(f'value count mismatch in {self.path}: ' + \
+                f'expected {self.nla * self.nlo} (nla:{self.nla} * nlo:{self.nlo}), actual {values.size}')
+
+        # ジオイド高グリッド(緯度インデックス, 経度インデックス)
+        self.grid = np.ascontiguousarray(values.reshape(self.nla, self.nlo), dtype=dtype)
+
+    def _get_cache_paths(self) -> Tuple[str, str]:
+        """
+        バイナリキャッシュのファイルパスを返却する。
+
+        Returns
+        ----
+        Tuple[str, str]
+            ジオイド高グリッド(.npy)ファイルパス、メタ情報(.json)ファイルパス
+        """
+        return (self.path + '.npy', self.path + '.json')
+
+    def _get_source_stat(self) -> dict:
+        """
+        キャッシュ無効化判定に使用するジオイドデータファイルの状態を返却する。
+
+        Returns
+        ----
+        dict
+            ファイルサイズ(size)、更新日時(mtime_ns)
+        """
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _load_cache(self, dtype) -> bool:
+        """
+        バイナリキャッシュが有効であれば、メタ情報をインスタンス変数へ格納し
+        ジオイド高グリッドを読み取り専用のメモリマップとして読み込む。
+
+        Parameters
+        ----
+        dtype
+            ジオイド高グリッドの型
+
+        Returns
+        ----
+        bool
+            キャッシュから読み込んだ場合 True、
+            キャッシュが存在しない・無効の場合 False
+        """
+        (npy_path, json_path) = self._get_cache_paths()
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != self.CACHE_VERSION or \
+                meta.get('source') != self._get_source_stat() or \
+                meta.get('dtype') != np.dtype(dtype).str:
+                if self.debug:
+                    print(f'cache {json_path} is stale')
+                return False
+            grid = np.load(npy_path, mmap_mode='r')
+        except (OSError, ValueError, KeyError) as e:
             if self.debug:
-                print(f'path:  {self.path}')
-                print(f'glamn: {self.glamn}')
-                print(f'glomn: {self.glomn}')
-                print(f'dgla:  {self.dgla}')
-                print(f'dglo:  {self.dglo}')
-                print(f'nla:   {self.nla}')
-                print(f'nlo:   {self.nlo}')
-                print(f'ikind: {self.ikind}')
-                print(f'vern:  {self.vern}')
-
-            idx = 0 # rowに格納した要素数 0,1,2,.. ,(nlo-1)
-            row = [] # 1行のデータを要素分割したもの
-            self.rows = [] # 各行の row を読み込んだ順に格納 
-        
-            # 1行づつ読み込み
-            for line in f.readlines():
-                # 読み込んだ行を要素分割(要素はジオイド高:float値)
-                tokens = re.split(' +', line.strip())
-
-                # 要素を1件づつ処理
-                for token in tokens:
-                    # リストrowへ要素を1件追加
-                    row.append(float(token))
-                    # インデックスを加算
-                    idx = idx + 1
-
-                    # インデックスが経度要素数上限を超えていない場合
-                    if idx < self.nlo:
-                        # 継続
-                        continue
-                    # インデックスが経度要素数上限を超える場合
-                    else:
-                        # インデックスを初期化
-                        idx = 0
-                        # リストrowをリストrowsへ格納
-                        self.rows.append(row)
-                        # リストrowは次の経度のジオイド高を格納するために初期化
-                        row = []
+                print(f'cache {json_path} is not available: {e}')
+            return False
+        if grid.shape != (meta['nla'], meta['nlo']) or grid.dtype != np.dtype(dtype):
+            return False
+
+        self.glamn = float(meta['glamn'])
+        self.glomn = float(meta['glomn'])
+        self.nla =   int(meta['nla'])
+        self.nlo =   int(meta['nlo'])
+        self.ikind = int(meta['ikind'])
+        self.vern =  str(meta['vern'])
+        self.grid = grid
+        if self.debug:
+            print(f'loaded cache {npy_path}')
+        return True
 
+    def _save_cache(self) -> None:
+        """
+        メタ情報及びジオイド高グリッドをバイナリキャッシュとして保存する。
+        書き込みできない場合はキャッシュなしで継続する。
+        """
+        (npy_path, json_path) = self._get_cache_paths()
+        meta = self._get_grid_meta()
+        meta['source'] = self._get_source_stat()
+        try:
+            self._write_grid_files(npy_path, json_path, meta)
+        except OSError as e:
+            if self.debug:
+                print(f'cannot save cache {npy_path}: {e}')
+            return
         if self.debug:
-            print(f'nla:{self.nla}, rows latitude  length:({len(self.rows)})')
-            print(f'nlo:{self.nlo}, rows longitude length:({len(self.rows[0])})')
-            print('init done')
+            print(f'saved cache {npy_path}')
+
+    def _get_grid_meta(self) -> dict:
+        """
+        バイナリ形式(キャッシュ、save_grid)で保存するメタ情報を返却する。
+
+        Returns
+        ----
+        dict
+            形式バージョン、型、ヘッダのメタ情報
+        """
+        return {
+            'version': self.CACHE_VERSION,
+            'dtype': self.grid.dtype.str,
+            'glamn': self.glamn,
+            'glomn': self.glomn,
+            'nla': self.nla,
+            'nlo': self.nlo,
+            'ikind': self.ikind,
+            'vern': self.vern,
+        }
+
+    def _write_grid_files(self, npy_path:str, json_path:str, meta:dict, values:np.ndarray=None) -> None:
+        """
+        ジオイド高グリッド(.npy)とメタ情報(.json)を保存する。
+        並行して起動したプロセスが書きかけのファイルを読まないよう、
+        一時ファイルへ書き込んでから置き換える。
+
+        Parameters
+        ----
+        npy_path:str
+            ジオイド高グリッドの保存先ファイルパス
+        json_path:str
+            メタ情報の保存先ファイルパス
+        meta:dict
+            メタ情報
+        values:np.ndarray
+            保存する配列（デフォルト: None、ジオイド高グリッド）
+        """
+        suffix = f'.{os.getpid()}.tmp'
+        with open(npy_path + suffix, 'wb') as f:
+            np.save(f, self.grid if values is None else values)
+        os.replace(npy_path + suffix, npy_path)
+        # メタ情報はグリッドの後に置き換え、書き込み完了の印とする
+        with open(json_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(json_path + suffix, json_path)
+
+    def _parse_values(self, body:str) -> np.ndarray:
+        """
+        ジオイドデータファイルのヘッダ行以降の文字列を
+        空白・改行区切りの数値列として一括変換する。
+
+        Parameters
+        ----
+        body:str
+            ヘッダ行以降の文字列
+
+        Returns
+        ----
+        np.ndarray
+            ジオイド高の1次元配列(float64)
+
+        Raises
+        ----
+        ValueError
+            数値に変換できない要素が含まれている場合
+        """
+        with warnings.catch_warnings():
+            # 旧版numpyは変換できない要素があると警告を出して途中までの値を返すため例外化する
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                return np.fromstring(body, dtype=np.float64, sep=' ')
+            except (ValueError, DeprecationWarning) as e:
+                raise ValueError(f'invalid value in {self.path}: {e}') from e
+
+    @property
+    def rows(self) -> np.ndarray:
+        """
+        ジオイド高グリッド(self.grid)の別名。
+        rows[緯度インデックス][経度インデックス] 形式での参照を維持するために残している。
+
+        Returns
+        ----
+        np.ndarray
+            ジオイド高グリッド(shape:(nla, nlo))
+        """
+        return self.grid
 
     def _revise_delta(self):
         """
@@ -134,33 +374,63 @@ class HeightManager:
         self.dglo = self.DELTA_LONGITUDE
 
 
-    def save(self, path:str='geoid_xyz.csv') -> None:
+    @metrics.timed('geoid_export_seconds', format='csv')
+    def save(self, path:str='geoid_xyz.csv', precision:int=None, header:bool=False,
+        compress:bool=None, chunk_size:int=100000) -> None:
         """
         ジオイドデータをCSVファイルとして保存する。
         CSVファイルの各行は、
-        北緯緯度(dd.dddd..)、西経経度(ddd.dddd..)、ジオイド高(99.9999..)
+        東経経度(ddd.dddd..)、北緯緯度(dd.dddd..)、ジオイド高(99.9999..)
         の順に格納される。
+        chunk_size 行づつまとめて文字列化して書き込む。
 
         Parameters
         ----
         path:str
             CSVファイルパス
+        precision:int
+            小数点以下桁数（デフォルト: None、丸めない）
+        header:bool
+            True の場合、先頭行に列名(longitude,latitude,height)を出力する
+        compress:bool
+            True の場合、gzip圧縮して保存する（デフォルト: None、path が .gz で終わる場合に圧縮）
+        chunk_size:int
+            一度に文字列化する行数
         """
-        # リストx:緯度、リストy:経度、リストz:ジオイド高 に変換
-        (x, y, z) = self.convert_xyz()
-
-        total = len(x)
-        with open(path, 'w', newline='') as f:
-            writer = csv.writer(f, delimiter=',')
-            for i in range(total):
-                writer.writerow([x[i], y[i], z[i]])
+        # リストz:ジオイド高 に変換(convert_xyz と同じ順序)
+        (_, _, z) = self.convert_xyz()
+        (lat_idx, lon_idx) = np.nonzero(self.valid)
+
+        # 経度・緯度は格子点の種類しかないため、先に文字列化しておき参照する
+        num = '%r' if precision is None else f'%.{precision}f'
+        longitudes = np.array([num % v for v in (self.glomn + np.arange(self.nlo) * self.dglo).tolist()], dtype=object)
+        latitudes = np.array([num % v for v in (self.glamn + np.arange(self.nla) * self.dgla).tolist()], dtype=object)
+        # 行のテンプレート(csv.writer と同じく改行は CRLF)
+        row = f'%s,%s,{num}\r\n'
+
+        if compress is None:
+            compress = path.endswith('.gz')
+        with (gzip.open(path, 'wt', newline='', compresslevel=6) if compress else open(path, 'w', newline='')) as f:
+            if header:
+                f.write('longitude,latitude,height\r\n')
+            for start in range(0, len(z), chunk_size):
+                stop = min(start + chunk_size, len(z))
+                values = np.empty((stop - start, 3), dtype=object)
+                values[:, 0] = longitudes[lon_idx[start:stop]]
+                values[:, 1] = latitudes[lat_idx[start:stop]]
+                values[:, 2] = z[start:stop].tolist()
+                f.write((row * (stop - start)) % tuple(values.ravel().tolist()))
 
         if self.debug:
             print(f'saved to {path}')
 
-    def save_geojson(self, path:str='geoid.json', crs:str='EPSG:4326'):
+    @metrics.timed('geoid_export_seconds', format='geojson')
+    def save_geojson(self, path:str='geoid.json', crs:str='EPSG:4326', precision:int=None,
+        seq:bool=False, chunk_size:int=100000):
         """
         ジオイドモデルをGeoJson形式で保存する。
+        GeoDataFrame を経由せず、chunk_size 点づつ文字列化して書き込むため、
+        メモリ使用量は点数によらずほぼ一定となる。
 
         Parameters
         ----
@@ -168,8 +438,57 @@ class HeightManager:
             GeoJson形式ファイルパス
         crs:str
             座標系（デフォルト: 'EPSG:4326'）
+        precision:int
+            座標・ジオイド高の小数点以下桁数（デフォルト: None、丸めない）
+        seq:bool
+            True の場合、1行1フィーチャの GeoJSONSeq 形式で保存する
+        chunk_size:int
+            一度に文字列化する点の数
         """
-        self.get_gpd(crs=crs).to_file(driver='GeoJSON', filename=path)
+        (x, y, z) = self.convert_xyz()
+
+        # フィーチャのテンプレート(ジオイド高、経度、緯度の順に埋め込む)
+        num = '%r' if precision is None else f'%.{precision}f'
+        feature = '{"type":"Feature","properties":{"height":' + num + \
+            '},"geometry":{"type":"Point","coordinates":[' + num + ',' + num + ']}}'
+        separator = '\n' if seq else ',\n'
+
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            if not seq:
+                f.write('{"type":"FeatureCollection"' + self._get_geojson_crs(crs) + ',"features":[\n')
+            for start in range(0, len(z), chunk_size):
+                stop = min(start + chunk_size, len(z))
+                values = np.column_stack((z[start:stop], x[start:stop], y[start:stop])).ravel().tolist()
+                if start > 0:
+                    f.write(separator)
+                f.write(separator.join([feature] * (stop - start)) % tuple(values))
+            f.write('\n' if seq else '\n]}\n')
+
+        if self.debug:
+            print(f'saved geojson to {path}')
+
+    @staticmethod
+    def _get_geojson_crs(crs:str) -> str:
+        """
+        GeoJSON の FeatureCollection に付与する crs メンバーを返却する。
+        EPSG:4326(GeoJSON の既定座標系)の場合は付与しない。
+
+        Parameters
+        ----
+        crs:str
+            座標系（例: 'EPSG:6668'）
+
+        Returns
+        ----
+        str
+            ',"crs":{...}' 形式の文字列、または空文字列
+        """
+        if crs is None or crs.upper() in ('EPSG:4326', 'OGC:CRS84'):
+            return ''
+        name = crs
+        if crs.upper().startswith('EPSG:'):
+            name = 'urn:ogc:def:crs:EPSG::' + crs.split(':', 1)[1]
+        return ',"crs":{"type":"name","properties":{"name":' + json.dumps(name) + '}}'
 
     def save_geoshp(self, path:str='geoid.shp', crs:str='EPSG:4326'):
         """
@@ -184,6 +503,112 @@ class HeightManager:
         """
         self.get_gpd(crs=crs).to_file(driver='ESRI Shapefile', filename=path)
 
+    @metrics.timed('geoid_export_seconds', format='parquet')
+    def save_parquet(self, path:str='geoid.parquet', crs:str='EPSG:4326') -> None:
+        """
+        ジオイドモデルをGeoParquet形式で保存する。
+        pyarrow パッケージが必要。
+
+        Parameters
+        ----
+        path:str
+            GeoParquet形式ファイルパス
+        crs:str
+            座標系（デフォルト: 'EPSG:4326'）
+        """
+        self.get_gpd(crs=crs).to_parquet(path)
+        if self.debug:
+            print(f'saved parquet to {path}')
+
+    @metrics.timed('geoid_export_seconds', format='feather')
+    def save_feather(self, path:str='geoid.feather', crs:str='EPSG:4326') -> None:
+        """
+        ジオイドモデルをFeather(Arrow IPC)形式で保存する。
+        pyarrow パッケージが必要。
+
+        Parameters
+        ----
+        path:str
+            Feather形式ファイルパス
+        crs:str
+            座標系（デフォルト: 'EPSG:4326'）
+        """
+        self.get_gpd(crs=crs).to_feather(path)
+        if self.debug:
+            print(f'saved feather to {path}')
+
+    @staticmethod
+    def load_points(path:str) -> gpd.GeoDataFrame:
+        """
+        save_parquet/save_feather で保存したファイルを GeoDataFrame として読み込む。
+        拡張子 .parquet の場合は GeoParquet、それ以外は Feather 形式として読み込む。
+        pyarrow パッケージが必要。
+
+        Parameters
+        ----
+        path:str
+            GeoParquet形式またはFeather形式ファイルパス
+
+        Returns
+        ----
+        gpd.GeoDataFrame
+            ジオイドモデル(ジオイド高:'height'属性)
+        """
+        if path.endswith('.parquet'):
+            return gpd.read_parquet(path)
+        return gpd.read_feather(path)
+
+    @metrics.timed('geoid_export_seconds', format='grid')
+    def save_grid(self, path:str='geoid_grid.npy') -> None:
+        """
+        ジオイド高グリッドをバイナリ形式(.npy)で、メタ情報をJSON形式で保存する。
+        メタ情報は path の拡張子を .json に置き換えたファイルに保存する。
+        load_grid でメモリマップとして読み込むことができる。
+
+        Parameters
+        ----
+        path:str
+            ジオイド高グリッドの保存先ファイルパス(.npy)
+        """
+        self._write_grid_files(path, os.path.splitext(path)[0] + '.json', self._get_grid_meta())
+        if self.debug:
+            print(f'saved grid to {path}')
+
+    @classmethod
+    def load_grid(cls, path:str='geoid_grid.npy', debug:bool=False) -> 'HeightManager':
+        """
+        save_grid で保存したジオイド高グリッドを読み取り専用のメモリマップとして読み込み、
+        インスタンスを生成する。ASCII形式のデータファイルは不要。
+
+        Parameters
+        ----
+        path:str
+            ジオイド高グリッドのファイルパス(.npy)
+        debug:bool
+            デバッグオプション
+
+        Returns
+        ----
+        HeightManager
+            インスタンス
+
+        Raises
+        ----
+        ValueError
+            形式バージョン・グリッドの形状がメタ情報と一致しない場合
+        """
+        with open(os.path.splitext(path)[0] + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != cls.CACHE_VERSION:
+            raise ValueError(f'unsupported grid version:({meta.get("version")}) in {path}')
+        grid = np.load(path, mmap_mode='r')
+        if grid.shape != (meta['nla'], meta['nlo']):
+            raise ValueError(f'grid shape:{grid.shape} does not match meta ({meta["nla"]}, {meta["nlo"]})')
+        meta['path'] = path
+        mgr = cls._from_grid(meta, grid)
+        mgr.debug = debug
+        return mgr
+
     def get_scatter2d(self, path:str=None) -> None:
         """
         日本のジオイドデータを2次元散布図に変換する。
@@ -270,9 +695,13 @@ class HeightManager:
             if self.debug:
                 print(f'saved 3d scatter to {path}')
 
-    def interpolate(self, latitude:float, longitude:float) -> float:
+    def interpolate(self, latitude:float, longitude:float, method:str='bilinear') -> float:
         """
         内挿計算により指定された緯度・経度（単位：度）のジオイド高を算出する。
+        計測(metrics)が有効な場合は、処理時間・件数を記録する。
+        双2次・双3次内挿は事前に算出した内挿係数表(get_coefficients)を参照するため、
+        計算量は双1次内挿とほぼ同じとなる。使用する格子点にデータがない(NO_DATA)場合は
+        双1次内挿の値を返却する(周囲4格子点にもデータがない場合は ValueError)。
     
         Parameters
         ----
@@ -280,6 +709,8 @@ class HeightManager:
             計算対象の緯度（北緯、単位：度）
         longitude:float
             計算対象の経度（整形、単位：度）
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
 
         Returns
         ----
@@ -289,33 +720,652 @@ class HeightManager:
         Raises
         ----
         ValueError
-            ジオイドデータ範囲外を指定された場合
+            ジオイドデータ範囲外を指定された場合、
+            双2次・双3次内挿で周囲4格子点のいずれかにデータがない(NO_DATA)場合
+        """
+        if not metrics.REGISTRY.enabled:
+            return self._interpolate(latitude, longitude, method)
+        start = time.perf_counter()
+        try:
+            height = self._interpolate(latitude, longitude, method)
+        except ValueError:
+            metrics.increment('geoid_interpolate_errors_total', method='interpolate')
+            raise
+        finally:
+            metrics.observe('geoid_interpolate_seconds', time.perf_counter() - start, method='interpolate')
+        metrics.increment('geoid_points_interpolated_total', method='interpolate')
+        return height
+
+    def _interpolate(self, latitude:float, longitude:float, method:str='bilinear') -> float:
         """
+        interpolate の計算本体(計測なし)。
+        """
+        if method != 'bilinear':
+            height = self._interpolate_table(latitude, longitude, method)
+            if height == height:
+                return height
+            # 使用する格子点にデータがない場合は双1次内挿
         # 緯度インデックス算出
         (low_lat_idx, up_lat_idx) = self._get_latitude_index(latitude)
         # 経度インデックス算出
         (low_lon_idx, up_lon_idx) = self._get_longitude_index(longitude)
+        grid = self.grid
+        if method != 'bilinear':
+            # 周囲4格子点にもデータがない場合は interpolate_many(np.nan)と同じく算出できないものとする
+            valid = self.valid
+            if not (valid[low_lat_idx, low_lon_idx] and valid[low_lat_idx, up_lon_idx] and \
+                valid[up_lat_idx, low_lon_idx] and valid[up_lat_idx, up_lon_idx]):
+                raise ValueError(f'no geoid data around:({latitude},{longitude})')
         if low_lat_idx == up_lat_idx:
             if low_lon_idx == up_lon_idx:
-                return self.rows[low_lat_idx][low_lon_idx]
+                return float(grid[low_lat_idx, low_lon_idx])
             else:
                 u = (longitude - self._get_longitude(low_lon_idx)) / \
                     (self._get_longitude(up_lon_idx) - self._get_longitude(low_lon_idx))
-                return u * (self.rows[low_lat_idx][up_lon_idx] - self.rows[low_lat_idx][low_lon_idx]) + \
-                    self.rows[low_lat_idx][low_lon_idx]
+                return float(u * (grid[low_lat_idx, up_lon_idx] - grid[low_lat_idx, low_lon_idx]) + \
+                    grid[low_lat_idx, low_lon_idx])
         else:
             t = (latitude  - self._get_latitude( low_lat_idx)) / \
                 (self._get_latitude( up_lat_idx) - self._get_latitude( low_lat_idx))
             if low_lon_idx == up_lon_idx:
-                return t * (self.rows[up_lat_idx][low_lon_idx] - self.rows[low_lat_idx][low_lon_idx]) + \
-                    self.rows[low_lat_idx][low_lon_idx]
+                return float(t * (grid[up_lat_idx, low_lon_idx] - grid[low_lat_idx, low_lon_idx]) + \
+                    grid[low_lat_idx, low_lon_idx])
             else:
                 u = (longitude - self._get_longitude(low_lon_idx)) / \
                     (self._get_longitude(up_lon_idx) - self._get_longitude(low_lon_idx))
-                return (1 - t) * (1 - u) * self.rows[low_lat_idx][low_lon_idx] + \
-                    (1 - t) * u       * self.rows[low_lat_idx][ up_lon_idx] + \
-                    t       * (1 - u) * self.rows[ up_lat_idx][low_lon_idx] + \
-                    t       * u       * self.rows[ up_lat_idx][ up_lon_idx]
+                return float((1 - t) * (1 - u) * grid[low_lat_idx, low_lon_idx] + \
+                    (1 - t) * u       * grid[low_lat_idx,  up_lon_idx] + \
+                    t       * (1 - u) * grid[ up_lat_idx, low_lon_idx] + \
+                    t       * u       * grid[ up_lat_idx,  up_lon_idx])
+
+    def interpolate_many(self, latitudes, longitudes, method:str='bilinear') -> np.ndarray:
+        """
+        内挿計算により指定された複数の緯度・経度（単位：度）のジオイド高を一括で算出する。
+        interpolate と同じ内挿をベクトル演算で行う。
+        ジオイドデータ範囲外、または内挿に使用する格子点にデータがない(NO_DATA)
+        場合は例外とせず np.nan を返却する。
+
+        Parameters
+        ----
+        latitudes
+            計算対象の緯度（北緯、単位：度）の配列（np.ndarray、リスト等）
+        longitudes
+            計算対象の経度（東経、単位：度）の配列（np.ndarray、リスト等）
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
+
+        Returns
+        ----
+        np.ndarray
+            ジオイド高（単位：メートル、float64）の配列、
+            形状は latitudes と longitudes をブロードキャストした形状
+        """
+        (latitudes, longitudes) = np.broadcast_arrays(
+            np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+        if method != 'bilinear':
+            return self._interpolate_table_many(latitudes, longitudes, method)
+
+        # 緯度・経度インデックスと重みを算出
+        with metrics.timer('geoid_batch_seconds', method='interpolate_many', phase='index'):
+            (low_lat_idx, up_lat_idx, t, lat_ok) = self._get_index_weights(
+                latitudes, self.glamn, self.MAX_LATITUDE, self.nla)
+            (low_lon_idx, up_lon_idx, u, lon_ok) = self._get_index_weights(
+                longitudes, self.glomn, self.MAX_LONGITUDE, self.nlo)
+
+        with metrics.timer('geoid_batch_seconds', method='interpolate_many', phase='interpolate'):
+            # 周囲4格子点
+            grid = self.grid
+            v00 = grid[low_lat_idx, low_lon_idx]
+            v01 = grid[low_lat_idx,  up_lon_idx]
+            v10 = grid[ up_lat_idx, low_lon_idx]
+            v11 = grid[ up_lat_idx,  up_lon_idx]
+
+            heights = (1 - t) * (1 - u) * v00 + \
+                (1 - t) * u       * v01 + \
+                t       * (1 - u) * v10 + \
+                t       * u       * v11
+
+            # 範囲外、または周囲4格子点のいずれかが NO_DATA の場合は np.nan
+            valid = self.valid
+            ok = lat_ok & lon_ok & \
+                valid[low_lat_idx, low_lon_idx] & valid[low_lat_idx, up_lon_idx] & \
+                valid[ up_lat_idx, low_lon_idx] & valid[ up_lat_idx, up_lon_idx]
+            heights = np.where(ok, heights, np.nan)
+        metrics.increment('geoid_points_interpolated_total', heights.size, method='interpolate_many')
+        return heights
+
+    @metrics.timed('geoid_batch_seconds', method='interpolate_grid', phase='total')
+    def interpolate_grid(self, latitudes, longitudes, method:str='bilinear') -> np.ndarray:
+        """
+        緯度の座標軸と経度の座標軸の全組み合わせ(格子)のジオイド高を一括で算出する。
+        双1次内挿は緯度方向・経度方向に分離できるため、先に緯度方向の内挿を
+        使用する経度範囲の格子点に対して行い、次に経度方向の内挿を行う。
+        DEM のようにジオイドの格子より細かい格子では、点ごとに interpolate_many で
+        算出するより計算量が少ない。範囲外・データなしの扱いは interpolate_many と同じ。
+        双2次・双3次内挿の場合は、全組み合わせの点を interpolate_many で算出する。
+
+        Parameters
+        ----
+        latitudes
+            緯度（北緯、単位：度）の座標軸（1次元）
+        longitudes
+            経度（東経、単位：度）の座標軸（1次元）
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
+
+        Returns
+        ----
+        np.ndarray
+            ジオイド高（単位：メートル、float64）の配列、形状は (緯度の数, 経度の数)
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64).ravel()
+        longitudes = np.asarray(longitudes, dtype=np.float64).ravel()
+        if method != 'bilinear':
+            return self.interpolate_many(latitudes[:, None], longitudes[None, :], method=method)
+        heights = np.full((latitudes.size, longitudes.size), np.nan)
+
+        # 緯度・経度インデックスと重みを算出
+        (low_lat_idx, up_lat_idx, t, lat_ok) = self._get_index_weights(
+            latitudes, self.glamn, self.MAX_LATITUDE, self.nla)
+        (low_lon_idx, up_lon_idx, u, lon_ok) = self._get_index_weights(
+            longitudes, self.glomn, self.MAX_LONGITUDE, self.nlo)
+        if not lat_ok.any() or not lon_ok.any():
+            return heights
+
+        # 使用する経度範囲の格子点
+        first = int(low_lon_idx[lon_ok].min())
+        last = int(up_lon_idx[lon_ok].max()) + 1
+        grid = self.grid[:, first:last]
+        valid = self.valid[:, first:last]
+        low_lon_idx = np.clip(low_lon_idx - first, 0, last - first - 1)
+        up_lon_idx = np.clip(up_lon_idx - first, 0, last - first - 1)
+
+        # 緯度方向の内挿 (緯度の数, 経度範囲の格子点の数)
+        rows = (1 - t)[:, None] * grid[low_lat_idx] + t[:, None] * grid[up_lat_idx]
+        rows_valid = valid[low_lat_idx] & valid[up_lat_idx]
+        # 経度方向の内挿 (緯度の数, 経度の数)
+        values = rows[:, low_lon_idx] * (1 - u) + rows[:, up_lon_idx] * u
+
+        # 範囲外、または周囲4格子点のいずれかが NO_DATA の場合は np.nan
+        ok = lat_ok[:, None] & lon_ok[None, :] & \
+            rows_valid[:, low_lon_idx] & rows_valid[:, up_lon_idx]
+        np.copyto(heights, values, where=ok)
+        metrics.increment('geoid_points_interpolated_total', heights.size, method='interpolate_grid')
+        return heights
+
+    @staticmethod
+    def _get_index_weights(values:np.ndarray, minimum:float, maximum:float, count:int) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        緯度または経度の配列から、下限・上限インデックス、内挿の重み、
+        範囲内フラグを算出する。
+        _get_latitude_index/_get_longitude_index 及び
+        _get_latitude/_get_longitude と同じ計算を配列に対して行う。
+        範囲外要素のインデックスは 0 とする。
+
+        Parameters
+        ----
+        values:np.ndarray
+            緯度または経度（単位：度）
+        minimum:float
+            最小値（glamn または glomn）
+        maximum:float
+            最大値（MAX_LATITUDE または MAX_LONGITUDE）
+        count:int
+            格子点の個数（nla または nlo）
+
+        Returns
+        ----
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+            下限インデックス、上限インデックス、重み(0.0〜1.0)、範囲内フラグ
+        """
+        ok = (minimum <= values) & (values <= maximum) # np.nan も範囲外
+        values = np.where(ok, values, minimum)
+        lower = ((values - minimum) / (maximum - minimum) * (count - 1)).astype(np.intp)
+        upper = np.where(values - minimum > 0.0, lower + 1, lower)
+        ok &= upper < count
+        lower = np.where(ok, lower, 0)
+        upper = np.where(ok, upper, 0)
+
+        # 格子点の緯度または経度
+        lower_value = minimum + lower * (maximum - minimum) / float(count - 1)
+        upper_value = minimum + upper * (maximum - minimum) / float(count - 1)
+        delta = upper_value - lower_value
+        weight = np.divide(values - lower_value, delta, out=np.zeros_like(values), where=delta > 0.0)
+        return (lower, upper, weight, ok)
+
+    def get_coefficients(self, method:str) -> np.ndarray:
+        """
+        内挿方法の内挿係数表を返却する。初回はバイナリキャッシュ
+        (path + '.<method>.npy'、path + '.<method>.json')から読み込み、
+        キャッシュがない場合は算出してキャッシュに保存する。以降はインスタンスに保持した表を返却する。
+
+        双3次内挿(bicubic)の表は緯度方向 nla - 1、経度方向 nlo - 1 個のセル(4格子点に囲まれた範囲)ごとに、
+        セル内の相対位置 (t, u)（0.0〜1.0、格子間隔単位）の3次多項式の係数 a[p * 4 + q] (t**p * u**q の係数)を
+        格納する。格子点の偏微分は中心差分(端は片側差分)で求める。
+        双2次内挿(biquadratic)の表は端を除く格子点(nla - 2, nlo - 2)ごとに、最も近い格子点からの
+        相対位置 (t, u)（-0.5〜0.5、端は -1.5〜1.5）の2次多項式の係数 a[p * 3 + q] を格納する
+        (周囲3×3格子点を通る)。使用する格子点にデータがない(NO_DATA)セルの係数は np.nan とする。
+
+        Parameters
+        ----
+        method:str
+            内挿方法（'biquadratic' または 'bicubic'）
+
+        Returns
+        ----
+        np.ndarray
+            内挿係数表（float64、形状は (セル数(緯度方向), セル数(経度方向), 係数の数)）
+
+        Raises
+        ----
+        ValueError
+            内挿方法が不正な場合、格子点の数が3未満の場合
+        """
+        table = self._coefficients.get(method)
+        if table is not None:
+            return table
+        if method not in self.INTERPOLATION_METHODS or method == 'bilinear':
+            raise ValueError(f'unsupported interpolation method:({method})')
+        if self.nla < 3 or self.nlo < 3:
+            raise ValueError(f'{method} interpolation needs at least 3x3 grid points')
+
+        table = self._load_coefficients(method) if self.cache else None
+        if table is None:
+            with metrics.timer('geoid_coefficients_seconds', method=method, phase='build'):
+                table = self._build_coefficients(method)
+            if self.cache:
+                self._save_coefficients(method, table)
+                # 算出した表は破棄し、保存したキャッシュをメモリマップで参照する
+                cached = self._load_coefficients(method)
+                if cached is not None:
+                    table = cached
+        self._coefficients[method] = table
+        return table
+
+    def _build_coefficients(self, method:str, chunk_rows:int=256) -> np.ndarray:
+        """
+        内挿係数表を算出する(get_coefficients 参照)。chunk_rows 行づつ算出する。
+        """
+        grid = np.asarray(self.grid, dtype=np.float64)
+        # 周囲3×3格子点(範囲外は自身)にデータがあるか
+        padded = np.pad(self.valid, 1, mode='edge')
+        windows = np.lib.stride_tricks.sliding_window_view(padded, (3, 3))
+        around = windows.all(axis=(2, 3))
+        if method == 'biquadratic':
+            matrix = self.BIQUADRATIC_MATRIX
+            table = np.empty((self.nla - 2, self.nlo - 2, 9))
+            values = np.lib.stride_tricks.sliding_window_view(grid, (3, 3))
+            ok = around[1:-1, 1:-1]
+            for start in range(0, self.nla - 2, chunk_rows):
+                stop = min(start + chunk_rows, self.nla - 2)
+                coefficients = matrix @ values[start:stop] @ matrix.T
+                coefficients[~ok[start:stop]] = np.nan
+                table[start:stop] = coefficients.reshape(stop - start, self.nlo - 2, 9)
+            return table
+
+        # 双3次: 格子点の値と偏微分(格子間隔単位)
+        d_lat = np.gradient(grid, axis=0, edge_order=2)
+        d_lon = np.gradient(grid, axis=1, edge_order=2)
+        d_both = np.gradient(d_lat, axis=1, edge_order=2)
+        # セルの4格子点の偏微分の算出に使用する格子点にデータがあるか
+        ok = around[:-1, :-1] & around[1:, :-1] & around[:-1, 1:] & around[1:, 1:]
+        matrix = self.BICUBIC_MATRIX
+        table = np.empty((self.nla - 1, self.nlo - 1, 16))
+        for start in range(0, self.nla - 1, chunk_rows):
+            stop = min(start + chunk_rows, self.nla - 1)
+            (low, up) = (slice(start, stop), slice(start + 1, stop + 1))
+            # [[f(0,0), f(0,1), fu(0,0), fu(0,1)], [f(1,0), f(1,1), fu(1,0), fu(1,1)],
+            #  [ft(0,0), ft(0,1), ftu(0,0), ftu(0,1)], [ft(1,0), ft(1,1), ftu(1,0), ftu(1,1)]]
+            corners = np.stack([
+                np.stack([grid[low, :-1], grid[low, 1:], d_lon[low, :-1], d_lon[low, 1:]], axis=-1),
+                np.stack([grid[up, :-1], grid[up, 1:], d_lon[up, :-1], d_lon[up, 1:]], axis=-1),
+                np.stack([d_lat[low, :-1], d_lat[low, 1:], d_both[low, :-1], d_both[low, 1:]], axis=-1),
+                np.stack([d_lat[up, :-1], d_lat[up, 1:], d_both[up, :-1], d_both[up, 1:]], axis=-1),
+            ], axis=-2)
+            coefficients = matrix @ corners @ matrix.T
+            coefficients[~ok[start:stop]] = np.nan
+            table[start:stop] = coefficients.reshape(stop - start, self.nlo - 1, 16)
+        return table
+
+    def _get_coefficient_paths(self, method:str) -> Tuple[str, str]:
+        """
+        内挿係数表のバイナリキャッシュのファイルパスを返却する。
+
+        Returns
+        ----
+        Tuple[str, str]
+            内挿係数表(.npy)ファイルパス、メタ情報(.json)ファイルパス
+        """
+        return (f'{self.path}.{method}.npy', f'{self.path}.{method}.json')
+
+    def _load_coefficients(self, method:str) -> np.ndarray:
+        """
+        内挿係数表のバイナリキャッシュが有効であれば、読み取り専用のメモリマップとして読み込む。
+
+        Returns
+        ----
+        np.ndarray
+            内挿係数表、キャッシュが存在しない・無効の場合 None
+        """
+        (npy_path, json_path) = self._get_coefficient_paths(method)
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != self.CACHE_VERSION or meta.get('method') != method or \
+                meta.get('dtype') != np.dtype(np.float64).str or meta.get('source') != self._get_source_stat():
+                if self.debug:
+                    print(f'coefficients cache {json_path} is stale')
+                return None
+            with metrics.timer('geoid_coefficients_seconds', method=method, phase='load'):
+                table = np.load(npy_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            if self.debug:
+                print(f'coefficients cache {json_path} is not available: {e}')
+            return None
+        if list(table.shape) != meta.get('shape') or table.dtype.str != meta.get('dtype'):
+            return None
+        if self.debug:
+            print(f'loaded coefficients cache {npy_path}')
+        return table
+
+    def _save_coefficients(self, method:str, table:np.ndarray) -> None:
+        """
+        内挿係数表をバイナリキャッシュとして保存する。書き込みできない場合はキャッシュなしで継続する。
+        """
+        (npy_path, json_path) = self._get_coefficient_paths(method)
+        meta = {'version': self.CACHE_VERSION, 'method': method, 'shape': list(table.shape),
+            'dtype': table.dtype.str, 'source': self._get_source_stat()}
+        try:
+            self._write_grid_files(npy_path, json_path, meta, table)
+        except OSError as e:
+            if self.debug:
+                print(f'cannot save coefficients cache {npy_path}: {e}')
+            return
+        if self.debug:
+            print(f'saved coefficients cache {npy_path}')
+
+    def _interpolate_table(self, latitude:float, longitude:float, method:str) -> float:
+        """
+        内挿係数表を参照して1点のジオイド高を算出する(interpolate 参照)。
+        使用する格子点にデータがない場合は np.nan を返却する。
+
+        Raises
+        ----
+        ValueError
+            ジオイドデータ範囲外を指定された場合、内挿方法が不正な場合
+        """
+        table = self.get_coefficients(method)
+        # 格子間隔単位の位置
+        t = (latitude - self.glamn) / (self.MAX_LATITUDE - self.glamn) * (self.nla - 1)
+        u = (longitude - self.glomn) / (self.MAX_LONGITUDE - self.glomn) * (self.nlo - 1)
+        if not 0.0 <= t <= self.nla - 1:
+            raise ValueError(f'latitude:({latitude}) is out of range')
+        if not 0.0 <= u <= self.nlo - 1:
+            raise ValueError(f'longitude:({longitude}) is out of range')
+        if method == 'bicubic':
+            # セルの南西端の格子点からの相対位置
+            (i, j) = (min(int(t), self.nla - 2), min(int(u), self.nlo - 2))
+            (t, u) = (t - i, u - j)
+            a = table[i, j].tolist()
+            return (((a[15] * u + a[14]) * u + a[13]) * u + a[12]) * t * t * t + \
+                (((a[11] * u + a[10]) * u + a[9]) * u + a[8]) * t * t + \
+                (((a[7] * u + a[6]) * u + a[5]) * u + a[4]) * t + \
+                ((a[3] * u + a[2]) * u + a[1]) * u + a[0]
+        # 最も近い格子点(端を除く)からの相対位置
+        i = min(max(math.floor(t + 0.5), 1), self.nla - 2)
+        j = min(max(math.floor(u + 0.5), 1), self.nlo - 2)
+        (t, u) = (t - i, u - j)
+        a = table[i - 1, j - 1].tolist()
+        return ((a[8] * u + a[7]) * u + a[6]) * t * t + ((a[5] * u + a[4]) * u + a[3]) * t + \
+            (a[2] * u + a[1]) * u + a[0]
+
+    def _interpolate_table_many(self, latitudes:np.ndarray, longitudes:np.ndarray, method:str) -> np.ndarray:
+        """
+        内挿係数表を参照して複数の緯度・経度のジオイド高を一括で算出する(interpolate_many 参照)。
+        使用する格子点にデータがない点は双1次内挿の値とする。
+        """
+        table = self.get_coefficients(method)
+        with metrics.timer('geoid_batch_seconds', method='interpolate_many', phase='index'):
+            t = (latitudes - self.glamn) / (self.MAX_LATITUDE - self.glamn) * (self.nla - 1)
+            u = (longitudes - self.glomn) / (self.MAX_LONGITUDE - self.glomn) * (self.nlo - 1)
+            ok = (0.0 <= t) & (t <= self.nla - 1) & (0.0 <= u) & (u <= self.nlo - 1) # np.nan も範囲外
+            (t, u) = (np.where(ok, t, 0.0), np.where(ok, u, 0.0))
+            if method == 'bicubic':
+                (i, j) = (np.minimum(t.astype(np.intp), self.nla - 2), np.minimum(u.astype(np.intp), self.nlo - 2))
+                (t, u) = (t - i, u - j)
+                degree = 4
+            else:
+                i = np.clip(np.floor(t + 0.5).astype(np.intp), 1, self.nla - 2)
+                j = np.clip(np.floor(u + 0.5).astype(np.intp), 1, self.nlo - 2)
+                (t, u) = (t - i, u - j)
+                (i, j) = (i - 1, j - 1)
+                degree = 3
+
+        with metrics.timer('geoid_batch_seconds', method='interpolate_many', phase='interpolate'):
+            a = table[i.ravel(), j.ravel()].reshape(-1, degree, degree)
+            (t, u) = (t.reshape(-1, 1), u.reshape(-1, 1))
+            t_powers = np.hstack([np.ones_like(t)] + [t ** p for p in range(1, degree)])
+            u_powers = np.hstack([np.ones_like(u)] + [u ** q for q in range(1, degree)])
+            heights = np.einsum('np,npq,nq->n', t_powers, a, u_powers).reshape(latitudes.shape)
+            heights[~ok] = np.nan
+
+        # 使用する格子点にデータがない点は双1次内挿
+        fallback = ok & np.isnan(heights)
+        metrics.increment('geoid_points_interpolated_total', int(ok.sum() - fallback.sum()), method='interpolate_many')
+        if fallback.any():
+            heights[fallback] = self.interpolate_many(latitudes[fallback], longitudes[fallback])
+        return heights
+
+    def interpolate_stream(self, chunks:Iterable, method:str='bilinear') -> Iterator[np.ndarray]:
+        """
+        緯度・経度配列のチャンクを順に受け取り、チャンクごとのジオイド高を返却する
+        ジェネレータ。全件をメモリ上に保持しないため、巨大な点群でも
+        チャンクサイズ分のメモリで処理できる。
+
+        Parameters
+        ----
+        chunks:Iterable
+            (緯度配列, 経度配列) タプルのイテラブル
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
+
+        Returns
+        ----
+        Iterator[np.ndarray]
+            チャンクごとのジオイド高配列（interpolate_many の戻り値）
+        """
+        for (latitudes, longitudes) in chunks:
+            yield self.interpolate_many(latitudes, longitudes, method=method)
+
+    @metrics.timed('geoid_batch_seconds', method='interpolate_csv', phase='total')
+    def interpolate_csv(self, input_path:str, output_path:str, lat_col:int=0, lon_col:int=1,
+        chunk_size:int=100000, header:bool=False, delimiter:str=',', precision:int=4,
+        progress:bool=False, method:str='bilinear') -> int:
+        """
+        CSVファイルの緯度・経度列からジオイド高を算出し、
+        各行の末尾にジオイド高列を追加したCSVファイルを出力する。
+        chunk_size 行づつ読み込み・書き込みを行うため、
+        メモリ使用量はファイルサイズによらず一定となる。
+        ジオイドデータ範囲外またはデータなしの行のジオイド高は NO_DATA(999.0) とする。
+
+        Parameters
+        ----
+        input_path:str
+            入力CSVファイルパス
+        output_path:str
+            出力CSVファイルパス
+        lat_col:int
+            緯度（北緯、単位：度）の列番号（0始まり）
+        lon_col:int
+            経度（東経、単位：度）の列番号（0始まり）
+        chunk_size:int
+            一度に処理する行数
+        header:bool
+            先頭行がヘッダ行の場合 True
+        delimiter:str
+            区切り文字
+        precision:int
+            出力するジオイド高の小数点以下桁数
+        progress:bool
+            進捗を標準エラー出力へ表示する場合 True
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
+
+        Returns
+        ----
+        int
+            処理したデータ行数
+        """
+        total = 0
+        start = time.perf_counter()
+        with open(input_path, 'r', encoding='utf-8', newline='') as fin, \
+            open(output_path, 'w', encoding='utf-8', newline='') as fout:
+            if header:
+                fout.write(fin.readline().rstrip('\r\n') + delimiter + 'geoid_height\n')
+
+            while True:
+                # chunk_size 行づつ読み込む(空行は除く)
+                lines = [line for line in itertools.islice(fin, chunk_size) if line.strip()]
+                if not lines:
+                    break
+                with metrics.timer('geoid_batch_seconds', method='interpolate_csv', phase='parse'):
+                    points = np.loadtxt(lines, delimiter=delimiter, usecols=(lat_col, lon_col),
+                        dtype=np.float64, ndmin=2)
+
+                # ジオイド高を算出し、範囲外・データなしは NO_DATA に置き換える
+                heights = self.interpolate_many(points[:, 0], points[:, 1], method=method)
+                heights = np.where(np.isnan(heights), self.NO_DATA, heights)
+
+                with metrics.timer('geoid_batch_seconds', method='interpolate_csv', phase='write'):
+                    rows = [line.rstrip('\r\n') for line in lines]
+                    fout.writelines(f'{row}{delimiter}{height:.{precision}f}\n'
+                        for (row, height) in zip(rows, heights.tolist()))
+
+                total = total + len(lines)
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f'{total:,} rows, {elapsed:.1f} sec, {total / elapsed:,.0f} rows/sec',
+                        file=sys.stderr)
+
+        if self.debug:
+            print(f'saved {total} rows to {output_path}')
+        return total
+
+    @metrics.timed('geoid_batch_seconds', method='interpolate_parallel', phase='total')
+    def interpolate_parallel(self, latitudes, longitudes, workers:int=None,
+        chunk_size:int=1000000) -> np.ndarray:
+        """
+        複数の緯度・経度（単位：度）のジオイド高を、プロセスプールで分割して一括算出する。
+        ジオイド高グリッドは共有メモリ(バイナリキャッシュ読み込み時はキャッシュファイルの
+        メモリマップ)を介して各ワーカプロセスから参照するため、
+        ワーカごとのコピーやデータファイルの再読み込みは発生しない。
+        緯度・経度・結果配列も共有メモリに置き、各ワーカへは処理範囲のみを渡す。
+
+        Parameters
+        ----
+        latitudes
+            計算対象の緯度（北緯、単位：度）の配列
+        longitudes
+            計算対象の経度（東経、単位：度）の配列
+        workers:int
+            ワーカプロセス数（デフォルト: os.cpu_count()）
+        chunk_size:int
+            1タスクで処理する点の数
+
+        Returns
+        ----
+        np.ndarray
+            ジオイド高（単位：メートル、範囲外・データなしは np.nan）の配列、
+            形状は latitudes と longitudes をブロードキャストした形状
+        """
+        (latitudes, longitudes) = np.broadcast_arrays(
+            np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+        shape = latitudes.shape
+        total = latitudes.size
+        workers = os.cpu_count() if workers is None else workers
+
+        # 分割するほどの件数がない場合は自プロセスで算出
+        if workers <= 1 or total <= chunk_size:
+            return self.interpolate_many(latitudes, longitudes)
+
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        shms = []
+        try:
+            # ジオイド高グリッド: キャッシュのメモリマップはファイルパスを、それ以外は共有メモリを渡す
+            if isinstance(self.grid, np.memmap) and self.grid.filename is not None:
+                grid_spec = ('file', self.grid.filename, self.grid.shape, self.grid.dtype.str)
+            else:
+                grid_shm = shared_memory.SharedMemory(create=True, size=max(self.grid.nbytes, 1))
+                shms.append(grid_shm)
+                np.ndarray(self.grid.shape, dtype=self.grid.dtype, buffer=grid_shm.buf)[:] = self.grid
+                grid_spec = ('shm', grid_shm.name, self.grid.shape, self.grid.dtype.str)
+
+            # 緯度・経度・結果配列(3, total)
+            points_shm = shared_memory.SharedMemory(create=True, size=3 * total * 8)
+            shms.append(points_shm)
+            points = np.ndarray((3, total), dtype=np.float64, buffer=points_shm.buf)
+            points[0] = latitudes.ravel()
+            points[1] = longitudes.ravel()
+
+            meta = {'glamn': self.glamn, 'glomn': self.glomn, 'nla': self.nla, 'nlo': self.nlo,
+                'ikind': self.ikind, 'vern': self.vern, 'path': self.path}
+            ranges = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                initializer=_init_parallel_worker,
+                initargs=(meta, grid_spec, points_shm.name, total)) as executor:
+                for _ in executor.map(_interpolate_range, ranges):
+                    pass
+
+            heights = points[2].reshape(shape).copy()
+            del points
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        # ワーカプロセスでの計測は集計されないため、ここで件数を記録する
+        metrics.increment('geoid_points_interpolated_total', total, method='interpolate_parallel')
+        if self.debug:
+            print(f'interpolated {total} points with {workers} workers')
+        return heights
+
+    @classmethod
+    def _from_grid(cls, meta:dict, grid:np.ndarray) -> 'HeightManager':
+        """
+        メタ情報とジオイド高グリッドからインスタンスを生成する。
+        データファイル・キャッシュは読み込まない。
+
+        Parameters
+        ----
+        meta:dict
+            メタ情報(glamn, glomn, nla, nlo, ikind, vern, path)
+        grid:np.ndarray
+            ジオイド高グリッド
+
+        Returns
+        ----
+        HeightManager
+            インスタンス
+        """
+        mgr = cls.__new__(cls)
+        mgr.path = meta.get('path')
+        mgr.debug = False
+        mgr.glamn = float(meta['glamn'])
+        mgr.glomn = float(meta['glomn'])
+        mgr.nla =   int(meta['nla'])
+        mgr.nlo =   int(meta['nlo'])
+        mgr.ikind = int(meta['ikind'])
+        mgr.vern =  str(meta['vern'])
+        mgr._revise_delta()
+        mgr.grid = grid
+        mgr.valid = grid < cls.NO_DATA
+        mgr._xyz = None
+        mgr.cache = False
+        mgr._coefficients = {}
+        return mgr
 
     def interpolate_dms(self, lat_d:int, lat_m:int, lat_s:float, lon_d:int, lon_m:int, lon_s:float) -> float:
         """
@@ -460,38 +1510,164 @@ class HeightManager:
 
     def convert_xyz(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        ジオイド高データ(self.rows)をnp.ndarray形式のリストX(緯度、単位：度)、
-        Y(経度、単位：度)、Z(ジオイド高、単位：メートル)に変換する。
+        ジオイド高データ(self.grid)をnp.ndarray形式のリストX(経度、単位：度)、
+        Y(緯度、単位：度)、Z(ジオイド高、単位：メートル)に変換する。
         ただし、ジオイド高データがない座標はリストに加えない。
+        変換結果はインスタンスに保持し、2回目以降は同じ(読み取り専用の)配列を返却する。
         
         Returns
         ----
         Tuple[x:np.ndarray, y:np.ndarray, z:np.ndarray]
-            x: 緯度、単位：度
-            y: 経度、単位：度
+            x: 経度、単位：度
+            y: 緯度、単位：度
             z: ジオイド高、単位：メートル
         """
-        x = [] # 経度(東経)
-        y = [] # 緯度(北緯)
-        z = [] # ジオイド高(m)
-        for latitude_index in range(self.nla):
-            latitude = self.glamn + latitude_index * self.dgla
-            for longitude_index in range(self.nlo):
-                longitude = self.glomn + longitude_index * self.dglo
-                if self.rows[latitude_index][longitude_index] < self.NO_DATA:
-                    y.append(latitude)
-                    x.append(longitude)
-                    z.append(self.rows[latitude_index][longitude_index])
+        if self._xyz is not None:
+            metrics.increment('geoid_xyz_cache_requests_total', result='hit')
+            return self._xyz
+        metrics.increment('geoid_xyz_cache_requests_total', result='miss')
+
+        # 格子点の緯度・経度をブロードキャストし、データありマスクで抽出(緯度順・経度順)
+        latitudes = self.glamn + np.arange(self.nla) * self.dgla
+        longitudes = self.glomn + np.arange(self.nlo) * self.dglo
+        shape = (self.nla, self.nlo)
+        x = np.broadcast_to(longitudes[None, :], shape)[self.valid] # 経度(東経)
+        y = np.broadcast_to(latitudes[:, None], shape)[self.valid]  # 緯度(北緯)
+        z = np.asarray(self.grid[self.valid], dtype=float)          # ジオイド高(m)
 
         if self.debug:
             print(f'x len:{len(x)}, y len:{len(y)}, z len:{len(z)}')
 
-        # ndarray化
-        x = np.array(x, dtype=float)
-        y = np.array(y, dtype=float)
-        z = np.array(z, dtype=float)
+        # 保持した配列が呼び出し元で書き換えられないよう読み取り専用にする
+        for values in (x, y, z):
+            values.setflags(write=False)
+        self._xyz = (x, y, z)
+        return self._xyz
 
-        return (x, y, z)
+    def get_tile_extent(self) -> int:
+        """
+        タイル分割の基準となる格子点数（nla、nlo 以上の最小の2のべき乗）を返却する。
+        ズームレベル z のタイルは、北西端の格子点から
+        (get_tile_extent() >> z) 個四方の格子点を受け持つ。
+
+        Returns
+        ----
+        int
+            タイル分割の基準となる格子点数
+        """
+        return 1 << int(np.ceil(np.log2(max(self.nla, self.nlo))))
+
+    def get_tile_bounds(self, z:int, x:int, y:int) -> Tuple[float, float, float, float]:
+        """
+        タイルが受け持つ範囲（単位：度）を返却する。
+        x は西から東、y は北から南へ数えたタイル番号とする。
+
+        Parameters
+        ----
+        z:int
+            ズームレベル（0: 全域を1タイル）
+        x:int
+            経度方向のタイル番号(0〜2**z-1)
+        y:int
+            緯度方向のタイル番号(0〜2**z-1)
+
+        Returns
+        ----
+        Tuple[float, float, float, float]
+            西端経度、南端緯度、東端経度、北端緯度
+
+        Raises
+        ----
+        ValueError
+            ズームレベル・タイル番号が範囲外の場合
+        """
+        span = self._get_tile_span(z, x, y)
+        west = self.glomn + (x * span) * self.dglo
+        east = self.glomn + ((x + 1) * span - 1) * self.dglo
+        north = self.glamn + (self.nla - 1 - y * span) * self.dgla
+        south = self.glamn + (self.nla - 1 - ((y + 1) * span - 1)) * self.dgla
+        return (west, south, east, north)
+
+    def get_tile(self, z:int, x:int, y:int, size:int=256) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ズームレベル・タイル番号を指定してジオイド高を取得する。
+        1タイルの点数が size 四方を超える場合は、ブロック平均(NO_DATA を除く)により
+        間引いた値を返却する。
+
+        Parameters
+        ----
+        z:int
+            ズームレベル（0: 全域を1タイル）
+        x:int
+            経度方向のタイル番号(0〜2**z-1、西から東)
+        y:int
+            緯度方向のタイル番号(0〜2**z-1、北から南)
+        size:int
+            1タイルの1辺あたりの最大点数
+
+        Returns
+        ----
+        Tuple[x:np.ndarray, y:np.ndarray, z:np.ndarray]
+            x: 経度、単位：度
+            y: 緯度、単位：度
+            z: ジオイド高、単位：メートル
+
+        Raises
+        ----
+        ValueError
+            ズームレベル・タイル番号が範囲外の場合
+        """
+        span = self._get_tile_span(z, x, y)
+        factor = max(1, span // size)
+
+        # タイルの格子点範囲(行は北から数える)
+        (row_start, row_stop) = (y * span, min((y + 1) * span, self.nla))
+        (col_start, col_stop) = (x * span, min((x + 1) * span, self.nlo))
+        if row_start >= row_stop or col_start >= col_stop:
+            empty = np.empty(0, dtype=np.float64)
+            return (empty, empty.copy(), empty.copy())
+
+        # 北を先頭にした緯度インデックス
+        lat_idx = self.nla - 1 - np.arange(row_start, row_stop)
+        lon_idx = np.arange(col_start, col_stop)
+        block = self.grid[self.nla - row_stop:self.nla - row_start, col_start:col_stop][::-1]
+        block = np.where(block < self.NO_DATA, block, np.nan)
+
+        heights = self._block_mean(block, factor)
+        lats = self._block_mean((self.glamn + lat_idx * self.dgla)[:, None], factor)[:, 0]
+        lons = self._block_mean((self.glomn + lon_idx * self.dglo)[None, :], factor)[0]
+        (lons, lats) = np.meshgrid(lons, lats)
+        ok = ~np.isnan(heights)
+        return (lons[ok], lats[ok], heights[ok])
+
+    def _get_tile_span(self, z:int, x:int, y:int) -> int:
+        """
+        ズームレベル・タイル番号を検証し、1タイルが受け持つ1辺あたりの格子点数を返却する。
+        """
+        extent = self.get_tile_extent()
+        if z < 0 or (extent >> z) < 1:
+            raise ValueError(f'zoom level:({z}) is out of range')
+        if not (0 <= x < (1 << z)) or not (0 <= y < (1 << z)):
+            raise ValueError(f'tile:({z}/{x}/{y}) is out of range')
+        return extent >> z
+
+    @staticmethod
+    def _block_mean(values:np.ndarray, factor:int) -> np.ndarray:
+        """
+        2次元配列を factor 四方のブロックごとに平均する(np.nan は除く)。
+        端数のブロックは存在する要素のみで平均し、全要素が np.nan のブロックは np.nan とする。
+        """
+        if factor == 1:
+            return values
+        (rows, cols) = values.shape
+        (out_rows, out_cols) = (-(-rows // factor), -(-cols // factor))
+        padded = np.full((out_rows * factor, out_cols * factor), np.nan)
+        padded[:rows, :cols] = values
+        padded = padded.reshape(out_rows, factor, out_cols, factor)
+        ok = ~np.isnan(padded)
+        total = np.where(ok, padded, 0.0).sum(axis=(1, 3))
+        count = ok.sum(axis=(1, 3))
+        return np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
 
     def get_gpd(self, crs:str='EPSG:4326') -> gpd.GeoDataFrame:
         """
@@ -508,11 +1684,9 @@ class HeightManager:
             ジオイドモデル(ジオイド高:'height'属性)
         """
         (x, y, z) = self.convert_xyz()
-        geometry = []
-        total = len(x)
-        for i in range(total):
-            geometry.append(Point(x[i], y[i]))
-        return gpd.GeoDataFrame({'height':z, 'geometry':geometry}, crs=crs)
+        # Point(経度, 緯度) を配列から一括生成
+        geometry = gpd.points_from_xy(x, y, crs=crs)
+        return gpd.GeoDataFrame({'height':z}, geometry=geometry, crs=crs)
 
     @classmethod
     def to_dms(cls, degree:float) -> Tuple[int, int, float]:
@@ -565,20 +1739,287 @@ class HeightManager:
         return float(float(d) + float(m)/60.0 + s/3600.0)
 
 
+class HeightCache:
+    """
+    HeightManager.interpolate の前段に置く、点ごとのジオイド高の LRU/TTL キャッシュクラス。
+    緯度・経度を precision 桁(小数点以下)に丸めた値と内挿方法をキーとし、
+    ジオイド高は丸めた緯度・経度で算出する(同じキーには常に同じ値を返却する)。
+    双1次内挿では、格子(1分×1.5分)ごとに四隅のジオイド高と原点・間隔を別の LRU キャッシュに保持し、
+    同じ格子に入る点はインデックス・座標の算出とグリッドの参照を省略する。
+    四隅のいずれかにデータがない(NO_DATA)格子は、interpolate_many が np.nan とするのと同じく
+    ValueError とする(双1次内挿でも NO_DATA と混ぜた値は返却しない)。
+    複数スレッドから呼び出してよい。
+
+    cache = HeightCache(HeightManager('gsigeo2011_ver2_1.asc'), maxsize=4096, ttl=300.0)
+    height = cache.interpolate(35.658, 139.742)
+    print(cache.cache_info())
+    """
+
+    """
+    cache_info の戻り値
+    """
+    CacheInfo = collections.namedtuple('CacheInfo',
+        ['hits', 'misses', 'expired', 'maxsize', 'currsize', 'cell_hits', 'cell_misses', 'cell_currsize'])
+
+    def __init__(self, manager:HeightManager, maxsize:int=4096, ttl:float=None, precision:int=6,
+        cell_cache_size:int=1024) -> None:
+        """
+        Parameters
+        ----
+        manager:HeightManager
+            ジオイド高を算出する HeightManager
+        maxsize:int
+            保持する点の最大件数（超えた場合は最も古く参照された点から破棄する）
+        ttl:float
+            保持期間（単位：秒、None または 0 以下の場合は無期限）
+        precision:int
+            キーとする緯度・経度の小数点以下の桁数（デフォルト: 6、約0.1m）
+        cell_cache_size:int
+            双1次内挿で保持する格子の最大件数（0 の場合は格子を保持しない）
+
+        Raises
+        ----
+        ValueError
+            maxsize、cell_cache_size が負の場合
+        """
+        if maxsize < 0 or cell_cache_size < 0:
+            raise ValueError(f'maxsize:({maxsize}) and cell_cache_size:({cell_cache_size}) must not be negative')
+        self.manager = manager
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl is not None and ttl > 0 else None
+        self.precision = precision
+        self.cell_cache_size = cell_cache_size
+        # (緯度, 経度, 内挿方法) -> (ジオイド高, 有効期限)
+        self._results = collections.OrderedDict()
+        # (緯度インデックス, 経度インデックス) -> (原点緯度, 緯度間隔, 原点経度, 経度間隔, 四隅のジオイド高)
+        self._cells = collections.OrderedDict()
+        # 格子の算出に使用する (緯度下限, 緯度範囲, 緯度インデックス上限, 経度下限, 経度範囲, 経度インデックス上限)
+        self._axes = (manager.glamn, manager.MAX_LATITUDE - manager.glamn, manager.nla - 1,
+            manager.glomn, manager.MAX_LONGITUDE - manager.glomn, manager.nlo - 1)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'cell_hits': 0, 'cell_misses': 0}
+
+    def interpolate(self, latitude:float, longitude:float, method:str='bilinear') -> float:
+        """
+        指定された緯度・経度（単位：度）のジオイド高を、キャッシュを参照して返却する。
+
+        Parameters
+        ----
+        latitude:float
+            計算対象の緯度（北緯、単位：度）
+        longitude:float
+            計算対象の経度（東経、単位：度）
+        method:str
+            内挿方法（'bilinear'、'biquadratic'、'bicubic'、デフォルト: 'bilinear'）
+
+        Returns
+        ----
+        float
+            ジオイド高（単位：メートル）
+
+        Raises
+        ----
+        ValueError
+            ジオイドデータ範囲外を指定された場合、内挿に使用する格子点にデータがない場合
+            （結果はキャッシュしない）
+        """
+        (latitude, longitude) = self.quantize(latitude, longitude)
+        key = (latitude, longitude, method)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if entry[1] is None or time.monotonic() < entry[1]:
+                    self._results.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                del self._results[key]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+
+        if method == 'bilinear':
+            height = self._interpolate_bilinear(latitude, longitude)
+        else:
+            height = self.manager.interpolate(latitude, longitude, method)
+
+        if self.maxsize > 0:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            with self._lock:
+                self._results[key] = (height, expires)
+                self._results.move_to_end(key)
+                if len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+        return height
+
+    def quantize(self, latitude:float, longitude:float) -> Tuple[float, float]:
+        """
+        緯度・経度をキーの精度(precision 桁)に丸める。interpolate はこの緯度・経度でジオイド高を算出する。
+
+        Returns
+        ----
+        Tuple[float, float]
+            丸めた緯度、経度（単位：度）
+        """
+        return (round(latitude, self.precision), round(longitude, self.precision))
+
+    def _interpolate_bilinear(self, latitude:float, longitude:float) -> float:
+        """
+        格子のキャッシュを参照して双1次内挿する。
+        計測(metrics)が有効な場合は、HeightManager.interpolate と同じく処理時間・件数を記録する。
+        """
+        if not metrics.REGISTRY.enabled:
+            return self._interpolate_cell(latitude, longitude)
+        start = time.perf_counter()
+        try:
+            height = self._interpolate_cell(latitude, longitude)
+        except ValueError:
+            metrics.increment('geoid_interpolate_errors_total', method='interpolate')
+            raise
+        finally:
+            metrics.observe('geoid_interpolate_seconds', time.perf_counter() - start, method='interpolate')
+        metrics.increment('geoid_points_interpolated_total', method='interpolate')
+        return height
+
+    def _interpolate_cell(self, latitude:float, longitude:float) -> float:
+        """
+        _interpolate_bilinear の計算本体(計測なし、データありの格子は HeightManager.interpolate と同じ値を返却する)。
+        格子の境界上・データ範囲の端の点は HeightManager で算出する。
+        四隅のいずれかにデータがない(NO_DATA)格子はキャッシュせず、ValueError とする。
+        """
+        mgr = self.manager
+        # HeightManager._get_latitude_index/_get_longitude_index と同じ式で格子を求める
+        (glamn, lat_span, lat_last, glomn, lon_span, lon_last) = self._axes
+        lat_pos = (latitude - glamn) / lat_span * lat_last
+        lon_pos = (longitude - glomn) / lon_span * lon_last
+        if not (0.0 < lat_pos < lat_last and 0.0 < lon_pos < lon_last):
+            # 範囲外・端(上限・下限インデックスが同じになる場合を含む)・nan
+            (low_lat_idx, up_lat_idx) = mgr._get_latitude_index(latitude)
+            (low_lon_idx, up_lon_idx) = mgr._get_longitude_index(longitude)
+            if not mgr.valid[low_lat_idx:up_lat_idx + 1, low_lon_idx:up_lon_idx + 1].all():
+                raise ValueError(f'no geoid data around:({latitude},{longitude})')
+            return mgr._interpolate(latitude, longitude)
+        key = (int(lat_pos), int(lon_pos))
+        cells = self._cells
+        with self._lock:
+            cell = cells.get(key)
+            if cell is not None:
+                cells.move_to_end(key)
+                self._stats['cell_hits'] += 1
+            else:
+                self._stats['cell_misses'] += 1
+        if cell is None:
+            (i, j) = key
+            if not mgr.valid[i:i + 2, j:j + 2].all():
+                raise ValueError(f'no geoid data around:({latitude},{longitude})')
+            (lat0, lon0) = (mgr._get_latitude(i), mgr._get_longitude(j))
+            cell = (lat0, mgr._get_latitude(i + 1) - lat0, lon0, mgr._get_longitude(j + 1) - lon0,
+                tuple(mgr.grid[i:i + 2, j:j + 2].ravel().tolist()))
+            if self.cell_cache_size > 0:
+                with self._lock:
+                    self._cells[key] = cell
+                    if len(self._cells) > self.cell_cache_size:
+                        self._cells.popitem(last=False)
+        (lat0, dlat, lon0, dlon, (z00, z01, z10, z11)) = cell
+        t = (latitude - lat0) / dlat
+        u = (longitude - lon0) / dlon
+        return float((1 - t) * (1 - u) * z00 + (1 - t) * u * z01 + t * (1 - u) * z10 + t * u * z11)
+
+    def cache_info(self) -> 'HeightCache.CacheInfo':
+        """
+        キャッシュの統計情報(ヒット・ミス・期限切れ件数、件数)を返却する。
+
+        Returns
+        ----
+        HeightCache.CacheInfo
+            hits, misses, expired, maxsize, currsize, cell_hits, cell_misses, cell_currsize
+        """
+        with self._lock:
+            return self.CacheInfo(self._stats['hits'], self._stats['misses'], self._stats['expired'],
+                self.maxsize, len(self._results), self._stats['cell_hits'], self._stats['cell_misses'],
+                len(self._cells))
+
+    def get_hit_ratio(self) -> float:
+        """
+        点のキャッシュのヒット率を返却する(未参照の場合は 0.0)。
+        """
+        info = self.cache_info()
+        total = info.hits + info.misses
+        return info.hits / total if total > 0 else 0.0
+
+    def clear(self) -> None:
+        """
+        保持した点・格子と統計情報を破棄する。
+        """
+        with self._lock:
+            self._results.clear()
+            self._cells.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+"""
+interpolate_parallel ワーカプロセス内の状態
+"""
+_parallel_state = {}
+
+def _init_parallel_worker(meta:dict, grid_spec:tuple, points_name:str, total:int) -> None:
+    """
+    interpolate_parallel ワーカプロセスの初期化処理。
+    共有メモリ(またはキャッシュファイル)上のジオイド高グリッドと点配列へ接続する。
+    """
+    from multiprocessing import shared_memory
+
+    # 共有メモリの解放は生成元プロセスが行う(resource_tracker は生成元と共有される)
+    (kind, name, shape, dtype) = grid_spec
+    if kind == 'file':
+        grid = np.load(name, mmap_mode='r')
+    else:
+        grid_shm = shared_memory.SharedMemory(name=name)
+        _parallel_state['grid_shm'] = grid_shm
+        grid = np.ndarray(shape, dtype=np.dtype(dtype), buffer=grid_shm.buf)
+    points_shm = shared_memory.SharedMemory(name=points_name)
+    _parallel_state['points_shm'] = points_shm
+    _parallel_state['points'] = np.ndarray((3, total), dtype=np.float64, buffer=points_shm.buf)
+    _parallel_state['manager'] = HeightManager._from_grid(meta, grid)
+
+def _interpolate_range(index_range:Tuple[int, int]) -> None:
+    """
+    interpolate_parallel ワーカプロセスで指定範囲の点のジオイド高を算出し、
+    共有メモリ上の結果配列へ書き込む。
+    """
+    (start, stop) = index_range
+    points = _parallel_state['points']
+    points[2, start:stop] = _parallel_state['manager'].interpolate_many(
+        points[0, start:stop], points[1, start:stop])
+
+
 if __name__ == '__main__':
     """
     日本のジオイド2/3次元散布図として表示する。
+    --input を指定した場合は、CSVファイルの各行にジオイド高を付与して --output へ出力する。
     """
     import argparse
     parser = argparse.ArgumentParser(description='show Japan geoid height with 3d scatter')
     parser.add_argument('--path', type=str, default='gsigeo2011_ver2_1.asc', help='Japan Geoid Height data file(asc) path')
     parser.add_argument('--debug', type=bool, default=False, help='print debug lines')
+    parser.add_argument('--input', type=str, default=None, help='input CSV file path (latitude/longitude columns)')
+    parser.add_argument('--output', type=str, default='geoid_height.csv', help='output CSV file path (with --input)')
+    parser.add_argument('--lat_col', type=int, default=0, help='latitude column index of input CSV')
+    parser.add_argument('--lon_col', type=int, default=1, help='longitude column index of input CSV')
+    parser.add_argument('--chunk_size', type=int, default=100000, help='rows per chunk')
+    parser.add_argument('--header', action='store_true', help='input CSV has a header line')
+    parser.add_argument('--method', type=str, default='bilinear', choices=HeightManager.INTERPOLATION_METHODS,
+        help='interpolation method (with --input)')
     args = parser.parse_args()
     
     manager = HeightManager(path=args.path, debug=args.debug)
-    # 2次元散布図の表示
-    manager.get_scatter2d()
-    # 3次元散布図の表示
-    manager.get_scatter3d()
-    # CSVファイルに保存
-    manager.save()
\ No newline at end of file
+    if args.input is not None:
+        # CSVファイルの各行にジオイド高を付与
+        manager.interpolate_csv(args.input, args.output, lat_col=args.lat_col, lon_col=args.lon_col,
+            chunk_size=args.chunk_size, header=args.header, progress=True, method=args.method)
+    else:
+        # 2次元散布図の表示
+        manager.get_scatter2d()
+        # 3次元散布図の表示
+        manager.get_scatter3d()
+        # CSVファイルに保存
+        manager.save()
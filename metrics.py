@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+処理時間・件数を計測するためのインストルメンテーションモジュール。
+
+HeightManager(geoid.py)・Mesh(dem/mesh.py)の読み込み、内挿、保存の各処理、
+Webアプリケーション(app.py)のリクエストの処理時間・件数を集計し、
+Prometheus のテキスト形式で出力する。
+
+計測はデフォルトで無効(環境変数 GEOID_METRICS=1 で有効)とし、enable() で有効にする。
+無効時は timer() が共有の何もしないコンテキストマネージャを返却し、
+increment()/observe() は何もしないため、計測対象の処理への影響はほとんどない。
+1点ごとに呼び出される処理では、呼び出し側で REGISTRY.enabled を確認してから計測する。
+
+import metrics
+metrics.enable()
+with metrics.timer('geoid_export_seconds', format='csv'):
+    ...
+print(metrics.render())
+"""
+import os
+import time
+import bisect
+import threading
+import functools
+import contextlib
+
+"""
+ヒストグラムのバケット上限(秒)のデフォルト
+"""
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+"""
+無効時に timer() が返却するコンテキストマネージャ
+"""
+_NULL_TIMER = contextlib.nullcontext()
+
+class Registry:
+    """
+    カウンタ・ヒストグラム・ゲージを保持し、Prometheus のテキスト形式で出力するクラス。
+    メトリクスはメトリクス名とラベル(キーワード引数)の組ごとに集計する。
+    """
+
+    def __init__(self, enabled:bool=False, buckets:tuple=DEFAULT_BUCKETS) -> None:
+        """
+        Parameters
+        ----
+        enabled:bool
+            計測を有効にする場合 True
+        buckets:tuple
+            ヒストグラムのバケット上限(秒)
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        # (メトリクス名, ラベル) -> 値
+        self.counters = {}
+        # (メトリクス名, ラベル) -> [バケットごとの件数のリスト, 合計, 件数]
+        self.histograms = {}
+        # メトリクス名 -> 値(またはラベルと値の組のリスト)を返却する関数
+        self.gauges = {}
+        # メトリクス名 -> 説明
+        self.descriptions = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name:str, description:str) -> None:
+        """
+        メトリクスの説明(# HELP 行)を登録する。
+        """
+        self.descriptions[name] = description
+
+    def increment(self, name:str, value:float=1, **labels) -> None:
+        """
+        カウンタを加算する。
+
+        Parameters
+        ----
+        name:str
+            メトリクス名（例: 'geoid_points_interpolated_total'）
+        value:float
+            加算する値
+        labels
+            ラベル
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name:str, value:float, **labels) -> None:
+        """
+        ヒストグラムに値(秒)を記録する。
+
+        Parameters
+        ----
+        name:str
+            メトリクス名（例: 'geoid_load_seconds'）
+        value:float
+            記録する値（単位：秒）
+        labels
+            ラベル
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def timer(self, name:str, **labels):
+        """
+        with 文のブロックの処理時間をヒストグラムに記録するコンテキストマネージャを返却する。
+        無効時は何もしないコンテキストマネージャを返却する。
+
+        Parameters
+        ----
+        name:str
+            メトリクス名
+        labels
+            ラベル
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def gauge(self, name:str, func, description:str=None) -> None:
+        """
+        出力時に値を取得するゲージを登録する(キャッシュのヒット率等)。
+
+        Parameters
+        ----
+        name:str
+            メトリクス名
+        func
+            値、または (ラベルの辞書, 値) のリストを返却する引数なしの関数
+        description:str
+            説明
+        """
+        self.gauges[name] = func
+        if description is not None:
+            self.describe(name, description)
+
+    def reset(self) -> None:
+        """
+        集計したカウンタ・ヒストグラムを破棄する。
+        """
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def get(self, name:str, **labels) -> float:
+        """
+        カウンタの値、またはヒストグラムの件数を返却する(未計測の場合は 0)。
+        """
+        key = (name, tuple(sorted(labels.items())))
+        if key in self.histograms:
+            return self.histograms[key][2]
+        return self.counters.get(key, 0)
+
+    def render(self) -> str:
+        """
+        集計結果を Prometheus のテキスト形式(text/plain; version=0.0.4)で返却する。
+
+        Returns
+        ----
+        str
+            Prometheus のテキスト形式の集計結果
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, [list(h[0]), h[1], h[2]]) for (key, h) in self.histograms.items())
+        lines = []
+        for (name, samples) in _group(counters):
+            self._write_header(lines, name, 'counter')
+            for (labels, value) in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, samples) in _group(histograms):
+            self._write_header(lines, name, 'histogram')
+            for (labels, (counts, total, count)) in samples:
+                cumulative = 0
+                for (bound, n) in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        for (name, func) in sorted(self.gauges.items()):
+            value = func()
+            samples = value if isinstance(value, list) else [({}, value)]
+            self._write_header(lines, name, 'gauge')
+            for (labels, v) in samples:
+                lines.append(f'{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(v)}')
+        return '\n'.join(lines) + '\n'
+
+    def _write_header(self, lines:list, name:str, kind:str) -> None:
+        """
+        # HELP 行・# TYPE 行を追加する。
+        """
+        if name in self.descriptions:
+            lines.append(f'# HELP {name} {self.descriptions[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+class _Timer:
+    """
+    Registry.timer が返却するコンテキストマネージャ。
+    """
+
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry:Registry, name:str, labels:dict) -> None:
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+def _group(items:list) -> list:
+    """
+    ((メトリクス名, ラベル), 値) のソート済みリストをメトリクス名ごとにまとめる。
+    """
+    groups = []
+    for ((name, labels), value) in items:
+        if not groups or groups[-1][0] != name:
+            groups.append((name, []))
+        groups[-1][1].append((labels, value))
+    return groups
+
+def _format_labels(labels:tuple) -> str:
+    """
+    ラベルを Prometheus のテキスト形式({key="value",...})で返却する。
+    """
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for (_, v) in labels)
+    return '{' + ','.join(f'{k}="{v}"' for ((k, _), v) in zip(labels, escaped)) + '}'
+
+def _format_value(value:float) -> str:
+    """
+    値を Prometheus のテキスト形式で返却する。
+    """
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    return repr(value)
+
+"""
+各モジュールで計測するメトリクスの説明
+"""
+DESCRIPTIONS = {
+    'geoid_load_seconds': 'HeightManager load time by phase (cache, parse, save_cache)',
+    'geoid_cache_requests_total': 'HeightManager binary cache lookups by result',
+    'geoid_interpolate_seconds': 'HeightManager.interpolate latency',
+    'geoid_interpolate_errors_total': 'HeightManager.interpolate calls out of range',
+    'geoid_batch_seconds': 'HeightManager batch interpolation time by method and phase',
+    'geoid_points_interpolated_total': 'Points interpolated by HeightManager by method',
+    'geoid_xyz_cache_requests_total': 'HeightManager.convert_xyz memo lookups by result',
+    'geoid_export_seconds': 'HeightManager export time by format',
+    'geoid_coefficients_seconds': 'HeightManager coefficient table build/load time by method',
+    'mesh_load_seconds': 'Mesh load time by phase (parse, arrange, axes)',
+    'mesh_points_loaded_total': 'DEM points loaded by Mesh',
+    'mesh_tile_load_seconds': 'Per tile load time reported by MeshCollection',
+    'mesh_tiles_loaded_total': 'DEM tiles loaded by MeshCollection',
+    'mesh_collection_load_seconds': 'MeshCollection.load time',
+    'mesh_batch_seconds': 'MeshCollection batch interpolation time',
+    'mesh_points_interpolated_total': 'Points interpolated on DEM rasters by method',
+    'mesh_export_seconds': 'Mesh export time by format',
+    'http_requests_total': 'HTTP requests by endpoint, method and status',
+    'http_request_duration_seconds': 'HTTP request latency by endpoint, method and status',
+    'http_serialize_seconds': 'Response serialization time by endpoint',
+}
+
+"""
+デフォルトのレジストリ(各モジュールの計測はここに集計される)
+"""
+REGISTRY = Registry(enabled=os.environ.get('GEOID_METRICS', '') not in ('', '0'))
+REGISTRY.descriptions.update(DESCRIPTIONS)
+
+def enable() -> None:
+    """
+    計測を有効にする。
+    """
+    REGISTRY.enabled = True
+
+def disable() -> None:
+    """
+    計測を無効にする(集計済みの値は保持する)。
+    """
+    REGISTRY.enabled = False
+
+def timer(name:str, **labels):
+    """
+    デフォルトのレジストリの Registry.timer。
+    """
+    return REGISTRY.timer(name, **labels)
+
+def increment(name:str, value:float=1, **labels) -> None:
+    """
+    デフォルトのレジストリの Registry.increment。
+    """
+    REGISTRY.increment(name, value, **labels)
+
+def observe(name:str, value:float, **labels) -> None:
+    """
+    デフォルトのレジストリの Registry.observe。
+    """
+    REGISTRY.observe(name, value, **labels)
+
+def render() -> str:
+    """
+    デフォルトのレジストリの Registry.render。
+    """
+    return REGISTRY.render()
+
+def timed(name:str, **labels):
+    """
+    関数の処理時間をヒストグラムに記録するデコレータ。
+    無効時は関数をそのまま呼び出す。
+
+    Parameters
+    ----
+    name:str
+        メトリクス名
+    labels
+        ラベル
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+日本のジオイド(ASCII形式)・基盤地図情報数値標高モデル(GML形式)と
+同じレイアウトの合成データファイルを作成するためのモジュール。
+
+実データ(ダウンロードにログインが必要なジオイドモデル、大きな DEM ファイル)を
+用意できない環境での性能計測・負荷試験に使用する。
+作成したファイルは HeightManager、Mesh でそのまま読み込むことができる。
+"""
+import os
+import zipfile
+import numpy as np
+
+from geoid import HeightManager
+from dem.mesh import Mesh, get_mesh_bounds, get_mesh_code
+
+"""
+DEMの種類 -> (メッシュコード桁数、経度方向メッシュ数、緯度方向メッシュ数、種類名)
+"""
+DEM_KINDS = {
+    'DEM5A': (8, 225, 150, '5mメッシュ（標高）'),
+    'DEM5B': (8, 225, 150, '5mメッシュ（標高）'),
+    'DEM5C': (8, 225, 150, '5mメッシュ（標高）'),
+    'DEM10A': (6, 1125, 750, '10mメッシュ（標高）'),
+    'DEM10B': (6, 1125, 750, '10mメッシュ（標高）'),
+}
+
+"""
+日本のジオイドデータ1行あたりの値の数
+"""
+VALUES_PER_LINE = 28
+
+def geoid_height(latitudes, longitudes) -> np.ndarray:
+    """
+    合成ジオイド高(m)を算出する(実データに近い 20m 〜 50m 程度のなめらかな曲面)。
+    """
+    (lat, lon) = (np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float))
+    return 30.0 + 0.1 * (lat - 20.0) + 0.05 * (lon - 120.0) + \
+        5.0 * np.sin(np.radians(lat * 12.0)) * np.cos(np.radians(lon * 9.0))
+
+def terrain_height(latitudes, longitudes, seed:int=0) -> np.ndarray:
+    """
+    合成標高(m)を算出する(緯度・経度の関数なので隣接タイルの境界で連続する)。
+    0m 未満は海域とする。
+    """
+    (lat, lon) = (np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float))
+    phase = np.random.default_rng(seed).uniform(0.0, 2.0 * np.pi, 4)
+    return 300.0 + 600.0 * np.sin(lat * 40.0 + phase[0]) * np.cos(lon * 30.0 + phase[1]) + \
+        150.0 * np.sin(lat * 400.0 + phase[2]) * np.sin(lon * 300.0 + phase[3])
+
+def write_geoid_asc(path:str, nla:int=1801, nlo:int=1201, glamn:float=20.0, glomn:float=120.0,
+    height=geoid_height, no_data:list=((20.0, 120.0, 24.0, 125.0),), vern:str='ver2.1') -> np.ndarray:
+    """
+    日本のジオイド(ASCII形式)と同じレイアウトの合成データファイルを作成する。
+    先頭行はヘッダ(南端緯度、西端経度、緯度差分、経度差分、緯度方向点数、経度方向点数、
+    種類、バージョン)、以降は南から北へ1行(緯度)づつ、西から東へ28個ごとに改行して
+    %9.4f 形式で格納する。格子は HeightManager の内挿と同じく南端・西端から上限緯度・経度
+(北緯50度、東経150度)までを等間隔に分割する(デフォルトの大きさでは緯度1分、経度1.5分)。
+
+    Parameters
+    ----
+    path:str
+        保存先ファイルパス
+    nla:int
+        緯度方向点数（デフォルト: 1801、日本のジオイド2011と同じ）
+    nlo:int
+        経度方向点数（デフォルト: 1201、日本のジオイド2011と同じ）
+    glamn:float
+        南端緯度（単位：度）
+    glomn:float
+        西端経度（単位：度）
+    height
+        緯度・経度の配列からジオイド高(m)の配列を算出する関数
+    no_data:list
+        NO_DATA(999.0)とする範囲 (南端緯度, 西端経度, 北端緯度, 東端経度) のリスト
+    vern:str
+        バージョン
+
+    Returns
+    ----
+    np.ndarray
+        書き込んだグリッド（緯度方向点数×経度方向点数、南から北・西から東）
+    """
+    dgla = (HeightManager.MAX_LATITUDE - glamn) / (nla - 1)
+    dglo = (HeightManager.MAX_LONGITUDE - glomn) / (nlo - 1)
+    lats = glamn + np.arange(nla) * dgla
+    lons = glomn + np.arange(nlo) * dglo
+    grid = np.round(height(lats[:, None], lons[None, :]), 4)
+    grid = np.broadcast_to(grid, (nla, nlo)).copy()
+    for (south, west, north, east) in no_data:
+        grid[np.ix_((lats >= south) & (lats < north), (lons >= west) & (lons < east))] = HeightManager.NO_DATA
+    # 1行(緯度)分の書式
+    (full, rest) = divmod(nlo, VALUES_PER_LINE)
+    row_format = ('%9.4f' * VALUES_PER_LINE + '\n') * full + ('%9.4f' * rest + '\n' if rest else '')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{glamn:9.5f}{glomn:10.5f}{dgla:9.6f}{dglo:9.6f}{nla:5d}{nlo:5d} 1 {vern}\n')
+        for row in grid:
+            f.write(row_format % tuple(row.tolist()))
+    return grid
+
+def write_dem_gml(path:str, mesh_no:str='533945', kind:str='DEM10B', shape:tuple=None,
+    height=terrain_height, order:str='+x-y', start:tuple=(0, 0), surface_ratio:float=0.05,
+    seed:int=0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    基盤地図情報数値標高モデル(GML形式)と同じレイアウトの合成データファイルを作成する。
+    範囲(lowerCorner/upperCorner)はメッシュコードから、メッシュ数(Grid の low/high)は
+    種類(または shape)から決まり、標高は tupleList に sequenceRule の並び順で
+    「種類,標高」の形式で格納する。標高が 0m 未満のメッシュは海水面(-9999.)とする。
+
+    Parameters
+    ----
+    path:str
+        保存先ファイルパス
+    mesh_no:str
+        メッシュコード（DEM5 は 8桁、DEM10 は 6桁）
+    kind:str
+        DEMの種類（DEM_KINDS のキー）
+    shape:tuple
+        (経度方向メッシュ数, 緯度方向メッシュ数)（デフォルト: None、種類の大きさ）
+    height
+        緯度・経度の配列から標高(m)の配列を算出する関数
+    order:str
+        並び順（'+x-y'、'-x-y'、'+x+y'、'-x+y' のいずれか）
+    start:tuple
+        データ開始位置(startPoint)。開始位置より前のメッシュはデータなしとなる
+    surface_ratio:float
+        表層面とするメッシュの割合
+    seed:int
+        乱数シード
+
+    Returns
+    ----
+    tuple(np.ndarray, np.ndarray)
+        書き込んだ標高(float32)、種類(文字列)のラスタ（北から南・西から東、Mesh.z と同じ並び）
+
+    Raises
+    ----
+    ValueError
+        種類、並び順が不正な場合
+    """
+    if kind not in DEM_KINDS:
+        raise ValueError(f'unsupported DEM kind: {kind}')
+    if order not in ('+x-y', '-x-y', '+x+y', '-x+y'):
+        raise ValueError(f'unsupported sequence order: {order}')
+    (digits, nx, ny, type_name) = DEM_KINDS[kind]
+    if shape is not None:
+        (nx, ny) = shape
+    (lower, upper) = get_mesh_bounds(mesh_no)
+    # メッシュの中心の緯度(北から南)・経度(西から東)
+    lats = upper[0] - (np.arange(ny) + 0.5) * (upper[0] - lower[0]) / ny
+    lons = lower[1] + (np.arange(nx) + 0.5) * (upper[1] - lower[1]) / nx
+    z = np.round(height(lats[:, None], lons[None, :]), 2).astype(np.float32)
+    types = np.full((ny, nx), '地表面', dtype=object)
+    rng = np.random.default_rng(seed)
+    types[rng.random((ny, nx)) < surface_ratio] = '表層面'
+    sea = z < 0.0
+    types[sea] = '海水面'
+    z[sea] = Mesh.NO_DATA
+
+    # ファイル上の並び順に並べ替える
+    (stream_z, stream_types) = (z, types)
+    if order.startswith('-x'):
+        (stream_z, stream_types) = (stream_z[:, ::-1], stream_types[:, ::-1])
+    if order.endswith('+y'):
+        (stream_z, stream_types) = (stream_z[::-1], stream_types[::-1])
+    skip = start[1] * nx + start[0]
+    (stream_z, stream_types) = (stream_z.ravel()[skip:], stream_types.ravel()[skip:])
+    # 開始位置より前のメッシュはデータなし
+    skipped = np.zeros(nx * ny, dtype=bool)
+    skipped[:skip] = True
+    skipped = skipped.reshape(ny, nx)
+    if order.startswith('-x'):
+        skipped = skipped[:, ::-1]
+    if order.endswith('+y'):
+        skipped = skipped[::-1]
+    z[skipped] = Mesh.NO_DATA
+    types[skipped] = Mesh.NO_DATA_TYPE
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Dataset xsi:schemaLocation="http://fgd.gsi.go.jp/spec/2008/FGD_GMLSchema FGD_GMLSchema.xsd" '
+            'xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" xmlns="http://fgd.gsi.go.jp/spec/2008/FGD_GMLSchema" gml:id="Dataset1">\n'
+            '<gml:description>基盤地図情報メタデータ ID=fmdid:15-3101</gml:description>\n'
+            '<gml:name>基盤地図情報ダウンロードデータ（GML版）</gml:name>\n'
+            f'<DEM gml:id="DEM001">\n<fid>fgoid:10-00100-15-60101-{mesh_no}</fid>\n'
+            f'<lfSpanFr gml:id="DEM001-1">\n<gml:timePosition>2016-10-01</gml:timePosition>\n</lfSpanFr>\n'
+            f'<devDate gml:id="DEM001-2">\n<gml:timePosition>2016-10-01</gml:timePosition>\n</devDate>\n'
+            f'<orgGILvl>0</orgGILvl>\n<orgMDId>H23G0000</orgMDId>\n<type>{type_name}</type>\n<mesh>{mesh_no}</mesh>\n'
+            '<coverage gml:id="DEM001-3">\n<gml:boundedBy>\n<gml:Envelope srsName="fguuid:jgd2011.bl">\n'
+            f'<gml:lowerCorner>{_format_degree(lower[0])} {_format_degree(lower[1])}</gml:lowerCorner>\n'
+            f'<gml:upperCorner>{_format_degree(upper[0])} {_format_degree(upper[1])}</gml:upperCorner>\n'
+            '</gml:Envelope>\n</gml:boundedBy>\n<gml:gridDomain>\n<gml:Grid gml:id="DEM001-4" dimension="2">\n'
+            f'<gml:limits>\n<gml:GridEnvelope>\n<gml:low>0 0</gml:low>\n<gml:high>{nx - 1} {ny - 1}</gml:high>\n'
+            '</gml:GridEnvelope>\n</gml:limits>\n<gml:axisLabels>x y</gml:axisLabels>\n</gml:Grid>\n</gml:gridDomain>\n'
+            '<gml:rangeSet>\n<gml:DataBlock>\n<gml:rangeParameters>\n'
+            '<gml:QuantityList uom="DEM構成点"></gml:QuantityList>\n</gml:rangeParameters>\n<gml:tupleList>\n')
+        for offset in range(0, len(stream_z), 100000):
+            block_z = stream_z[offset:offset + 100000].tolist()
+            block_types = stream_types[offset:offset + 100000].tolist()
+            text = ('%s,%.2f\n' * len(block_z)) % tuple(v for pair in zip(block_types, block_z) for v in pair)
+            f.write(text.replace(',-9999.00\n', ',-9999.\n'))
+        f.write('</gml:tupleList>\n</gml:DataBlock>\n</gml:rangeSet>\n<gml:coverageFunction>\n<gml:GridFunction>\n'
+            f'<gml:sequenceRule order="{order}">Linear</gml:sequenceRule>\n'
+            f'<gml:startPoint>{start[0]} {start[1]}</gml:startPoint>\n'
+            '</gml:GridFunction>\n</gml:coverageFunction>\n</coverage>\n</DEM>\n</Dataset>\n')
+    return (z, types)
+
+def write_dem_tiles(directory:str, lower:tuple, upper:tuple, kind:str='DEM5A', height=terrain_height,
+    archive:str=None, seed:int=0) -> list[str]:
+    """
+    範囲を覆うタイル(メッシュコードごとの DEM ファイル)を作成する。
+    ファイル名は基盤地図情報ダウンロードデータと同じ形式
+    (例: FG-GML-5339-45-dem10b-20161001.xml、FG-GML-5339-45-00-DEM5A-20161001.xml)とする。
+
+    Parameters
+    ----
+    directory:str
+        保存先ディレクトリ
+    lower:tuple
+        範囲の南西端座標（緯度経度）
+    upper:tuple
+        範囲の北東端座標（緯度経度）
+    kind:str
+        DEMの種類（DEM_KINDS のキー）
+    height
+        緯度・経度の配列から標高(m)の配列を算出する関数
+    archive:str
+        指定した場合はタイルをこの名前の zip ファイルにまとめ、個別のファイルは削除する
+    seed:int
+        乱数シード
+
+    Returns
+    ----
+    list[str]
+        作成したファイルパスのリスト（archive 指定時は zip ファイルパスのみ）
+    """
+    if kind not in DEM_KINDS:
+        raise ValueError(f'unsupported DEM kind: {kind}')
+    digits = DEM_KINDS[kind][0]
+    (lat_step, lon_step) = ((1.0 / 1.5) / 8.0, 1.0 / 8.0)
+    if digits == 8:
+        (lat_step, lon_step) = (lat_step / 10.0, lon_step / 10.0)
+    # 範囲内の各タイルの中心からメッシュコードを求める
+    codes = []
+    # (浮動小数点の誤差でタイルが増えないよう丸めてから切り捨て・切り上げる)
+    for lat in range(int(np.floor(round(lower[0] / lat_step, 6))), int(np.ceil(round(upper[0] / lat_step, 6)))):
+        for lon in range(int(np.floor(round(lower[1] / lon_step, 6))), int(np.ceil(round(upper[1] / lon_step, 6)))):
+            code = str(int(get_mesh_code((lat + 0.5) * lat_step, (lon + 0.5) * lon_step, digits)))
+            if code not in codes:
+                codes.append(code)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for (i, code) in enumerate(codes):
+        if digits == 8:
+            name = f'FG-GML-{code[:4]}-{code[4:6]}-{code[6:]}-{kind}-20161001.xml'
+        else:
+            name = f'FG-GML-{code[:4]}-{code[4:6]}-{kind.lower()}-20161001.xml'
+        path = os.path.join(directory, name)
+        write_dem_gml(path, mesh_no=code, kind=kind, height=height, seed=seed + i)
+        paths.append(path)
+    if archive is None:
+        return paths
+    archive_path = os.path.join(directory, archive)
+    with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        for path in paths:
+            z.write(path, os.path.basename(path))
+            os.remove(path)
+    return [archive_path]
+
+def _format_degree(value:float) -> str:
+    """
+    緯度・経度を基盤地図情報と同じ形式(小数点以下最大9桁、末尾の0なし)で文字列化する。
+    """
+    return ('%.9f' % value).rstrip('0').rstrip('.')
+
+if __name__ == '__main__':
+    """
+    合成データファイルを作成する。
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='write synthetic Japan geoid(asc) and FG-GML DEM(xml) files')
+    parser.add_argument('--geoid', type=str, default=None, help='synthetic geoid file(asc) path')
+    parser.add_argument('--nla', type=int, default=1801, help='number of geoid latitude points')
+    parser.add_argument('--nlo', type=int, default=1201, help='number of geoid longitude points')
+    parser.add_argument('--dem', type=str, default=None, help='synthetic DEM tiles directory')
+    parser.add_argument('--kind', type=str, default='DEM5A', choices=list(DEM_KINDS), help='DEM kind')
+    parser.add_argument('--bounds', type=float, nargs=4, default=[35.6667, 139.625, 35.75, 139.75],
+        metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'), help='DEM tiles bounds')
+    parser.add_argument('--archive', type=str, default=None, help='zip DEM tiles into this archive name')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    if args.geoid is not None:
+        write_geoid_asc(args.geoid, nla=args.nla, nlo=args.nlo)
+    if args.dem is not None:
+        paths = write_dem_tiles(args.dem, tuple(args.bounds[:2]), tuple(args.bounds[2:]), kind=args.kind,
+            archive=args.archive, seed=args.seed)
+        print(f'{len(paths)} files written')
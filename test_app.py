@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+app.py (Webアプリケーション)テストコード
+
+pytestパッケージが必要です。
+
+"""
+# テストフレームワーク
+import sys
+import json
+import gzip
+import importlib
+import pytest
+import numpy as np
+
+# ターゲットモジュール/クラスのimport
+import metrics
+from synthetic import write_geoid_asc
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    """
+    合成ジオイドデータを読み込んだ app モジュールを返却する(app.py は import 時に引数を解析する)。
+    """
+    path = str(tmp_path_factory.mktemp('geoid') / 'synthetic.asc')
+    write_geoid_asc(path, nla=61, nlo=41)
+    argv = sys.argv
+    sys.argv = ['app.py', '--path', path, '--tile_size', '8', '--methods', 'bicubic',
+        '--height_cache_precision', '4']
+    try:
+        sys.modules.pop('app', None)
+        module = importlib.import_module('app')
+    finally:
+        sys.argv = argv
+    yield module
+    sys.modules.pop('app', None)
+
+@pytest.fixture
+def client(app):
+    """
+    Flask のテストクライアントを返却する。
+    """
+    return app.app.test_client()
+
+def test_height(app, client) -> None:
+    """
+    /height のテスト(丸めた緯度・経度で算出、範囲外・NO_DATA・不正な値は400)。
+    """
+    response = client.post('/height', json={'latitude': 35.00001, 'longitude': 135.0})
+    assert response.status_code == 200
+    assert response.get_json() == {'latitude': 35.0, 'longitude': 135.0, 'height': app.mgr.interpolate(35.0, 135.0)}
+    response = client.post('/height', json={'latitude': 35.0, 'longitude': 135.0, 'method': 'bicubic'})
+    assert response.get_json()['height'] == pytest.approx(app.mgr.interpolate(35.0, 135.0, method='bicubic'))
+
+    for body in [{'latitude': 10.0, 'longitude': 135.0}, {'latitude': 21.0, 'longitude': 121.0},
+        {'latitude': 35.0, 'longitude': 135.0, 'method': 'biquadratic'},
+        {'latitude': 'nan', 'longitude': 135.0}, {'latitude': 35.0, 'longitude': 'inf'}, {'latitude': 35.0}]:
+        response = client.post('/height', json=body)
+        assert response.status_code == 400
+        # nan・inf を含まない正しい JSON であること
+        assert 'error' in json.loads(response.get_data(as_text=True))
+
+def test_heights(app, client) -> None:
+    """
+    /heights のテスト(JSON・バイナリ形式、範囲外・データなしは errors)。
+    """
+    (lats, lons) = ([35.0, 10.0, 21.0, 40.5], [135.0, 135.0, 121.0, 141.25])
+    expected = app.mgr.interpolate_many(lats, lons)
+    for body in [{'latitudes': lats, 'longitudes': lons}, {'points': list(zip(lats, lons))}]:
+        response = client.post('/heights', json=body)
+        assert response.status_code == 200
+        result = response.get_json()
+        assert result['count'] == 4
+        assert result['errors'] == [False, True, True, False]
+        assert result['heights'][1] is None and result['heights'][2] is None
+        assert result['heights'][0] == expected[0] and result['heights'][3] == expected[3]
+
+    response = client.post('/heights', data=np.column_stack([lats, lons]).astype('<f8').tobytes(),
+        content_type='application/octet-stream')
+    assert response.status_code == 200 and response.mimetype == 'application/octet-stream'
+    assert np.array_equal(np.frombuffer(response.data, dtype='<f8'), expected, equal_nan=True)
+    response = client.post('/heights?method=bicubic', data=np.array([35.0, 135.0], dtype='<f8').tobytes(),
+        content_type='application/octet-stream')
+    assert np.frombuffer(response.data, dtype='<f8')[0] == app.mgr.interpolate_many([35.0], [135.0], 'bicubic')[0]
+
+    for (body, content_type) in [(b'\x00' * 15, 'application/octet-stream'),
+        (json.dumps({'latitudes': [35.0, 36.0], 'longitudes': [135.0]}), 'application/json'),
+        (json.dumps({'points': [[35.0, 135.0, 10.0], [36.0, 136.0, 20.0]]}), 'application/json'),
+        (json.dumps({'points': [35.0, 135.0, 36.0, 136.0]}), 'application/json'),
+        (json.dumps({'latitudes': [35.0], 'longitudes': [135.0], 'method': 'spline'}), 'application/json'),
+        ('not json', 'application/json')]:
+        response = client.post('/heights', data=body, content_type=content_type)
+        assert response.status_code == 400 and 'error' in response.get_json()
+
+def test_scatter2d_data(client) -> None:
+    """
+    /scatter2d_data のテスト(gzip 圧縮、ETag による304)。
+    """
+    response = client.get('/scatter2d_data', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+    (x, y) = json.loads(gzip.decompress(response.data))['data']
+    assert len(x) == len(y) > 0
+    etag = response.headers['ETag']
+    response = client.get('/scatter2d_data', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+    response = client.get('/scatter2d_data')
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.data)['data'] == [x, y]
+
+def test_tiles(app, client) -> None:
+    """
+    /tiles のテスト(タイル範囲外は404、ETag による304)。
+    """
+    response = client.get('/tiles/0/0/0')
+    assert response.status_code == 200
+    tile = response.get_json()
+    assert (tile['z'], tile['x'], tile['y']) == (0, 0, 0)
+    assert len(tile['data']) == 3 and len(tile['data'][0]) == len(tile['data'][2]) > 0
+    response = client.get('/tiles/0/0/0', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    for url in ['/tiles/0/1/0', '/tiles/1/0/2', '/tiles/30/0/0']:
+        response = client.get(url)
+        assert response.status_code == 404 and 'error' in response.get_json()
+
+def test_metrics_endpoint(client) -> None:
+    """
+    /metrics のテスト(無効時は404、有効時は Prometheus のテキスト形式)。
+    """
+    assert not metrics.REGISTRY.enabled
+    assert client.get('/metrics').status_code == 404
+    metrics.enable()
+    try:
+        client.post('/height', json={'latitude': 36.0, 'longitude': 136.0})
+        response = client.get('/metrics')
+    finally:
+        metrics.disable()
+        metrics.REGISTRY.reset()
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert 'http_requests_total{endpoint="/height",method="POST",status="200"} 1' in lines
+    assert 'geoid_points_interpolated_total{method="interpolate"} 1' in lines
+    assert any(line.startswith('height_cache_hits ') for line in lines)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+convert.py (楕円体高・正標高変換)テストコード
+
+pytestパッケージが必要です。
+
+"""
+# テストフレームワーク
+import pytest
+import numpy as np
+
+# ターゲットモジュール/クラスのimport
+from geoid import HeightManager
+from dem.mesh import Mesh, MeshCollection, Mosaic
+from convert import convert_raster, to_ellipsoidal, to_orthometric
+from test_geoid import _synthetic_height, _write_synthetic_asc
+from test_mesh import _write_synthetic_gml
+
+@pytest.fixture(scope='module')
+def manager(tmp_path_factory):
+    """
+    合成ジオイドモデル(1度×1.5度格子)を返却する。
+    """
+    path = tmp_path_factory.mktemp('geoid') / 'small.asc'
+    _write_synthetic_asc(str(path), nla=31, nlo=21)
+    return HeightManager(str(path), cache=False)
+
+def test_convert_mesh(manager, tmp_path, capsys) -> None:
+    """
+    タイルの標高を楕円体高へ変換し、正標高へ戻すテスト。
+    """
+    path = str(tmp_path / 'dem.xml')
+    _write_synthetic_gml(path, nx=50, ny=40)
+    mesh = Mesh(path)
+    heights = to_ellipsoidal(manager, mesh, chunk_rows=7)
+    assert heights.dtype == np.float32 and heights.shape == mesh.z.shape
+
+    # 合成ジオイド高は1次式なので、メッシュの中心のジオイド高を加算した値と一致する
+    geoid = _synthetic_height(mesh.latitudes[:, None], mesh.longitudes[None, :])
+    valid = mesh.z > Mesh.NO_DATA
+    assert np.allclose(heights[valid], (mesh.z + geoid)[valid], atol=1e-3)
+    assert (heights[~valid] == Mesh.NO_DATA).all()
+
+    # 楕円体高から正標高への変換
+    mesh.z = heights
+    assert np.allclose(to_orthometric(manager, mesh)[valid], Mesh(path).z[valid], atol=1e-3)
+    assert np.array_equal(convert_raster(manager, mesh, ellipsoidal=False), to_orthometric(manager, mesh))
+    to_orthometric(manager, mesh, debug=True)
+    assert 'to orthometric height' in capsys.readouterr().out
+
+def test_convert_mosaic(manager, tmp_path) -> None:
+    """
+    モザイクの変換結果をディスク上のラスタへ書き込むテスト。
+    """
+    (tmp_path / 'tiles').mkdir()
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'a.xml'), mesh_no='000000', lower=(35.0, 139.0), upper=(35.1, 139.125), seed=1)
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'b.xml'), mesh_no='000001', lower=(35.0, 139.125), upper=(35.1, 139.25), seed=2)
+    mosaic = MeshCollection.load(str(tmp_path / 'tiles'), workers=1).mosaic(str(tmp_path / 'mosaic.npy'))
+
+    path = str(tmp_path / 'ellipsoidal.npy')
+    convert_raster(manager, mosaic, path=path, chunk_rows=3)
+    converted = Mosaic.open(path)
+    assert isinstance(converted.z, np.memmap) and converted.z.shape == mosaic.z.shape
+    assert converted.tiles == ['000000', '000001']
+    geoid = manager.interpolate_grid(mosaic.latitudes, mosaic.longitudes)
+    valid = mosaic.z > Mosaic.NO_DATA
+    assert np.allclose(converted.z[valid], (mosaic.z + geoid)[valid], atol=1e-4)
+    assert (converted.z[~valid] == Mosaic.NO_DATA).all()
+
+    # ジオイドモデルの範囲外はデータなし
+    mosaic.latitudes = mosaic.latitudes + 30.0
+    assert (convert_raster(manager, mosaic) == Mosaic.NO_DATA).all()
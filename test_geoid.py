@@ -6,10 +6,36 @@ pytestパッケージが必要です。
 
 """
 # テストフレームワーク
+import json
+import time
 import pytest
+import numpy as np
 
 # ターゲットモジュール/クラスのimport
-from geoid import HeightManager
+from geoid import HeightCache, HeightManager
+from synthetic import write_geoid_asc
+
+def _synthetic_height(latitude, longitude):
+    """
+    合成ジオイド高（緯度・経度の1次式なので双1次内挿で誤差なく再現できる）。
+    """
+    return 30.0 + 0.1 * (latitude - 20.0) + 0.05 * (longitude - 120.0)
+
+def _write_synthetic_asc(path, nla:int=1801, nlo:int=1201) -> np.ndarray:
+    """
+    日本のジオイド(ASCII形式)と同じレイアウトの合成データファイルを synthetic.write_geoid_asc で作成する。
+    ジオイド高は _synthetic_height、南西端(北緯24度未満かつ東経125度未満)は NO_DATA とする。
+    """
+    return write_geoid_asc(path, nla, nlo, height=_synthetic_height)
+
+@pytest.fixture(scope='module')
+def synthetic_asc(tmp_path_factory):
+    """
+    合成データファイルパスと書き込んだグリッドを返却する。
+    """
+    path = tmp_path_factory.mktemp('geoid') / 'synthetic.asc'
+    grid = _write_synthetic_asc(str(path))
+    return (str(path), grid)
 
 def test_interpolate(path:str='gsigeo2011_ver2_1.asc', debug:str=True) -> None:
     """
@@ -71,6 +97,376 @@ def test_gpd_save(path:str='gsigeo2011_ver2_1.asc', gpd_graph_path='gsigeo2011_v
     geo.plot(ax=ax, color='red', markersize=2)
     plt.savefig(path + '.png')
 
+def test_grid(synthetic_asc) -> None:
+    """
+    ジオイド高グリッド(ndarray)格納のテスト。
+    """
+    (path, expected) = synthetic_asc
+    mgr = HeightManager(path)
+    assert mgr.grid.shape == (1801, 1201)
+    assert mgr.grid.flags['C_CONTIGUOUS']
+    assert np.allclose(mgr.grid, expected, rtol=0.0, atol=1e-4)
+    assert np.array_equal(mgr.valid, expected < HeightManager.NO_DATA)
+    # 従来の rows[緯度インデックス][経度インデックス] 参照
+    assert mgr.rows[100][200] == mgr.grid[100, 200]
+
+    mgr32 = HeightManager(path, dtype=np.float32)
+    assert mgr32.grid.dtype == np.float32
+    assert mgr32.grid.nbytes * 2 == mgr.grid.nbytes
+
+def test_interpolate_synthetic(synthetic_asc) -> None:
+    """
+    合成データによる内挿計算のテスト。
+    """
+    (path, _) = synthetic_asc
+    mgr = HeightManager(path)
+    for (lat, lon) in [(35.65788355, 139.74216577), (33.0, 131.0), (26.633333, 127.966667), (20.0, 130.0), (45.0, 120.0)]:
+        assert _synthetic_height(lat, lon) == pytest.approx(mgr.interpolate(lat, lon), abs=1e-4)
+    with pytest.raises(ValueError):
+        mgr.interpolate(10.0, 139.0)
+
+def test_interpolate_many(synthetic_asc) -> None:
+    """
+    一括内挿計算のテスト。
+    """
+    (path, _) = synthetic_asc
+    mgr = HeightManager(path)
+
+    # 単点の内挿計算と一致すること(格子点上・境界を含む)
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([rng.uniform(24.0, 50.0, 1000), [20.0, 35.0, 49.99, 24.0]])
+    lons = np.concatenate([rng.uniform(120.0, 150.0, 1000), [130.0, 120.0, 149.99, 124.975]])
+    heights = mgr.interpolate_many(lats, lons)
+    assert heights.shape == lats.shape
+    expected = [mgr.interpolate(lat, lon) for (lat, lon) in zip(lats, lons)]
+    assert np.allclose(heights, expected, rtol=0.0, atol=1e-9)
+
+    # 範囲外・NO_DATA は np.nan
+    heights = mgr.interpolate_many([10.0, 44.0, 50.0, 21.0, 23.99, np.nan], [139.0, 152.0, 135.0, 121.0, 124.99, 135.0])
+    assert np.isnan(heights).all()
+
+    # リスト・スカラーのブロードキャスト
+    heights = mgr.interpolate_many(35.0, [135.0, 136.0])
+    assert heights.shape == (2,)
+    assert heights[1] == pytest.approx(_synthetic_height(35.0, 136.0), abs=1e-4)
+
+def test_interpolate_grid(synthetic_asc) -> None:
+    """
+    緯度・経度の座標軸の格子に対する一括内挿のテスト。
+    """
+    (path, _) = synthetic_asc
+    mgr = HeightManager(path)
+    # 範囲外・NO_DATA 境界を含む
+    lats = np.linspace(19.5, 50.5, 300)[::-1]
+    lons = np.linspace(119.5, 150.5, 200)
+    heights = mgr.interpolate_grid(lats, lons)
+    assert heights.shape == (300, 200)
+    expected = mgr.interpolate_many(lats[:, None], lons[None, :])
+    assert np.array_equal(np.isnan(heights), np.isnan(expected))
+    assert np.allclose(heights[~np.isnan(heights)], expected[~np.isnan(expected)], rtol=0.0, atol=1e-9)
+    assert np.isnan(mgr.interpolate_grid([60.0], lons)).all()
+
+def test_interpolate_parallel(synthetic_asc) -> None:
+    """
+    プロセスプールによる一括内挿計算のテスト。
+    """
+    (path, _) = synthetic_asc
+    rng = np.random.default_rng(2)
+    lats = rng.uniform(20.0, 50.0, (100, 50))
+    lons = rng.uniform(120.0, 150.0, (100, 50))
+    for cache in (True, False):
+        # cache=True はキャッシュファイルのメモリマップ、False は共有メモリ経由
+        mgr = HeightManager(path, cache=cache)
+        expected = mgr.interpolate_many(lats, lons)
+        heights = mgr.interpolate_parallel(lats, lons, workers=2, chunk_size=1000)
+        assert heights.shape == (100, 50)
+        assert np.array_equal(heights, expected, equal_nan=True)
+
+def test_interpolate_csv(synthetic_asc, tmp_path) -> None:
+    """
+    CSVファイルのチャンク処理によるジオイド高付与のテスト。
+    """
+    (path, _) = synthetic_asc
+    mgr = HeightManager(path)
+
+    # interpolate_stream
+    chunks = [([35.0, 36.0], [135.0, 136.0]), (np.array([10.0]), np.array([139.0]))]
+    results = list(mgr.interpolate_stream(chunks))
+    assert len(results) == 2
+    assert results[0][1] == pytest.approx(_synthetic_height(36.0, 136.0), abs=1e-4)
+    assert np.isnan(results[1][0])
+
+    # interpolate_csv(チャンクサイズより多い行数、範囲外の行を含む)
+    src = tmp_path / 'points.csv'
+    dst = tmp_path / 'points_geoid.csv'
+    rng = np.random.default_rng(1)
+    lats = rng.uniform(25.0, 45.0, 25)
+    lons = rng.uniform(125.0, 145.0, 25)
+    lines = ['id,lon,lat,name\n'] + [f'{i},{lon},{lat},p{i}\n' for (i, (lat, lon)) in enumerate(zip(lats, lons))]
+    lines.append('25,152.0,44.0,outside\n')
+    src.write_text(''.join(lines), encoding='utf-8')
+    total = mgr.interpolate_csv(str(src), str(dst), lat_col=2, lon_col=1, chunk_size=10, header=True)
+    assert total == 26
+
+    rows = dst.read_text(encoding='utf-8').splitlines()
+    assert rows[0] == 'id,lon,lat,name,geoid_height'
+    assert len(rows) == 27
+    for (i, row) in enumerate(rows[1:26]):
+        tokens = row.split(',')
+        assert tokens[:4] == lines[i + 1].strip().split(',')
+        assert float(tokens[4]) == pytest.approx(_synthetic_height(lats[i], lons[i]), abs=2e-4)
+    assert rows[26] == '25,152.0,44.0,outside,999.0000'
+
+def test_convert_xyz(synthetic_asc) -> None:
+    """
+    格子点データ変換(NO_DATA除外)のテスト。
+    """
+    (path, expected) = synthetic_asc
+    mgr = HeightManager(path)
+    (x, y, z) = mgr.convert_xyz()
+
+    # 緯度順・経度順に NO_DATA 以外の格子点が並ぶこと
+    (lat_idx, lon_idx) = np.nonzero(expected < HeightManager.NO_DATA)
+    assert len(x) == len(y) == len(z) == len(lat_idx)
+    assert np.array_equal(x, mgr.glomn + lon_idx * mgr.dglo)
+    assert np.array_equal(y, mgr.glamn + lat_idx * mgr.dgla)
+    assert np.array_equal(z, mgr.grid[lat_idx, lon_idx])
+
+    # 2回目以降は保持した読み取り専用の配列を返却
+    assert all(a is b for (a, b) in zip(mgr.convert_xyz(), (x, y, z)))
+    with pytest.raises(ValueError):
+        z[0] = 0.0
+
+def test_save(tmp_path) -> None:
+    """
+    CSV保存のテスト。
+    """
+    import gzip
+    path = str(tmp_path / 'small.asc')
+    _write_synthetic_asc(path, nla=31, nlo=21)
+    mgr = HeightManager(path)
+    (x, y, z) = mgr.convert_xyz()
+
+    # 既定は丸めなし・ヘッダなし(チャンク境界をまたぐ)
+    mgr.save(str(tmp_path / 'geoid.csv'), chunk_size=100)
+    rows = (tmp_path / 'geoid.csv').read_text().splitlines()
+    assert rows == [f'{a},{b},{c}' for (a, b, c) in zip(x.tolist(), y.tolist(), z.tolist())]
+
+    # 小数点以下桁数・ヘッダ・gzip圧縮
+    mgr.save(str(tmp_path / 'geoid.csv.gz'), precision=2, header=True)
+    with gzip.open(tmp_path / 'geoid.csv.gz', 'rt') as f:
+        rows = f.read().splitlines()
+    assert rows[0] == 'longitude,latitude,height'
+    assert rows[1] == f'{x[0]:.2f},{y[0]:.2f},{z[0]:.2f}'
+    assert len(rows) == len(z) + 1
+
+def test_save_geojson(tmp_path) -> None:
+    """
+    GeoJSON(FeatureCollection/GeoJSONSeq)保存のテスト。
+    """
+    import json
+    path = str(tmp_path / 'small.asc')
+    _write_synthetic_asc(path, nla=31, nlo=21)
+    mgr = HeightManager(path)
+    (x, y, z) = mgr.convert_xyz()
+
+    # FeatureCollection(チャンク境界をまたぐ)
+    mgr.save_geojson(str(tmp_path / 'geoid.json'), chunk_size=100)
+    with open(tmp_path / 'geoid.json', encoding='utf-8') as f:
+        features = json.load(f)['features']
+    assert len(features) == len(z)
+    assert [feature['geometry']['coordinates'] for feature in features] == np.column_stack((x, y)).tolist()
+    assert [feature['properties']['height'] for feature in features] == z.tolist()
+
+    # GeoJSONSeq、小数点以下桁数、座標系
+    mgr.save_geojson(str(tmp_path / 'geoid.geojsonl'), crs='EPSG:6668', precision=3, seq=True, chunk_size=100)
+    lines = (tmp_path / 'geoid.geojsonl').read_text(encoding='utf-8').splitlines()
+    assert len(lines) == len(z)
+    assert json.loads(lines[-1])['geometry']['coordinates'] == [round(x[-1], 3), round(y[-1], 3)]
+    mgr.save_geojson(str(tmp_path / 'geoid6668.json'), crs='EPSG:6668')
+    with open(tmp_path / 'geoid6668.json', encoding='utf-8') as f:
+        assert json.load(f)['crs']['properties']['name'] == 'urn:ogc:def:crs:EPSG::6668'
+
+def test_columnar(tmp_path) -> None:
+    """
+    GeoParquet/Feather/バイナリグリッド保存・読み込みのテスト。
+    """
+    path = str(tmp_path / 'small.asc')
+    _write_synthetic_asc(path, nla=31, nlo=21)
+    mgr = HeightManager(path, cache=False)
+    (x, y, z) = mgr.convert_xyz()
+
+    # 点群(GeoParquet/Feather)
+    pytest.importorskip('pyarrow')
+    for name in ['geoid.parquet', 'geoid.feather']:
+        (mgr.save_parquet if name.endswith('.parquet') else mgr.save_feather)(str(tmp_path / name))
+        df = HeightManager.load_points(str(tmp_path / name))
+        assert df.crs == 'EPSG:4326'
+        assert np.array_equal(df['height'].to_numpy(), z)
+        assert np.array_equal(df.geometry.x.to_numpy(), x)
+        assert np.array_equal(df.geometry.y.to_numpy(), y)
+
+    # グリッド(.npy + .json)はメモリマップで読み込む
+    mgr.save_grid(str(tmp_path / 'grid.npy'))
+    loaded = HeightManager.load_grid(str(tmp_path / 'grid.npy'))
+    assert isinstance(loaded.grid, np.memmap)
+    assert np.array_equal(loaded.grid, mgr.grid)
+    assert (loaded.glamn, loaded.glomn, loaded.nla, loaded.nlo) == (mgr.glamn, mgr.glomn, mgr.nla, mgr.nlo)
+    assert loaded.interpolate(20.1, 120.1) == mgr.interpolate(20.1, 120.1)
+
+def test_tile(synthetic_asc) -> None:
+    """
+    ズームレベル別タイル取得のテスト。
+    """
+    (path, _) = synthetic_asc
+    mgr = HeightManager(path)
+    assert mgr.get_tile_extent() == 2048
+
+    # ズームレベル0は全域を size 四方以下に間引く(NO_DATA は含まない)
+    (lons, lats, heights) = mgr.get_tile(0, 0, 0, size=256)
+    assert 0 < len(heights) <= 256 * 256
+    assert not np.isnan(heights).any() and (heights < HeightManager.NO_DATA).all()
+    # 合成データは1次式なのでブロック中心の値と一致する(NO_DATA 境界のブロックを除く)
+    inner = (lats > 24.2) | (lons > 125.2)
+    assert np.allclose(heights[inner], _synthetic_height(lats[inner], lons[inner]), atol=1e-3)
+
+    # 間引きなしのタイルは格子点の値そのもの
+    (lons, lats, heights) = mgr.get_tile(3, 3, 2, size=256)
+    (west, south, east, north) = mgr.get_tile_bounds(3, 3, 2)
+    assert len(heights) == 256 * 256
+    assert (lons.min(), lats.max()) == pytest.approx((west, north))
+    assert (lons.max(), lats.min()) == pytest.approx((east, south))
+    assert heights[0] == mgr.grid[mgr.nla - 1 - 2 * 256, 3 * 256]
+
+    # データ範囲外のタイルは空
+    assert len(mgr.get_tile(3, 7, 7)[0]) == 0
+    for (z, x, y) in [(-1, 0, 0), (12, 0, 0), (1, 2, 0), (1, 0, -1)]:
+        with pytest.raises(ValueError):
+            mgr.get_tile(z, x, y)
+
+def test_cache(tmp_path) -> None:
+    """
+    バイナリキャッシュのテスト。
+    """
+    import os
+    path = str(tmp_path / 'cache.asc')
+    _write_synthetic_asc(path)
+
+    # 初回はASCII形式から読み込みキャッシュを作成
+    mgr = HeightManager(path)
+    assert not isinstance(mgr.grid, np.memmap)
+    assert os.path.exists(path + '.npy') and os.path.exists(path + '.json')
+
+    # 2回目以降はメモリマップで読み込む
+    cached = HeightManager(path)
+    assert isinstance(cached.grid, np.memmap)
+    assert np.array_equal(cached.grid, mgr.grid)
+    assert (cached.glamn, cached.glomn, cached.nla, cached.nlo, cached.ikind, cached.vern) == \
+        (mgr.glamn, mgr.glomn, mgr.nla, mgr.nlo, mgr.ikind, mgr.vern)
+    assert cached.interpolate(35.0, 135.0) == mgr.interpolate(35.0, 135.0)
+
+    # 型が異なる場合はキャッシュを使用しない
+    assert not isinstance(HeightManager(path, dtype=np.float32).grid, np.memmap)
+
+    # データファイルが更新された場合はキャッシュを作り直す
+    _write_synthetic_asc(path, nla=1801, nlo=1201)
+    os.utime(path, ns=(0, 0))
+    assert not isinstance(HeightManager(path).grid, np.memmap)
+    assert isinstance(HeightManager(path).grid, np.memmap)
+
+    # キャッシュ無効
+    assert not isinstance(HeightManager(path, cache=False).grid, np.memmap)
+
+def test_interpolate_methods(tmp_path) -> None:
+    """
+    双2次・双3次内挿のテスト(2次式のジオイド高は誤差なく再現できる)。
+    """
+    import os
+    quadratic = lambda lat, lon: _synthetic_height(lat, lon) + 0.02 * (lat - 35.0) ** 2 - \
+        0.03 * (lon - 135.0) ** 2 + 0.01 * (lat - 35.0) * (lon - 135.0)
+    path = str(tmp_path / 'quadratic.asc')
+    write_geoid_asc(path, nla=61, nlo=41, height=quadratic)
+    mgr = HeightManager(path)
+    rng = np.random.default_rng(0)
+    (lats, lons) = (rng.uniform(24.5, 50.0, 1000), rng.uniform(125.5, 150.0, 1000))
+    for method in ('biquadratic', 'bicubic'):
+        heights = mgr.interpolate_many(lats, lons, method=method)
+        assert np.allclose(heights, quadratic(lats, lons), atol=1e-4)
+        assert np.allclose(mgr.interpolate_grid(lats[:5], lons[:7], method=method),
+            mgr.interpolate_many(lats[:5, None], lons[None, :7], method=method))
+        for (lat, lon, height) in zip(lats[:50], lons[:50], heights[:50]):
+            assert mgr.interpolate(lat, lon, method=method) == pytest.approx(height, abs=1e-9)
+        # 範囲外は nan、NO_DATA の近くは双1次内挿
+        assert np.isnan(mgr.interpolate_many([10.0, np.nan], [130.0, 130.0], method=method)).all()
+        with pytest.raises(ValueError):
+            mgr.interpolate(10.0, 130.0, method=method)
+        # NO_DATA の格子は interpolate_many は nan、interpolate は ValueError
+        assert np.isnan(mgr.interpolate_many([21.0], [121.0], method=method)[0])
+        with pytest.raises(ValueError):
+            mgr.interpolate(21.0, 121.0, method=method)
+        assert mgr.interpolate_many([24.2], [125.0], method=method)[0] == \
+            mgr.interpolate_many([24.2], [125.0])[0] == pytest.approx(mgr.interpolate(24.2, 125.0, method=method))
+        # 内挿係数表はキャッシュに保存され、次回はメモリマップで読み込む
+        assert os.path.exists(f'{path}.{method}.npy') and os.path.exists(f'{path}.{method}.json')
+        assert isinstance(HeightManager(path).get_coefficients(method), np.memmap)
+        with open(f'{path}.{method}.json', 'r', encoding='utf-8') as f:
+            assert json.load(f)['dtype'] == '<f8'
+    # methods を指定した場合は読み込み時に係数表を準備する
+    assert sorted(HeightManager(path, methods=['bilinear', 'bicubic'])._coefficients) == ['bicubic']
+    with pytest.raises(ValueError):
+        HeightManager(path, methods=['spline'])
+    assert not os.path.exists(path + '.bilinear.npy')
+    with pytest.raises(ValueError):
+        mgr.interpolate_many([35.0], [135.0], method='spline')
+
+def test_height_cache(tmp_path, monkeypatch) -> None:
+    """
+    点のジオイド高の LRU/TTL キャッシュのテスト。
+    """
+    path = str(tmp_path / 'synthetic.asc')
+    _write_synthetic_asc(path, nla=61, nlo=41)
+    mgr = HeightManager(path)
+    cache = HeightCache(mgr, maxsize=2, ttl=10.0, precision=4, cell_cache_size=1)
+    # 丸めた緯度・経度で算出し、格子の四隅を再利用しても HeightManager.interpolate と一致する
+    for (lat, lon) in [(35.12344, 135.5), (35.12341, 135.5), (35.3, 135.6), (20.0, 130.2), (49.9, 149.9)]:
+        assert cache.interpolate(lat, lon) == mgr.interpolate(round(lat, 4), round(lon, 4))
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+    assert (info.cell_hits, info.cell_misses, info.cell_currsize) == (1, 2, 1)
+    assert cache.get_hit_ratio() == pytest.approx(0.2)
+    # 最も古く参照された点から破棄する
+    cache.interpolate(35.3, 135.6)
+    assert cache.cache_info().misses == 5
+    # 範囲外・NO_DATA の格子(端を含む)は ValueError とし、キャッシュしない
+    for _ in range(2):
+        for (lat, lon) in [(10.0, 135.0), (21.0, 121.0), (20.0, 121.0)]:
+            with pytest.raises(ValueError):
+                cache.interpolate(lat, lon)
+    assert cache.cache_info().cell_currsize == 1
+    with pytest.raises(ValueError):
+        HeightCache(mgr, cell_cache_size=0).interpolate(23.9, 124.9)
+    assert cache.quantize(35.123456, 135.5) == (35.1235, 135.5)
+    # 保持期間を過ぎた点は算出しなおす
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 11.0)
+    cache.interpolate(35.3, 135.6)
+    assert cache.cache_info().expired == 1
+    assert cache.interpolate(35.0, 135.0, method='bicubic') == mgr.interpolate(35.0, 135.0, method='bicubic')
+    cache.clear()
+    assert cache.cache_info() == (0, 0, 0, 2, 0, 0, 0, 0)
+
+def test_broken_asc(tmp_path) -> None:
+    """
+    データ件数がメタ情報と一致しない場合のテスト。
+    """
+    path = tmp_path / 'broken.asc'
+    path.write_text(' 20.00000 120.00000 0.016667 0.025000 3 4 1 ver2.1\n 1.0 2.0 3.0 4.0\n 5.0\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        HeightManager(str(path))
+    path.write_text(' 20.00000 120.00000 0.016667 0.025000 1 2 1 ver2.1\n 1.0 abc\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        HeightManager(str(path))
+
 def test_clsmethod():
     """
     度分秒<->度 変換テスト。
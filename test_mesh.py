@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+dem/mesh.py (Mesh)テストコード
+
+pytestパッケージが必要です。
+
+"""
+# テストフレームワーク
+import pytest
+import numpy as np
+
+# ターゲットモジュール/クラスのimport
+from dem.mesh import Mesh
+
+def _write_synthetic_gml(path, nx:int=5, ny:int=4, mesh_no:str='533925',
+    lower:tuple=(35.666666667, 139.625), upper:tuple=(35.75, 139.75), seed:int=0,
+    start:tuple=(0, 0)) -> list:
+    """
+    基盤地図情報数値標高モデル(GML形式)と同じレイアウト(+x-y の並び)の合成データファイルを作成する。
+    データは開始位置 start から格納し、先頭のメッシュ点はデータなし、4番目のメッシュ点は表層面とする。
+    書き込んだ (種類, 標高) のリストを返却する。
+    """
+    rng = np.random.default_rng(seed)
+    count = nx * ny - (start[1] * nx + start[0])
+    tuples = [('地表面', round(float(v), 2)) for v in rng.uniform(10.0, 100.0, count)]
+    tuples[0] = ('データなし', Mesh.NO_DATA)
+    if len(tuples) > 3:
+        tuples[3] = ('表層面', tuples[3][1])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Dataset xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xmlns="http://fgd.gsi.go.jp/spec/2008/FGD_GMLSchema" gml:id="Dataset1">\n'
+            '<gml:description>基盤地図情報メタデータ</gml:description>\n'
+            '<gml:name>基盤地図情報ダウンロードデータ（GML版）</gml:name>\n'
+            f'<DEM gml:id="DEM001">\n<type>10mメッシュ（標高）</type>\n<mesh>{mesh_no}</mesh>\n'
+            '<coverage gml:id="DEM001-3">\n<gml:boundedBy>\n<gml:Envelope srsName="fguuid:jgd2011.bl">\n'
+            f'<gml:lowerCorner>{lower[0]} {lower[1]}</gml:lowerCorner>\n'
+            f'<gml:upperCorner>{upper[0]} {upper[1]}</gml:upperCorner>\n'
+            '</gml:Envelope>\n</gml:boundedBy>\n<gml:gridDomain>\n<gml:Grid gml:id="DEM001-4" dimension="2">\n'
+            f'<gml:limits>\n<gml:GridEnvelope>\n<gml:low>0 0</gml:low>\n<gml:high>{nx - 1} {ny - 1}</gml:high>\n'
+            '</gml:GridEnvelope>\n</gml:limits>\n<gml:axisLabels>x y</gml:axisLabels>\n</gml:Grid>\n</gml:gridDomain>\n'
+            '<gml:rangeSet>\n<gml:DataBlock>\n<gml:rangeParameters>\n'
+            '<gml:QuantityList uom="DEM構成点"></gml:QuantityList>\n</gml:rangeParameters>\n<gml:tupleList>\n')
+        f.write(''.join(f'{t},{z}\n' for (t, z) in tuples))
+        f.write('</gml:tupleList>\n</gml:DataBlock>\n</gml:rangeSet>\n<gml:coverageFunction>\n<gml:GridFunction>\n'
+            '<gml:sequenceRule order="+x-y">Linear</gml:sequenceRule>\n'
+            f'<gml:startPoint>{start[0]} {start[1]}</gml:startPoint>\n'
+            '</gml:GridFunction>\n</gml:coverageFunction>\n</coverage>\n</DEM>\n</Dataset>\n')
+    return tuples
+
+def test_load(tmp_path) -> None:
+    """
+    GML形式ファイル読み込みのテスト。
+    """
+    path = str(tmp_path / 'dem.xml')
+    tuples = _write_synthetic_gml(path)
+    mesh = Mesh(path)
+    assert mesh.mesh_no == '533925'
+    assert (mesh.lower, mesh.upper) == ([35.666666667, 139.625], [35.75, 139.75])
+    assert (mesh.low, mesh.high, mesh.order) == ([0, 0], [4, 3], [1, -1])
+    assert (mesh.seq_rule, mesh.uom) == ('Linear', 'DEM構成点')
+
+    # 標高は float32、種類は種類コード(uint8)と種類コード表で、北から南・西から東の2次元配列として保持する
+    assert mesh.z.dtype == np.float32 and mesh.type_codes.dtype == np.uint8
+    assert mesh.z.shape == mesh.type_codes.shape == mesh.get_shape() == (4, 5)
+    assert np.array_equal(mesh.z.ravel(), np.array([z for (_, z) in tuples], dtype=np.float32))
+    assert mesh.type_names == ['データなし', '地表面', '表層面']
+    assert mesh.types.ravel().tolist() == [t for (t, _) in tuples]
+
+    # 座標はメッシュの中心、座標軸から生成する
+    assert np.allclose(mesh.latitudes, 35.75 - (np.arange(4) + 0.5) * (35.75 - 35.666666667) / 4)
+    assert np.allclose(mesh.longitudes, 139.625 + (np.arange(5) + 0.5) * 0.125 / 5)
+    assert mesh.x.shape == mesh.y.shape == (4, 5)
+    assert (mesh.x[1, 3], mesh.y[1, 3]) == (mesh.latitudes[1], mesh.longitudes[3])
+    (x, y, z) = mesh.convert_xyz()
+    assert len(z) == 19 and (x[0], y[0], z[0]) == (mesh.latitudes[0], mesh.longitudes[1], mesh.z[0, 1])
+
+def test_load_start_point(tmp_path) -> None:
+    """
+    データ開始位置(startPoint)が先頭でない場合のテスト。
+    """
+    path = str(tmp_path / 'dem.xml')
+    tuples = _write_synthetic_gml(path, start=(2, 1))
+    mesh = Mesh(path)
+    # 開始位置より前のメッシュ点はデータなし
+    assert (mesh.z.ravel()[:7] == Mesh.NO_DATA).all()
+    assert (mesh.types.ravel()[:7] == Mesh.NO_DATA_TYPE).all()
+    assert np.array_equal(mesh.z.ravel()[7:], np.array([z for (_, z) in tuples], dtype=np.float32))
+
+def test_load_stream(tmp_path) -> None:
+    """
+    tupleList を小さな単位に分けて解析しても同じ結果となることのテスト。
+    """
+    from dem.mesh import _GmlReader
+    path = str(tmp_path / 'dem.xml')
+    _write_synthetic_gml(path, nx=30, ny=20)
+    mesh = Mesh(path)
+    with open(path, 'rb') as f:
+        reader = _GmlReader(chunk_size=7).parse(f, block_size=5)
+    assert reader.count == 600
+    assert np.array_equal(reader.z, mesh.z.ravel())
+    assert np.array_equal(reader.codes, mesh.type_codes.ravel())
+
+    # 要素数がグリッドの大きさを超える場合はエラー
+    text = (tmp_path / 'dem.xml').read_text(encoding='utf-8')
+    (tmp_path / 'over.xml').write_text(text.replace('<gml:high>29 19</gml:high>', '<gml:high>29 18</gml:high>'), encoding='utf-8')
+    with pytest.raises(ValueError):
+        Mesh(str(tmp_path / 'over.xml'))
+
+def test_save_csv(tmp_path) -> None:
+    """
+    CSV保存のテスト(標高は float32 の最短表記で出力される)。
+    """
+    path = str(tmp_path / 'dem.xml')
+    tuples = _write_synthetic_gml(path)
+    mesh = Mesh(path)
+    mesh.save_csv(str(tmp_path / 'dem.csv'), chunk_size=7)
+    rows = (tmp_path / 'dem.csv').read_text(encoding='utf-8').splitlines()
+    assert [row.split(',', 2)[2] for row in rows] == [f'{float(z)},{t}' for (t, z) in tuples]
+    assert rows[6].split(',')[:2] == [str(mesh.latitudes[1].item()), str(mesh.longitudes[1].item())]
+
+def test_columnar(tmp_path) -> None:
+    """
+    GeoParquet/Feather/バイナリグリッド保存・読み込みのテスト。
+    """
+    path = str(tmp_path / 'dem.xml')
+    _write_synthetic_gml(path)
+    mesh = Mesh(path)
+
+    # 点群(GeoParquet/Feather)はデータなしを除外して保存される
+    pytest.importorskip('pyarrow')
+    for name in ['dem.parquet', 'dem.feather']:
+        (mesh.save_parquet if name.endswith('.parquet') else mesh.save_feather)(str(tmp_path / name))
+        df = Mesh.load_points(str(tmp_path / name))
+        assert np.array_equal(df['height'].to_numpy(), mesh.z.ravel()[1:])
+        assert df['type'].tolist() == mesh.types.ravel()[1:].tolist()
+        assert np.array_equal(df.geometry.y.to_numpy(), mesh.x.ravel()[1:])
+
+    # グリッド(.npy + .types.npy + .json)、標高は float32 で保存される
+    mesh.save_grid(str(tmp_path / 'dem.npy'))
+    assert np.load(tmp_path / 'dem.npy').shape == (4, 5)
+    loaded = Mesh.load_grid(str(tmp_path / 'dem.npy'))
+    assert (loaded.mesh_no, loaded.lower, loaded.upper, loaded.low, loaded.high) == \
+        (mesh.mesh_no, mesh.lower, mesh.upper, mesh.low, mesh.high)
+    assert isinstance(loaded.z, np.memmap)
+    assert np.array_equal(loaded.z, mesh.z)
+    assert np.array_equal(loaded.type_codes, mesh.type_codes) and loaded.type_names == mesh.type_names
+    # 一時ファイルへ書き込んでから置き換える(読み込み中のメモリマップはそのまま使える)
+    mesh.save_grid(str(tmp_path / 'dem.npy'))
+    assert np.array_equal(loaded.z, mesh.z) and not list(tmp_path.glob('*.tmp'))
+
+def test_collection(tmp_path) -> None:
+    """
+    ディレクトリ・zipファイル(zipファイル内のzipファイルを含む)からの一括読み込みのテスト。
+    """
+    import zipfile
+    from dem.mesh import MeshCollection
+    # ディレクトリ内の .xml ファイル
+    (tmp_path / 'dir').mkdir()
+    for i in range(3):
+        _write_synthetic_gml(str(tmp_path / 'dir' / f'dem{i}.xml'), mesh_no=f'53392{i}', seed=i)
+    # zipファイル内の .xml ファイル、zipファイル内のzipファイル内の .xml ファイル
+    with zipfile.ZipFile(tmp_path / 'inner.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(3, 5):
+            _write_synthetic_gml(str(tmp_path / 'tmp.xml'), mesh_no=f'53392{i}', seed=i)
+            archive.write(tmp_path / 'tmp.xml', f'FG-GML-5339-2{i}-DEM10B/dem{i}.xml')
+    with zipfile.ZipFile(tmp_path / 'outer.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(5, 8):
+            _write_synthetic_gml(str(tmp_path / 'tmp.xml'), mesh_no=f'53392{i}', seed=i)
+            archive.write(tmp_path / 'tmp.xml', f'dem{i}.xml')
+        archive.write(tmp_path / 'inner.zip', 'inner.zip')
+        archive.writestr('readme.txt', 'not a tile')
+
+    paths = [str(tmp_path / 'dir'), str(tmp_path / 'outer.zip')]
+    collection = MeshCollection.load(paths, workers=2, batch_size=2)
+    assert len(collection) == len(collection.timings) == 8
+    assert [mesh.mesh_no for mesh in collection] == [f'53392{i}' for i in [0, 1, 2, 5, 6, 7, 3, 4]]
+    assert collection[6].path.endswith('outer.zip/inner.zip/FG-GML-5339-23-DEM10B/dem3.xml')
+    assert all(seconds >= 0.0 for seconds in collection.timings)
+
+    # 自プロセスで読み込んだ場合も同じ結果
+    single = MeshCollection.load(paths, workers=1)
+    assert [mesh.path for mesh in single] == [mesh.path for mesh in collection]
+    assert all(np.array_equal(a.z, b.z) for (a, b) in zip(single, collection))
+    # zipファイル内のファイルは展開した場合と同じ内容で読み込まれる
+    assert np.array_equal(collection[5].z, Mesh(str(tmp_path / 'tmp.xml')).z)
+
+def test_mosaic(tmp_path) -> None:
+    """
+    複数タイルのモザイク(ディスク上のラスタ)作成のテスト。
+    """
+    from dem.mesh import MeshCollection, Mosaic
+    # 東西に隣接する2タイル(メッシュ間の距離 0.025度)
+    (tmp_path / 'tiles').mkdir()
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'a.xml'), mesh_no='000000', lower=(35.0, 139.0), upper=(35.1, 139.125), seed=1)
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'b.xml'), mesh_no='000001', lower=(35.0, 139.125), upper=(35.1, 139.25), seed=2)
+    collection = MeshCollection.load(str(tmp_path / 'tiles'), workers=1)
+    (a, b) = collection.meshes
+
+    mosaic = collection.mosaic(str(tmp_path / 'mosaic.npy'))
+    assert isinstance(mosaic.z, np.memmap) and mosaic.z.dtype == np.float32
+    assert mosaic.z.shape == (4, 10)
+    assert np.array_equal(mosaic.z, np.hstack([a.z, b.z]))
+    assert np.allclose(mosaic.latitudes, a.latitudes) and np.allclose(mosaic.longitudes[5:], b.longitudes)
+
+    # 範囲を指定し、タイルを保持せずに作成(範囲外はデータなし、範囲外のタイル部分は書き込まない)
+    path = str(tmp_path / 'built.npy')
+    Mosaic.build(path, str(tmp_path / 'tiles'), [34.95, 139.05], [35.15, 139.3], workers=1)
+    built = Mosaic.open(path)
+    assert built.z.shape == (8, 10) and built.tiles == ['000000', '000001']
+    assert (built.z[:2] == Mosaic.NO_DATA).all() and (built.z[6:] == Mosaic.NO_DATA).all()
+    assert (built.z[:, 8:] == Mosaic.NO_DATA).all()
+    assert np.array_equal(built.z[2:6, :8], np.hstack([a.z, b.z])[:, 2:])
+
+    # 後から追加したタイルのデータなしは既存の値を上書きしない
+    writable = Mosaic.open(path, mode='r+')
+    b.z[:] = Mosaic.NO_DATA
+    assert writable.add(b)
+    assert np.array_equal(writable.z[2:6, :8], built.z[2:6, :8])
+    assert not list(tmp_path.glob('*.tmp'))
+
+    # メッシュ間の距離が異なるタイルは追加できない
+    _write_synthetic_gml(str(tmp_path / 'c.xml'), nx=10, ny=8, lower=(35.0, 139.0), upper=(35.1, 139.125))
+    with pytest.raises(ValueError):
+        writable.add(Mesh(str(tmp_path / 'c.xml')))
+
+def test_atomic_open(tmp_path) -> None:
+    """
+    一時ファイル経由の書き込みのテスト(失敗時は既存ファイルを変更しない)。
+    """
+    from dem.mesh import atomic_open
+    path = str(tmp_path / 'meta.json')
+    with atomic_open(path) as f:
+        f.write('{}')
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as f:
+            f.write('{"broken"')
+            raise RuntimeError('interrupted')
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == '{}'
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_interpolate(tmp_path) -> None:
+    """
+    タイルの標高内挿のテスト。
+    """
+    path = str(tmp_path / 'dem.xml')
+    _write_synthetic_gml(path, mesh_no='533945')
+    mesh = Mesh(path)
+    (lats, lons) = (mesh.latitudes, mesh.longitudes)
+
+    # メッシュの中心はメッシュの標高、中心間は双1次内挿
+    assert mesh.interpolate(lats[2], lons[3]) == pytest.approx(float(mesh.z[2, 3]))
+    expected = (mesh.z[1, 1] + mesh.z[1, 2] + mesh.z[2, 1] + mesh.z[2, 2]) / 4.0
+    assert mesh.interpolate((lats[1] + lats[2]) / 2, (lons[1] + lons[2]) / 2) == pytest.approx(float(expected))
+    # タイル端の半メッシュ分は端のメッシュの標高
+    assert mesh.interpolate(35.75, lons[4]) == pytest.approx(float(mesh.z[0, 4]))
+    assert mesh.interpolate(lats[3], 139.75) == pytest.approx(float(mesh.z[3, 4]))
+
+    # データなしのメッシュを使用する場合は nan、範囲外は例外(一括の場合は nan)
+    assert np.isnan(mesh.interpolate(lats[0], (lons[0] + lons[1]) / 2))
+    with pytest.raises(ValueError):
+        mesh.interpolate(35.8, 139.7)
+    heights = mesh.interpolate_many([lats[2], 35.8, lats[1]], [lons[3], 139.7, lons[1]])
+    assert heights[0] == pytest.approx(float(mesh.z[2, 3])) and np.isnan(heights[1])
+    assert heights[2] == pytest.approx(float(mesh.z[1, 1]))
+
+def test_collection_interpolate(tmp_path) -> None:
+    """
+    メッシュ番号の索引による複数タイルの標高内挿のテスト。
+    """
+    from dem.mesh import MeshCollection, get_mesh_code, _get_mesh_code
+    assert get_mesh_code(35.70, 139.71, 4) == 5339
+    assert get_mesh_code(35.70, 139.71, 6) == 533945
+    assert get_mesh_code(35.70, 139.71, 8) == 53394546
+    assert get_mesh_code([35.70, 35.70], [139.71, 139.76]).tolist() == [533945, 533946]
+    assert [_get_mesh_code(35.70, 139.71, digits) for digits in (4, 6, 8)] == [5339, 533945, 53394546]
+
+    (tmp_path / 'tiles').mkdir()
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'a.xml'), mesh_no='533945', seed=1,
+        lower=(35.666666667, 139.625), upper=(35.75, 139.75))
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'b.xml'), mesh_no='533946', seed=2,
+        lower=(35.666666667, 139.75), upper=(35.75, 139.875))
+    collection = MeshCollection.load(str(tmp_path / 'tiles'), workers=1)
+    (a, b) = collection.meshes
+    assert collection.get_tile(35.70, 139.71) is a and collection.get_tile(35.70, 139.76) is b
+    assert collection.get_tile(35.80, 139.71) is None
+    assert collection.interpolate(35.70, 139.76) == b.interpolate(35.70, 139.76)
+    with pytest.raises(ValueError):
+        collection.interpolate(35.80, 139.71)
+
+    # 一括算出はタイルごとの算出結果と一致し、タイルがない点は nan
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(35.66, 35.76, 1000)
+    lons = rng.uniform(139.62, 139.88, 1000)
+    heights = collection.interpolate_many(lats, lons)
+    expected = np.where(lons < 139.75, a.interpolate_many(lats, lons), b.interpolate_many(lats, lons))
+    assert np.array_equal(np.isnan(heights), np.isnan(expected))
+    assert np.allclose(heights[~np.isnan(heights)], expected[~np.isnan(expected)])
+    assert np.isnan(heights[(lats > 35.75) | (lats < 35.666666667) | (lons > 139.875)]).all()
+
+def test_collection_fallback(tmp_path) -> None:
+    """
+    細かいタイルがデータなしの点は、桁数の少ない(粗い)タイルで算出することを確認する。
+    """
+    from dem.mesh import MeshCollection, get_mesh_bounds
+    (tmp_path / 'tiles').mkdir()
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'coarse.xml'), mesh_no='533945', seed=1)
+    (lower, upper) = get_mesh_bounds('53394546')
+    # 細かいタイルは北端の1行がデータなし
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'fine.xml'), mesh_no='53394546', seed=2,
+        lower=lower, upper=upper, start=(0, 1))
+    collection = MeshCollection.load(str(tmp_path / 'tiles'), workers=1)
+    (coarse, fine) = sorted(collection.meshes, key=lambda mesh: len(mesh.mesh_no))
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(lower[0], upper[0], 200)
+    lons = rng.uniform(lower[1], upper[1], 200)
+    heights = collection.interpolate_many(lats, lons)
+    expected = fine.interpolate_many(lats, lons)
+    missing = np.isnan(expected)
+    assert missing.any() and not missing.all()
+    expected[missing] = coarse.interpolate_many(lats[missing], lons[missing])
+    assert np.array_equal(heights, expected, equal_nan=True)
+    assert not np.isnan(heights[missing]).all()
+    for k in np.nonzero(missing & ~np.isnan(heights))[0][:5]:
+        assert collection.interpolate(lats[k], lons[k]) == heights[k]
+
+    # GML の範囲がメッシュ番号の範囲より狭いタイルの範囲外の点は、一括算出と同じく粗いタイル(なければ nan)
+    _write_synthetic_gml(str(tmp_path / 'tiles' / 'narrow.xml'), mesh_no='53394547', seed=3,
+        lower=(lower[0] + 0.001, upper[1]), upper=get_mesh_bounds('53394547')[1])
+    collection = MeshCollection.load(str(tmp_path / 'tiles'), workers=1)
+    (lat, lon) = (lower[0] + 0.0005, upper[1] + 0.001)
+    assert collection.interpolate(lat, lon) == collection.interpolate_many([lat], [lon])[0] == \
+        coarse.interpolate(lat, lon)
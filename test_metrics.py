@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py (インストルメンテーション)テストコード
+
+pytestパッケージが必要です。
+
+"""
+# テストフレームワーク
+import pytest
+import numpy as np
+
+# ターゲットモジュール/クラスのimport
+import metrics
+from geoid import HeightCache, HeightManager
+from dem.mesh import Mesh
+from test_geoid import _write_synthetic_asc
+from test_mesh import _write_synthetic_gml
+
+@pytest.fixture
+def registry():
+    """
+    デフォルトのレジストリを有効にし、テスト後に無効化・破棄する。
+    """
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    yield metrics.REGISTRY
+    metrics.disable()
+    metrics.REGISTRY.reset()
+
+def test_render() -> None:
+    """
+    カウンタ・ヒストグラム・ゲージが Prometheus のテキスト形式で出力されることを確認する。
+    """
+    reg = metrics.Registry(enabled=True, buckets=(0.1, 1.0))
+    reg.describe('requests_total', 'Requests')
+    reg.increment('requests_total', endpoint='/height')
+    reg.increment('requests_total', 2, endpoint='/height')
+    reg.observe('latency_seconds', 0.05, endpoint='/a"b')
+    reg.observe('latency_seconds', 0.5, endpoint='/a"b')
+    with reg.timer('latency_seconds', endpoint='/a"b'):
+        pass
+    reg.gauge('ratio', lambda: 0.25)
+    lines = reg.render().splitlines()
+    assert lines[:3] == ['# HELP requests_total Requests', '# TYPE requests_total counter',
+        'requests_total{endpoint="/height"} 3']
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{endpoint="/a\\"b",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="/a\\"b",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="/a\\"b",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{endpoint="/a\\"b"} 3' in lines
+    assert lines[-2:] == ['# TYPE ratio gauge', 'ratio 0.25']
+
+def test_disabled() -> None:
+    """
+    無効時は何も記録されないことを確認する。
+    """
+    reg = metrics.Registry(enabled=False)
+    reg.increment('requests_total')
+    reg.observe('latency_seconds', 0.1)
+    with reg.timer('latency_seconds'):
+        pass
+    assert reg.counters == {} and reg.histograms == {}
+    assert reg.render() == '\n'
+
+def test_instrumentation(registry, tmp_path) -> None:
+    """
+    HeightManager・Mesh の読み込み、内挿、保存の処理時間・件数が記録されることを確認する。
+    """
+    path = str(tmp_path / 'synthetic.asc')
+    _write_synthetic_asc(path, nla=31, nlo=21)
+    mgr = HeightManager(path)
+    mgr = HeightManager(path)
+    assert registry.get('geoid_cache_requests_total', result='miss') == 1
+    assert registry.get('geoid_cache_requests_total', result='hit') == 1
+    assert registry.get('geoid_load_seconds', phase='parse') == 1
+
+    mgr.interpolate(35.0, 135.0)
+    with pytest.raises(ValueError):
+        mgr.interpolate(10.0, 135.0)
+    mgr.interpolate_many(np.full(10, 35.0), np.full(10, 135.0))
+    assert registry.get('geoid_interpolate_seconds', method='interpolate') == 2
+    assert registry.get('geoid_interpolate_errors_total', method='interpolate') == 1
+    assert registry.get('geoid_points_interpolated_total', method='interpolate') == 1
+    assert registry.get('geoid_points_interpolated_total', method='interpolate_many') == 10
+    assert registry.get('geoid_batch_seconds', method='interpolate_many', phase='index') == 1
+    # 格子のキャッシュを参照する HeightCache の内挿も記録する
+    cache = HeightCache(mgr)
+    cache.interpolate(35.0, 135.0)
+    cache.interpolate(35.0, 135.0)
+    assert registry.get('geoid_points_interpolated_total', method='interpolate') == 2
+    assert registry.get('geoid_interpolate_seconds', method='interpolate') == 3
+
+    mgr.save(str(tmp_path / 'geoid.csv'))
+    assert registry.get('geoid_export_seconds', format='csv') == 1
+
+    gml_path = str(tmp_path / 'dem.xml')
+    _write_synthetic_gml(gml_path)
+    mesh = Mesh(gml_path)
+    for phase in ('parse', 'arrange', 'axes'):
+        assert registry.get('mesh_load_seconds', phase=phase) == 1
+    assert registry.get('mesh_points_loaded_total') == 20
+    mesh.interpolate_many([35.7], [139.7])
+    assert registry.get('mesh_points_interpolated_total', method='mesh') == 1
+    assert 'geoid_points_interpolated_total{method="interpolate_many"} 10' in metrics.render()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+synthetic.py (合成データ生成)テストコード
+
+pytestパッケージが必要です。
+
+"""
+# テストフレームワーク
+import pytest
+import numpy as np
+
+# ターゲットモジュール/クラスのimport
+from geoid import HeightManager
+from dem.mesh import Mesh, MeshCollection, get_mesh_bounds
+from synthetic import geoid_height, write_geoid_asc, write_dem_gml, write_dem_tiles
+
+def test_write_geoid_asc(tmp_path) -> None:
+    """
+    作成した合成ジオイドデータを HeightManager で読み込めることを確認する。
+    """
+    path = str(tmp_path / 'synthetic.asc')
+    grid = write_geoid_asc(path, nla=301, nlo=241, glamn=30.0, glomn=130.0,
+        no_data=[(30.0, 130.0, 31.0, 131.0)])
+    with open(path, 'r', encoding='utf-8') as f:
+        assert f.readline() == ' 30.00000 130.00000 0.066667 0.083333  301  241 1 ver2.1\n'
+        assert len(f.readline()) == 9 * 28 + 1
+    mgr = HeightManager(path, cache=False)
+    assert mgr.grid.shape == (301, 241)
+    assert np.allclose(mgr.grid, grid)
+    assert mgr.grid[0, 0] == HeightManager.NO_DATA
+    assert np.isnan(mgr.interpolate_many([30.5], [130.5])[0])
+    assert mgr.interpolate(33.0, 134.0) == pytest.approx(geoid_height(33.0, 134.0), abs=1e-3)
+
+@pytest.mark.parametrize('order', ['+x-y', '-x-y', '+x+y', '-x+y'])
+def test_write_dem_gml(tmp_path, order:str) -> None:
+    """
+    作成した合成 DEM を Mesh で読み込むと、並び順・開始位置によらず書き込んだラスタになることを確認する。
+    """
+    path = str(tmp_path / 'dem.xml')
+    (z, types) = write_dem_gml(path, mesh_no='53394501', kind='DEM5A', order=order, start=(3, 1))
+    mesh = Mesh(path)
+    assert mesh.z.shape == (150, 225)
+    assert np.array_equal(mesh.z, z)
+    assert (mesh.types == types).all()
+    assert (mesh.types == Mesh.NO_DATA_TYPE).sum() == 225 + 3
+    assert mesh.mesh_no == '53394501'
+    (lower, upper) = get_mesh_bounds('53394501')
+    assert mesh.lower == pytest.approx(list(lower))
+    assert mesh.upper == pytest.approx(list(upper))
+
+def test_write_dem_tiles(tmp_path) -> None:
+    """
+    範囲を覆う 5mメッシュのタイルが作成され、まとめて読み込めることを確認する。
+    """
+    paths = write_dem_tiles(str(tmp_path), (35.6667, 139.625), (35.6833, 139.65), kind='DEM5A', archive='dem.zip')
+    assert len(paths) == 1 and paths[0].endswith('dem.zip')
+    collection = MeshCollection.load(paths)
+    assert sorted(mesh.mesh_no for mesh in collection) == ['53394500', '53394501', '53394510', '53394511']
+    with pytest.raises(ValueError):
+        write_dem_gml(str(tmp_path / 'dem.xml'), kind='DEM1A')